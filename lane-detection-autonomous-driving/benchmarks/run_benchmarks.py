@@ -0,0 +1,229 @@
+"""
+Per-function and end-to-end benchmarks on synthetic road frames.
+
+    python -m benchmarks.run_benchmarks --save-baseline default
+    python -m benchmarks.run_benchmarks --compare default --threshold 0.15
+
+Results are stored as versioned JSON files in benchmarks/baselines/.
+Comparing exits with status 1 if any benchmark is slower than its
+baseline by more than the threshold.
+"""
+import os
+import sys
+import json
+import types
+import time
+import argparse
+import platform
+import datetime
+import numpy as np
+import cv2
+
+from src.config import settings
+from src.preprocessing import image_utils
+from src.preprocessing.buffer_pool import BufferPool
+from src.perception import roi, perspective_transform, lane_detection
+from src.visualization import overlay
+from src.pipeline.geometry_cache import GeometryCache, scale_points
+from src.pipeline.lane_pipeline import LanePipeline
+from benchmarks.synthetic import render_road_frame, render_sequence, SCENES, RESOLUTIONS
+
+SCHEMA_VERSION = 1
+
+# Lens model for the undistortion benchmarks (normalized intrinsics, see settings.CAMERA_INTRINSICS)
+CALIBRATION_INTRINSICS = (0.8, 0.8 * 16 / 9, 0.5, 0.5)
+CALIBRATION_DISTORTION = (-0.3, 0.1, 0.0, 0.0, 0.0)
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+def time_call(fn, repeat=7, min_time=0.05):
+    """
+    Median seconds per call over `repeat` runs, each long enough
+    (at least `min_time`) to swamp timer resolution.
+    """
+    fn()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return float(np.median(samples))
+
+def stage_benchmarks(frame):
+    """
+    (name, callable) pairs timing each function of the pipeline modules
+    on one frame at its native resolution.
+    """
+    height, width = frame.shape[:2]
+    pool = BufferPool()
+    geometry = GeometryCache(settings).get(frame.shape)
+    src = np.float32(scale_points(settings.SRC_POINTS, width, height))
+    dst = np.float32(scale_points(settings.DST_POINTS, width, height))
+    roi_vertices = np.int32(np.round(scale_points(settings.ROI_VERTICES, width, height)))
+
+    binary = image_utils.fused_threshold(frame, pool).copy()
+    masked = roi.apply_mask(binary, geometry.roi_mask)
+    warped = perspective_transform.warp_perspective(masked, geometry.M, (width, height))
+
+    # A calibrated camera: one remap undoes the lens and warps, against
+    # undistorting the raw frame first and then warping the binary
+    calibrated = types.SimpleNamespace(**{name: getattr(settings, name) for name in dir(settings) if name.isupper()})
+    calibrated.CAMERA_INTRINSICS = CALIBRATION_INTRINSICS
+    calibrated.DISTORTION_COEFFS = CALIBRATION_DISTORTION
+    calibrated.WARP_MAP_DIR = None
+    lens = GeometryCache(calibrated).get(frame.shape)
+    K, dist = lens.camera
+    undistort_map1, undistort_map2 = cv2.initUndistortRectifyMap(K, dist, None, K, (width, height), cv2.CV_16SC2)
+    left_fit, right_fit, _, _ = lane_detection.fit_polynomial(warped)
+    if left_fit is None:
+        # No lane at this resolution; time the search around a nominal lane
+        left_fit = np.array([0.0, 0.0, width * 0.25])
+        right_fit = np.array([0.0, 0.0, width * 0.75])
+
+    return [
+        ('image_utils.to_grayscale', lambda: image_utils.to_grayscale(frame)),
+        ('image_utils.apply_gaussian_blur', lambda: image_utils.apply_gaussian_blur(frame)),
+        ('image_utils.resize_image', lambda: image_utils.resize_image(frame)),
+        ('image_utils.abs_sobel_thresh', lambda: image_utils.abs_sobel_thresh(frame)),
+        ('image_utils.hls_select', lambda: image_utils.hls_select(frame)),
+        ('image_utils.combined_threshold', lambda: image_utils.combined_threshold(frame)),
+        ('image_utils.fused_threshold', lambda: image_utils.fused_threshold(frame, pool)),
+        ('roi.region_of_interest', lambda: roi.region_of_interest(binary, roi_vertices)),
+        ('roi.apply_mask', lambda: roi.apply_mask(binary, geometry.roi_mask)),
+        ('perspective_transform.birdeye', lambda: perspective_transform.birdeye(masked, src, dst)),
+        ('perspective_transform.inverse_birdeye', lambda: perspective_transform.inverse_birdeye(warped, src, dst)),
+        ('perspective_transform.warp_perspective', lambda: perspective_transform.warp_perspective(masked, geometry.M, (width, height))),
+        ('perspective_transform.warp', lambda: perspective_transform.warp(masked, lens.map1, lens.map2)),
+        ('undistort_remap+warp_perspective', lambda: (
+            cv2.remap(frame, undistort_map1, undistort_map2, cv2.INTER_LINEAR),
+            perspective_transform.warp_perspective(masked, geometry.M, (width, height)))),
+        ('lane_detection.histogram_bases', lambda: lane_detection.histogram_bases(warped)),
+        ('lane_detection.find_lane_pixels_sliding_window', lambda: lane_detection.find_lane_pixels_sliding_window(warped)),
+        ('lane_detection.fit_polynomial', lambda: lane_detection.fit_polynomial(warped)),
+        ('lane_detection.search_around_poly', lambda: lane_detection.search_around_poly(warped, left_fit, right_fit)),
+        ('lane_detection.generate_poly_points', lambda: lane_detection.generate_poly_points(warped.shape, left_fit, right_fit)),
+        ('overlay.draw_lane_area', lambda: overlay.draw_lane_area(frame, warped, left_fit, right_fit, geometry.Minv)),
+        ('overlay.draw_info', lambda: overlay.draw_info(frame.copy(), 1.0, 0.1, 1000.0, "High Confidence")),
+    ]
+
+def end_to_end_seconds(frames, passes=3):
+    """Median seconds per frame of LanePipeline.process_frame over a sequence."""
+    samples = []
+    for _ in range(passes):
+        pipeline = LanePipeline()
+        start = time.perf_counter()
+        for frame in frames:
+            pipeline.process_frame(frame)
+        samples.append((time.perf_counter() - start) / len(frames))
+    return float(np.median(samples))
+
+def run(resolutions, scenes, sequence_length, name_filter=None, log=print):
+    """
+    Time every benchmark for each resolution and scene.
+    Returns {"<name>[<resolution>/<scene>]": seconds per call}.
+    """
+    results = {}
+    for res_name in resolutions:
+        width, height = RESOLUTIONS[res_name]
+        for scene in scenes:
+            frame = render_road_frame(width, height, **SCENES[scene])
+            for name, fn in stage_benchmarks(frame):
+                key = f"{name}[{res_name}/{scene}]"
+                if name_filter and name_filter not in key:
+                    continue
+                results[key] = time_call(fn)
+                log(f"{key:<80s} {results[key] * 1e3:9.3f} ms")
+            key = f"pipeline.process_frame[{res_name}/{scene}]"
+            if name_filter and name_filter not in key:
+                continue
+            results[key] = end_to_end_seconds(render_sequence(sequence_length, width, height, scene))
+            log(f"{key:<80s} {results[key] * 1e3:9.3f} ms  ({1.0 / results[key]:.1f} fps)")
+    return results
+
+def environment():
+    return {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def save_baseline(name, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    data = {
+        'schema': SCHEMA_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'results': results,
+    }
+    with open(baseline_path(name), 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+def load_baseline(name):
+    with open(baseline_path(name)) as f:
+        data = json.load(f)
+    if data.get('schema') != SCHEMA_VERSION:
+        raise ValueError(f"Baseline {name!r} has schema {data.get('schema')}, expected {SCHEMA_VERSION}")
+    return data
+
+def compare(results, baseline, threshold):
+    """
+    Returns a list of (key, baseline_s, current_s, ratio) for benchmarks
+    slower than baseline * (1 + threshold). Keys missing on either side are ignored.
+    """
+    regressions = []
+    for key, current in sorted(results.items()):
+        reference = baseline['results'].get(key)
+        if reference is None or reference <= 0:
+            continue
+        ratio = current / reference
+        if ratio > 1.0 + threshold:
+            regressions.append((key, reference, current, ratio))
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the lane pipeline on synthetic road frames.")
+    parser.add_argument('--resolutions', nargs='+', default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument('--scenes', nargs='+', default=list(SCENES), choices=list(SCENES))
+    parser.add_argument('--sequence-length', type=int, default=30,
+                        help="Frames per end-to-end process_frame run")
+    parser.add_argument('--filter', default=None, help="Only keep benchmarks whose name contains this string")
+    parser.add_argument('--save-baseline', metavar='NAME', help="Store results as benchmarks/baselines/NAME.json")
+    parser.add_argument('--compare', metavar='NAME', help="Compare against benchmarks/baselines/NAME.json")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Allowed slowdown before failing, as a fraction (default 0.10)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args.resolutions, args.scenes, args.sequence_length, args.filter)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+        print(f"Baseline written to {baseline_path(args.save_baseline)}")
+
+    if args.compare:
+        regressions = compare(results, load_baseline(args.compare), args.threshold)
+        for key, reference, current, ratio in regressions:
+            print(f"REGRESSION {key}: {reference * 1e3:.3f} ms -> {current * 1e3:.3f} ms ({ratio:.2f}x)")
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+            return 1
+        print(f"No regressions against {args.compare!r} (threshold {args.threshold:.0%})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Load generator for the frame-processing service (run_service.py).
+
+    python run_service.py &
+    python -m benchmarks.service_load --streams 8 --frames 200 --in-flight 2
+
+Each simulated stream opens its own connection and sends synthetic road
+frames, JPEG-encoded once up front, keeping up to --in-flight requests
+outstanding (optionally paced to --fps). Reports throughput and latency
+percentiles over all responses.
+"""
+import time
+import asyncio
+import argparse
+import numpy as np
+import cv2
+
+from src.config import settings
+from src.pipeline.service import LaneClient
+from benchmarks.synthetic import render_road_frame, SCENES
+
+def encode_frames(count, width, height, scene):
+    frames = []
+    for i in range(count):
+        frame = render_road_frame(width, height, frame_index=i, **SCENES[scene])
+        frames.append(cv2.imencode('.jpg', frame)[1].tobytes())
+    return frames
+
+async def run_stream(stream, frames, args, latencies, errors):
+    client = await LaneClient.connect(args.host, args.port, args.unix)
+    window = asyncio.Semaphore(args.in_flight)
+    sent = {}
+
+    async def receive():
+        for _ in range(args.frames):
+            header, _ = await client.receive()
+            latencies.append(time.perf_counter() - sent.pop(header['id']))
+            if 'error' in header:
+                errors.append(header['error'])
+            window.release()
+
+    receiver = asyncio.create_task(receive())
+    start = time.perf_counter()
+    for i in range(args.frames):
+        if args.fps:
+            await asyncio.sleep(max(0.0, start + i / args.fps - time.perf_counter()))
+        await window.acquire()
+        # Ids count up from 0 per connection, like LaneClient's
+        sent[i] = time.perf_counter()
+        await client.send(stream, frames[i % len(frames)], timestamp=i * settings.FRAME_DT,
+                          overlay=args.overlay)
+    await receiver
+    await client.close()
+
+async def main(args):
+    frames = encode_frames(min(args.frames, 60), args.width, args.height, args.scene)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_stream(stream, frames, args, latencies, errors)
+                           for stream in range(args.streams)))
+    wall = time.perf_counter() - start
+
+    total = args.streams * args.frames
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    print(f"{total} frames from {args.streams} streams in {wall:.2f}s: {total / wall:.1f} fps")
+    print(f"latency p50 {p50:.1f}ms  p95 {p95:.1f}ms  p99 {p99:.1f}ms  max {max(latencies) * 1000:.1f}ms")
+    if errors:
+        print(f"{len(errors)} errors, e.g. {errors[0]!r}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=settings.SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=settings.SERVICE_PORT)
+    parser.add_argument('--unix', default=None, help="Connect to this Unix socket instead of TCP")
+    parser.add_argument('--streams', type=int, default=4, help="Concurrent streams (connections)")
+    parser.add_argument('--frames', type=int, default=100, help="Frames per stream")
+    parser.add_argument('--in-flight', type=int, default=2, help="Outstanding requests per stream")
+    parser.add_argument('--fps', type=float, default=None, help="Pace each stream (default: as fast as possible)")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--scene', choices=sorted(SCENES), default='curved')
+    parser.add_argument('--overlay', action='store_true', help="Request overlay frames too")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,107 @@
+"""
+Cold-start benchmark: import and first-frame latency of fresh processes.
+
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --draw --output outputs/startup.json
+
+Every repeat starts a new interpreter that imports the pipeline, builds a
+LanePipeline and processes synthetic road frames, timing each step; a
+second set of processes calls warm_up() before the first frame, as pool
+workers do. Reports the median of each step and which heavy modules the
+import pulled in.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child process (argv: width height draw warm); prints one JSON line of timings
+CHILD = r"""
+import sys, time, json
+timings = {}
+start = time.perf_counter()
+import numpy, cv2
+timings['import_numpy_cv2'] = time.perf_counter() - start
+start = time.perf_counter()
+from src.pipeline.lane_pipeline import LanePipeline
+timings['import_pipeline'] = time.perf_counter() - start
+start = time.perf_counter()
+import run
+timings['import_run'] = time.perf_counter() - start
+loaded = {name: name in sys.modules for name in ('moviepy', 'src.visualization.overlay', 'src.pipeline.stage_cache')}
+
+from benchmarks.synthetic import render_road_frame
+width, height, draw, warm = (int(arg) for arg in sys.argv[1:])
+frames = [render_road_frame(width, height, frame_index=i) for i in range(3)]
+
+start = time.perf_counter()
+pipeline = LanePipeline()
+timings['construct'] = time.perf_counter() - start
+if warm:
+    start = time.perf_counter()
+    pipeline.warm_up(frames[0].shape, draw=draw)
+    timings['warm_up'] = time.perf_counter() - start
+for i, frame in enumerate(frames[:2]):
+    start = time.perf_counter()
+    pipeline.process_frame(frame, draw=draw)
+    timings['first_frame' if i == 0 else 'second_frame'] = time.perf_counter() - start
+print(json.dumps({'timings': timings, 'loaded': loaded}))
+"""
+
+def run_child(width, height, draw, warm):
+    """Timings of one fresh process, plus its total wall time."""
+    start = time.perf_counter()
+    argv = [sys.executable, '-c', CHILD, str(width), str(height), str(int(draw)), str(int(warm))]
+    out = subprocess.run(argv, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    wall = time.perf_counter() - start
+    result = json.loads(out.strip().splitlines()[-1])
+    result['timings']['process_wall'] = wall
+    return result
+
+def median_timings(results):
+    names = results[0]['timings']
+    return {name: float(np.median([r['timings'][name] for r in results])) for name in names}
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and first-frame latency of fresh processes.")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh processes per configuration")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--draw', action='store_true', help="Render the overlay (default: headless)")
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    interpreter = (time.perf_counter() - start) / args.repeat
+
+    report = {'interpreter_startup': interpreter, 'draw': args.draw,
+              'resolution': [args.width, args.height]}
+    for warm in (False, True):
+        results = [run_child(args.width, args.height, args.draw, warm) for _ in range(args.repeat)]
+        report['warm' if warm else 'cold'] = median_timings(results)
+        report['loaded'] = results[0]['loaded']
+
+    print(f"Interpreter startup: {1000 * interpreter:.1f} ms")
+    print(f"Modules loaded by the imports: "
+          + ", ".join(f"{name}={'yes' if loaded else 'no'}" for name, loaded in report['loaded'].items()))
+    print(f"{'step':<18}{'cold (ms)':>12}{'warmed (ms)':>14}")
+    for name in report['cold']:
+        cold = report['cold'][name]
+        warm = report['warm'].get(name)
+        print(f"{name:<18}{1000 * cold:>12.1f}{'' if warm is None else f'{1000 * warm:.1f}':>14}")
+    print(f"{'warm_up':<18}{'':>12}{1000 * report['warm']['warm_up']:>14.1f}")
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import cv2
+import numpy as np
+from src.config import settings
+
+# Scenes covered by the benchmark suite
+SCENES = {
+    'straight': {'curvature': 0.0, 'shadows': 0, 'noise': 4},
+    'curved': {'curvature': 0.6, 'shadows': 0, 'noise': 4},
+    'shadows': {'curvature': 0.3, 'shadows': 4, 'noise': 4},
+    'noisy': {'curvature': 0.3, 'shadows': 1, 'noise': 40},
+}
+
+RESOLUTIONS = {
+    '640x360': (640, 360),
+    '1280x720': (1280, 720),
+    '1920x1080': (1920, 1080),
+}
+
+def render_road_frame(width=1280, height=720, curvature=0.0, shadows=0, noise=4,
+                      frame_index=0, seed=0):
+    """
+    Procedurally render a BGR road frame.
+
+    Lane markings are drawn in bird's-eye space (at the settings' DST_POINTS
+    lane positions) and projected into the camera view with the inverse of
+    the pipeline's perspective transform, so the pipeline sees a lane it can
+    actually track. `curvature` bends the lane (0 is straight), `shadows`
+    adds that many dark patches across the road, `noise` is the amplitude of
+    uniform per-pixel noise and `frame_index` moves the lane slightly so
+    consecutive frames form a plausible sequence.
+    """
+    rng = np.random.default_rng(seed + frame_index)
+    sx = width / 1280.0
+    sy = height / 720.0
+
+    # Sky and asphalt
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    horizon = int(420 * sy)
+    frame[:horizon] = (200, 170, 140)
+    frame[horizon:] = (95, 95, 95)
+
+    # Lane markings in bird's-eye space: white dashed left, yellow solid right
+    birdeye = np.zeros((height, width, 3), dtype=np.uint8)
+    y = np.arange(height, dtype=np.float64)
+    drift = 15 * sx * np.sin(frame_index / 15.0)
+    bend = curvature * 250 * sx * ((height - y) / height) ** 2
+    thickness = max(2, int(round(16 * sx)))
+    for base, color, dashed in ((320, (235, 235, 235), True), (960, (40, 200, 240), False)):
+        x = base * sx + drift + bend
+        pts = np.stack([x, y], axis=1).astype(np.int32)
+        if dashed:
+            dash = max(1, int(60 * sy))
+            phase = (frame_index * 8) % (2 * dash)
+            for start in range(-phase, height, 2 * dash):
+                segment = pts[max(0, start):max(0, start + dash)]
+                if len(segment) > 1:
+                    cv2.polylines(birdeye, [segment], False, color, thickness)
+        else:
+            cv2.polylines(birdeye, [pts], False, color, thickness)
+
+    src = np.float32(settings.SRC_POINTS * (width, height))
+    dst = np.float32(settings.DST_POINTS * (width, height))
+    Minv = cv2.getPerspectiveTransform(dst, src)
+    markings = cv2.warpPerspective(birdeye, Minv, (width, height))
+    mask = markings.any(axis=2)
+    frame[mask] = markings[mask]
+
+    # Shadows: darken random quadrilaterals across the road
+    for _ in range(shadows):
+        shade = np.zeros((height, width), dtype=np.uint8)
+        x0 = rng.integers(0, width)
+        y0 = rng.integers(horizon, height)
+        w = rng.integers(width // 8, width // 3)
+        h = rng.integers(height // 12, height // 5)
+        cv2.fillPoly(shade, [np.int32([[x0, y0], [x0 + w, y0], [x0 + w + h, y0 + h], [x0 + h, y0 + h]])], 1)
+        frame[shade == 1] = (frame[shade == 1] * 0.45).astype(np.uint8)
+
+    if noise:
+        frame = cv2.add(frame, rng.integers(0, noise + 1, frame.shape, dtype=np.uint8))
+    return frame
+
+def render_sequence(count, width=1280, height=720, scene='curved', seed=0):
+    """A list of consecutive frames of one scene."""
+    params = SCENES[scene]
+    return [render_road_frame(width, height, frame_index=i, seed=seed, **params) for i in range(count)]
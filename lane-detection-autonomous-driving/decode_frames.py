@@ -0,0 +1,33 @@
+import argparse
+import time
+from src.pipeline.frame_store import decode_to_store, is_current, store_path, FrameStore
+from src.config import settings
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Decode a video once into a memory-mapped frame store.")
+    parser.add_argument('source', nargs='?', default=settings.VIDEO_INPUT_PATH, help="Video file path")
+    parser.add_argument('--output', default=None,
+                        help="Store directory (default: FRAME_STORE_DIR/<clip name>-<path hash>)")
+    parser.add_argument('--force', action='store_true', help="Decode even if an up-to-date store exists")
+    parser.add_argument('--split', type=int, default=None,
+                        help="Also print this many frame ranges for parallel runs")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    path = args.output or store_path(args.source)
+    if not args.force and is_current(args.source, path):
+        store = FrameStore(path)
+        print(f"Up to date: {path} ({len(store)} frames)")
+    else:
+        start = time.perf_counter()
+        store = decode_to_store(args.source, path)
+        wall = time.perf_counter() - start
+        print(f"Decoded {len(store)} frames of {store.shape[1]}x{store.shape[0]} into {path} "
+              f"in {wall:.1f}s ({store.frames.nbytes / 2**20:.0f} MiB)")
+    if args.split:
+        for start, stop in store.split(args.split):
+            print(f"--start {start} --stop {stop}")
+
+if __name__ == "__main__":
+    main()
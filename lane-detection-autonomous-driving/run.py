@@ -1,21 +1,51 @@
+import argparse
 import cv2
-from moviepy import VideoFileClip
 from src.pipeline.lane_pipeline import LanePipeline
 from src.config import settings
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the lane detection pipeline on a video.")
+    parser.add_argument('--parallel', action='store_true',
+                        help="Run the stateless stages on a pool of worker processes")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for --parallel (default: settings.PARALLEL_WORKERS)")
+    parser.add_argument('--queue-depth', type=int, default=None,
+                        help="Frames in flight for --parallel (default: settings.PARALLEL_QUEUE_DEPTH)")
+    parser.add_argument('--metrics', default=None,
+                        help="Write per-stage metrics to this file (.prom for Prometheus text, JSON otherwise)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     pipeline = LanePipeline()
 
-    # Load video
+    if args.parallel:
+        from src.pipeline.parallel_runner import run_video
+        print(f"Processing video (parallel): {settings.VIDEO_INPUT_PATH}")
+        run_video(settings.VIDEO_INPUT_PATH, settings.VIDEO_OUTPUT_PATH, args.workers, args.queue_depth, pipeline)
+        print(f"Saved output to: {settings.VIDEO_OUTPUT_PATH}")
+        write_metrics(pipeline, args.metrics)
+        return
+
+    # Load video (moviepy is only imported on this path; it is slow to import)
+    from moviepy import VideoFileClip
     print(f"Processing video: {settings.VIDEO_INPUT_PATH}")
     clip = VideoFileClip(settings.VIDEO_INPUT_PATH)
     
-    # Process video
-    output_clip = clip.image_transform(pipeline.process_frame)
+    # Process video (with each frame's time, so the PID sees the real frame interval)
+    output_clip = clip.transform(lambda get_frame, t: pipeline.process_frame(get_frame(t), timestamp=t))
+    # moviepy renders the frame at t=0 once while building the clip; start the tracking afresh
+    pipeline.reset()
     
     # Write output
     print(f"Saving output to: {settings.VIDEO_OUTPUT_PATH}")
     output_clip.write_videofile(settings.VIDEO_OUTPUT_PATH, audio=False)
+    write_metrics(pipeline, args.metrics)
+
+def write_metrics(pipeline, path):
+    if path and pipeline.metrics is not None:
+        pipeline.metrics.write(path)
+        print(f"Metrics written to: {path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,24 @@
+import sys
+import argparse
+from src.pipeline.batch_runner import run_batch
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the lane detection pipeline on many videos.")
+    parser.add_argument('source', help="Directory of videos or a manifest file (one path per line)")
+    parser.add_argument('--output-dir', default=None,
+                        help="Where to write videos and timing records (default: settings.BATCH_OUTPUT_DIR)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="Reprocess clips that already have a complete output")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    records, failures = run_batch(args.source, args.output_dir, args.workers, resume=not args.no_resume)
+    print(f"Processed {len(records)} clip(s), {len(failures)} failure(s)")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from src.control import vehicle_sim
+from src.pipeline.telemetry import read_telemetry
+from src.config import settings
+
+def parse_range(text):
+    """'start:stop:count' (inclusive linspace) or a comma-separated list of values."""
+    if ':' in text:
+        start, stop, count = text.split(':')
+        return np.linspace(float(start), float(stop), int(count))
+    return np.array([float(value) for value in text.split(',')])
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Evaluate a grid of PID steering gains in closed loop over recorded drives.")
+    parser.add_argument('telemetry', nargs='+', help="Telemetry files (.npy or .csv, see run_telemetry.py)")
+    parser.add_argument('--kp', default='0:50:26', help="Proportional gains, start:stop:count or a,b,c")
+    parser.add_argument('--ki', default='0:2:11', help="Integral gains")
+    parser.add_argument('--kd', default='0:10:21', help="Derivative gains")
+    parser.add_argument('--speed', type=float, default=settings.SIM_SPEED, help="Vehicle speed in m/s")
+    parser.add_argument('--initial-offset', type=float, default=None,
+                        help="Starting offset in meters (default: the first recorded offset)")
+    parser.add_argument('--no-noise', action='store_true', help="Feed the controller the true offset")
+    parser.add_argument('--output', default=None, help="Write every gain set's metrics to this JSON file")
+    parser.add_argument('--top', type=int, default=5, help="Results to print")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    kp, ki, kd = vehicle_sim.gain_grid(parse_range(args.kp), parse_range(args.ki), parse_range(args.kd))
+    print(f"Evaluating {len(kp)} gain set(s) over {len(args.telemetry)} drive(s)")
+
+    # Cost and departures summed over drives; metrics averaged
+    cost = np.zeros(len(kp))
+    current = 0.0
+    totals = {}
+    for path in args.telemetry:
+        profile = vehicle_sim.DriveProfile.from_telemetry(read_telemetry(path))
+        if args.no_noise:
+            profile.noise[:] = 0.0
+        if args.initial_offset is not None:
+            profile.initial_offset = args.initial_offset
+        start = time.perf_counter()
+        result = vehicle_sim.simulate(profile, kp, ki, kd, speed=args.speed)
+        print(f"{path}: {len(profile)} frames in {time.perf_counter() - start:.2f}s")
+        cost += vehicle_sim.gain_cost(result)
+        current += vehicle_sim.gain_cost(vehicle_sim.simulate(
+            profile, settings.STEERING_KP, settings.STEERING_KI, settings.STEERING_KD, speed=args.speed))
+        for name, values in result.items():
+            totals[name] = totals.get(name, 0) + values / len(args.telemetry)
+
+    if not np.isfinite(cost).any():
+        print("Every gain set left the lane")
+        sys.exit(1)
+    print(f"Current gains (kp={settings.STEERING_KP}, ki={settings.STEERING_KI}, "
+          f"kd={settings.STEERING_KD}): cost {float(current):.4f}")
+
+    order = np.argsort(cost)
+    for rank, i in enumerate(order[:args.top], 1):
+        print(f"#{rank} cost {cost[i]:.4f}: kp={kp[i]:.3f} ki={ki[i]:.3f} kd={kd[i]:.3f} | "
+              f"rms {totals['rms_offset'][i]:.3f} m, overshoot {totals['overshoot'][i]:.3f} m, "
+              f"settling {totals['settling_time'][i]:.2f} s, effort {totals['steering_effort'][i]:.2f} deg, "
+              f"rate {totals['steering_rate'][i]:.1f} deg/s")
+    if args.output:
+        results = [{'kp': float(kp[i]), 'ki': float(ki[i]), 'kd': float(kd[i]),
+                    'cost': float(cost[i]) if np.isfinite(cost[i]) else None,
+                    'metrics': {name: float(values[i]) for name, values in totals.items()}}
+                   for i in order]
+        with open(args.output, 'w') as f:
+            json.dump({'telemetry': args.telemetry, 'speed': args.speed,
+                       'weights': settings.SIM_WEIGHTS, 'results': results}, f, indent=2)
+        print(f"Results written to: {args.output}")
+
+if __name__ == "__main__":
+    main()
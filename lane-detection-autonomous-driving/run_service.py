@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+from src.pipeline.service import LaneService
+from src.config import settings
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve lane detection to network clients.")
+    parser.add_argument('--host', default=settings.SERVICE_HOST)
+    parser.add_argument('--port', type=int, default=settings.SERVICE_PORT)
+    parser.add_argument('--unix', default=None, help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument('--max-batch', type=int, default=settings.SERVICE_MAX_BATCH,
+                        help="Requests per micro-batch")
+    parser.add_argument('--max-wait-ms', type=float, default=settings.SERVICE_MAX_WAIT * 1000,
+                        help="How long a batch waits for more requests")
+    parser.add_argument('--max-streams', type=int, default=settings.SERVICE_MAX_STREAMS,
+                        help="Streams that keep their trackers (least recently used dropped)")
+    return parser.parse_args()
+
+async def serve(args):
+    service = LaneService(max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000.0,
+                          max_streams=args.max_streams)
+    server = await service.start(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Serving on {where} (max batch {service.max_batch}, max wait {args.max_wait_ms:g}ms)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        if service.batches:
+            print(f"{service.requests} requests in {service.batches} batches "
+                  f"({service.requests / service.batches:.2f} per batch)")
+
+def main():
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
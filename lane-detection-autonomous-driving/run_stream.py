@@ -0,0 +1,50 @@
+import argparse
+from collections import Counter
+import cv2
+from src.pipeline.lane_pipeline import LanePipeline
+from src.pipeline.streaming import StreamingRunner, LEVEL_NAMES
+from src.pipeline.frame_store import frame_source
+from src.config import settings
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the lane detection pipeline on a live stream.")
+    parser.add_argument('source', help="Video file path, camera device index or frame store directory")
+    parser.add_argument('--budget-ms', type=float, default=settings.STREAM_LATENCY_BUDGET * 1000,
+                        help="Per-frame latency budget in milliseconds")
+    parser.add_argument('--output', default=None, help="Optionally write processed frames to this video file")
+    parser.add_argument('--verbose', action='store_true', help="Print one line per frame")
+    parser.add_argument('--metrics', default=None,
+                        help="Write per-stage metrics to this file (.prom for Prometheus text, JSON otherwise)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    source = int(args.source) if args.source.isdigit() else args.source
+    pipeline = LanePipeline()
+    runner = StreamingRunner(pipeline, budget=args.budget_ms / 1000.0)
+
+    writer = None
+    levels = Counter()
+    try:
+        for output, info in runner.run(frame_source(source)):
+            name = LEVEL_NAMES[info['level']]
+            levels['dropped' if info['dropped'] else name] += 1
+            if args.verbose:
+                print(f"frame {info['index']:6d} t={info['timestamp']:8.3f}s level={name:<11s} "
+                      f"latency={info['latency'] * 1000:6.1f}ms{' DROPPED' if info['dropped'] else ''}")
+            if output is not None and args.output:
+                if writer is None:
+                    height, width = output.shape[:2]
+                    writer = cv2.VideoWriter(args.output, cv2.VideoWriter_fourcc(*'mp4v'),
+                                             1.0 / settings.FRAME_DT, (width, height))
+                writer.write(output)
+    finally:
+        if writer is not None:
+            writer.release()
+
+    print("Frames per level: " + ", ".join(f"{name}={count}" for name, count in sorted(levels.items())))
+    if args.metrics and pipeline.metrics is not None:
+        pipeline.metrics.write(args.metrics)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import cv2
+from src.pipeline.stream_manager import StreamManager, DROP_POLICIES
+from src.pipeline.frame_store import frame_source
+from src.config import settings
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the lane detection pipeline on several streams at once.")
+    parser.add_argument('sources', nargs='+', help="Video file paths, camera device indices or frame store directories")
+    parser.add_argument('--workers', type=int, default=settings.STREAM_WORKERS,
+                        help="Shared worker threads (default: all cores)")
+    parser.add_argument('--queue', type=int, default=settings.STREAM_QUEUE_SIZE,
+                        help="Frames queued per stream")
+    parser.add_argument('--policy', choices=DROP_POLICIES, default=settings.STREAM_DROP_POLICY,
+                        help="What to do with frames arriving at a full queue")
+    parser.add_argument('--output-dir', default=None,
+                        help="Write each stream's annotated video to this directory (headless otherwise)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    writers = {}
+
+    def write_frame(name, output, info):
+        if output is None:
+            return
+        if name not in writers:
+            height, width = output.shape[:2]
+            path = os.path.join(args.output_dir, f"stream_{name}.mp4")
+            writers[name] = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'),
+                                            1.0 / settings.FRAME_DT, (width, height))
+        writers[name].write(output)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    sources = {}
+    with StreamManager(workers=args.workers, queue_size=args.queue, drop_policy=args.policy,
+                       draw=args.output_dir is not None) as manager:
+        for i, source in enumerate(args.sources):
+            name = str(i)
+            manager.add_stream(name, on_result=write_frame if args.output_dir else None)
+            sources[name] = frame_source(int(source) if source.isdigit() else source)
+        try:
+            stats = manager.run(sources)
+        finally:
+            for writer in writers.values():
+                writer.release()
+
+    for name, source in zip(sources, args.sources):
+        s = stats[name]
+        print(f"stream {name} ({source}): {s['processed']}/{s['submitted']} frames, "
+              f"{s['dropped']} dropped, {s['errors']} errors, {s['fps']:.1f} fps, "
+              f"latency {s['latency_mean'] * 1000:.1f}ms, lag {s['lag_mean'] * 1000:.1f}ms "
+              f"(max {s['lag_max'] * 1000:.1f}ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import argparse
+from src.pipeline import sweep
+from src.pipeline.batch_runner import discover_clips
+from src.pipeline.frame_store import is_frame_store
+from src.config import settings
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Grid or random search over settings on a set of clips.")
+    parser.add_argument('sources', nargs='+',
+                        help="Videos, frame store directories, directories of either, or manifest files")
+    parser.add_argument('--space', default=None,
+                        help='JSON sweep space: {"grid": {...}} or {"random": {...}, "samples": n, "seed": s}')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=JSON_LIST',
+                        help="Grid values for one setting, e.g. SEARCH_MARGIN=[0.05,0.08,0.1] (repeatable)")
+    parser.add_argument('--random', type=int, default=None, metavar='N',
+                        help="Sample N configurations from the --param values instead of the full grid")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=settings.SWEEP_WORKERS)
+    parser.add_argument('--max-frames', type=int, default=settings.SWEEP_MAX_FRAMES,
+                        help="Frames evaluated per clip")
+    parser.add_argument('--output', default=None, help="Write every result to this JSON file")
+    parser.add_argument('--top', type=int, default=5, help="Results to print")
+    return parser.parse_args()
+
+def find_clips(sources):
+    clips = []
+    for source in sources:
+        if is_frame_store(source) or (os.path.isfile(source) and
+                                      os.path.splitext(source)[1].lower() in settings.VIDEO_EXTENSIONS):
+            clips.append(source)
+        elif os.path.isdir(source):
+            stores = sorted(os.path.join(source, name) for name in os.listdir(source)
+                            if is_frame_store(os.path.join(source, name)))
+            clips += stores + discover_clips(source)
+        else:
+            clips += discover_clips(source)
+    return clips
+
+def main():
+    args = parse_args()
+    if args.space:
+        candidates = sweep.load_space(args.space)
+    else:
+        space = {}
+        for param in args.param:
+            name, _, values = param.partition('=')
+            space[name] = json.loads(values)
+        if args.random:
+            candidates = list(sweep.random_search(space, args.random, args.seed))
+        else:
+            candidates = list(sweep.grid(space))
+    clips = find_clips(args.sources)
+    if not clips or not candidates:
+        print("Nothing to sweep: need at least one clip and one configuration")
+        sys.exit(1)
+
+    groups = len(sweep.group_by_upstream(candidates))
+    print(f"Sweeping {len(candidates)} configuration(s) over {len(clips)} clip(s) "
+          f"({groups} preprocessing group(s) per clip)")
+    results = sweep.run_sweep(
+        clips, candidates, args.workers, args.max_frames,
+        progress=lambda done, total, clip: print(f"[{done}/{total}] {clip}"))
+
+    for rank, result in enumerate(results[:args.top], 1):
+        m = result['metrics']
+        print(f"#{rank} score {result['score']:.4f}: detection {m['detection_rate']:.3f}, "
+              f"rejection {m['rejection_rate']:.3f}, jitter {m['jitter']:.5f}, "
+              f"steering {m['steering_smoothness']:.3f}, {m['ms_per_frame']:.2f} ms/frame")
+        print(f"    {json.dumps(result['overrides'])}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'clips': clips, 'weights': settings.SWEEP_WEIGHTS, 'results': results}, f, indent=2)
+        print(f"Results written to: {args.output}")
+
+if __name__ == "__main__":
+    main()
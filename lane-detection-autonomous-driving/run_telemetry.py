@@ -0,0 +1,52 @@
+import argparse
+import time
+from src.pipeline.lane_pipeline import LanePipeline
+from src.pipeline.frame_store import frame_source, is_frame_store, FrameStore
+from src.pipeline.stage_cache import StageCache
+from src.pipeline.telemetry import TelemetryWriter, record_drive
+from src.config import settings
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Record per-frame lane telemetry without rendering video.")
+    parser.add_argument('source', help="Video file path, camera device index or frame store directory")
+    parser.add_argument('--output', default=settings.TELEMETRY_OUTPUT_PATH,
+                        help="Telemetry file: .npy (structured array) or .csv")
+    parser.add_argument('--chunk', type=int, default=settings.TELEMETRY_CHUNK_FRAMES,
+                        help="Records buffered between writes")
+    parser.add_argument('--start', type=int, default=0,
+                        help="First frame to process (frame stores only)")
+    parser.add_argument('--stop', type=int, default=None,
+                        help="Stop before this frame (frame stores only)")
+    parser.add_argument('--stage-cache', default=settings.STAGE_CACHE_DIR,
+                        help="Cache thresholded binaries in this directory and reuse them on reruns")
+    parser.add_argument('--metrics', default=None,
+                        help="Write per-stage metrics to this file (.prom for Prometheus text, JSON otherwise)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    source = int(args.source) if args.source.isdigit() else args.source
+    pipeline = LanePipeline()
+    if args.stage_cache:
+        pipeline.stage_cache = StageCache(args.stage_cache)
+    frame_keys = None
+    if is_frame_store(source):
+        # Stored frames are keyed by position, so cache hits skip hashing the pixels
+        store = FrameStore(source)
+        frame_keys = (store.frame_key(i) for i in range(args.start, len(store)))
+
+    start = time.perf_counter()
+    with TelemetryWriter(args.output, args.chunk) as writer:
+        frames = record_drive(pipeline, frame_source(source, args.start, args.stop), writer, frame_keys)
+    wall = time.perf_counter() - start
+    print(f"Recorded {frames} frames to {args.output} in {wall:.1f}s "
+          f"({frames / wall if wall > 0 else 0.0:.1f} fps)")
+    if pipeline.stage_cache is not None:
+        print(f"Stage cache: {pipeline.stage_cache.hits} hits, {pipeline.stage_cache.misses} misses")
+        pipeline.stage_cache.close()
+
+    if args.metrics and pipeline.metrics is not None:
+        pipeline.metrics.write(args.metrics)
+
+if __name__ == "__main__":
+    main()
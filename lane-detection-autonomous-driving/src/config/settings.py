@@ -1,30 +1,75 @@
 import numpy as np
 
+# Frame size (width, height) every input frame is resized to
+# (None processes every frame at its native resolution)
+FRAME_SIZE = (1280, 720)
+
+# Multi-scale mode: thresholding, warping and lane fitting run on the frame
+# scaled by this factor (e.g. 0.25 gives 320x180 for 720p); fits are rescaled
+# to the full frame for tracking, geometry and the overlay
+DETECTION_SCALE = 1.0
+
+# Geometry below is normalized (x / width, y / height) and scaled to the
+# actual frame; the pixel values it was tuned with are at this resolution
+REFERENCE_SIZE = (1280, 720)
+
+# Assumed frame interval in seconds when no timestamps are available (30 FPS)
+FRAME_DT = 0.033
+
+# Batched processing (LanePipeline.process_batch): frames per batch are capped
+# so that a batch holds at most this many pixels and stays cache resident
+BATCH_PIXEL_BUDGET = 1 << 18
+
+# Intra-frame parallelism: thresholding, ROI masking and the warp of a
+# single frame run as horizontal tiles on this many threads, for per-frame
+# latency on multi-core hardware (bit-identical output, see tiling.TiledPreprocessor)
+TILE_THREADS = 1      # 1 disables tiling (None = all cores)
+
+# Thresholding (image_utils.fused_threshold)
+SOBEL_X_THRESHOLD = (20, 100)       # Scaled |Sobel x| range kept
+S_CHANNEL_THRESHOLD = (170, 255)    # HLS saturation range kept (lower bound exclusive)
+
 # Image Processing Parameters
 GAUSSIAN_KERNEL_SIZE = 5
 CANNY_LOW_THRESHOLD = 50
 CANNY_HIGH_THRESHOLD = 150
 
-# ROI Parameters (assuming 1280x720 resolution, can be adjusted)
+# ROI Parameters (normalized; the 1280x720 polygon, can be adjusted)
 ROI_VERTICES = np.array([
     [(0, 720), (1280//2 - 50, 420), (1280//2 + 50, 420), (1280, 720)]
-], dtype=np.int32)
+]) / REFERENCE_SIZE
+
+# Threshold only inside the bounding box of the ROI and SRC_POINTS, and warp
+# straight from that crop (same output, less work per frame)
+CROP_TO_ROI = True
 
-# Perspective Transform Parameters (Source and Destination points)
+# Perspective Transform Parameters (Source and Destination points, normalized)
 # These need calibration, but we'll use approximate values for standard road videos
-SRC_POINTS = np.float32([
+SRC_POINTS = np.array([
     [585, 420],  # Top-left
     [203, 720],  # Bottom-left
     [1127, 720], # Bottom-right
     [695, 420]   # Top-right
-])
+]) / REFERENCE_SIZE
 
-DST_POINTS = np.float32([
+DST_POINTS = np.array([
     [320, 0],    # Top-left
     [320, 720],  # Bottom-left
     [960, 720],  # Bottom-right
     [960, 0]     # Top-right
-])
+]) / REFERENCE_SIZE
+
+# Camera calibration. With intrinsics set, each frame is undistorted and
+# warped to the bird's-eye view by one combined remap, and SRC_POINTS and
+# ROI_VERTICES are positions in the undistorted image. The intrinsics are
+# (fx, fy, cx, cy) as fractions of the frame width / height (fx / width, ...).
+CAMERA_INTRINSICS = None                        # None disables undistortion
+DISTORTION_COEFFS = (0.0, 0.0, 0.0, 0.0, 0.0)   # OpenCV (k1, k2, p1, p2, k3)
+WARP_MAP_DIR = None   # Directory to store the remap tables in once and memory-map afterwards (None: build in memory)
+
+# Overlay: keep drawing the previous lane area while the smoothed fits
+# move less than this many bird's-eye pixels on every row
+OVERLAY_REUSE_TOLERANCE = 0.5
 
 # Hough Transform Parameters
 HOUGH_RHO = 2              # Distance resolution in pixels of the Hough grid
@@ -35,14 +80,105 @@ HOUGH_MAX_LINE_GAP = 150   # Maximum gap in pixels between connectable line segm
 
 # Lane Geometry Parameters
 LANE_WIDTH_METERS = 3.7    # Standard lane width in meters
-XM_PER_PIX = 3.7 / 700     # Meters per pixel in x dimension
-YM_PER_PIX = 30 / 720      # Meters per pixel in y dimension
+LANE_WIDTH_NORM = 700 / 1280   # Lane width in the bird's-eye view, as a fraction of the width
+LANE_LENGTH_METERS = 30    # Meters of road covered by the bird's-eye view height
+
+# Lane Detection Parameters (normalized like the geometry; tuned at 1280x720)
+SLIDING_WINDOWS = 9                          # Number of sliding windows
+SEARCH_MARGIN = 100 / 1280                   # Half width of the windows and of the search around a prior fit
+WINDOW_MINPIX = 50 / (1280 * 720)            # Pixels (per frame pixel) needed to recenter a window
+LANE_WIDTH_RANGE = (500 / 1280, 900 / 1280)  # Plausible lane width at the bottom and middle rows
+LANE_SLOPE_TOLERANCE = 0.5 * 720 / 1280      # Max difference of the lines' slopes, d(x/width)/d(y/height)
+
+# Lane Tracking
+LANE_TRACKER = 'ema'           # 'ema' (LaneLine) or 'kalman' (KalmanLaneLine)
+LANE_SMOOTHING_ALPHA = 0.2     # EMA weight of each new fit
+LANE_MAX_LOST = 10             # Frames a line may be lost before its track is reset
+# Kalman tracker, in fractions of the frame width like SEARCH_MARGIN
+KALMAN_PROCESS_NOISE = 5 / 1280        # Std of the per-frame movement of a line
+KALMAN_MEASUREMENT_NOISE = 10 / 1280   # Std of the error of a single frame's fit
+KALMAN_MARGIN_SIGMAS = 3.0             # Search margin in standard deviations of the prediction
+KALMAN_MARGIN_RANGE = (40 / 1280, 150 / 1280)   # Limits of the adaptive search margin
+
+# Temporal decimation: while the track is stable, run detection only every
+# k-th frame and carry the tracked fits over in between. k grows from 1 up to
+# DETECTION_MAX_INTERVAL and drops back to 1 on a rejection, coasting or a
+# change of the fits or curvature (see decimation.DetectionScheduler)
+DETECTION_MAX_INTERVAL = 1               # 1 detects on every frame
+DETECTION_STABLE_FRAMES = 5              # Stable detections before k starts to grow
+DETECTION_FIT_TOLERANCE = 4 / 1280       # Line movement between detections counted as stable (fraction of the width)
+DETECTION_CURVATURE_TOLERANCE = 1 / 2000 # Change of 1 / curvature radius (1/m) counted as stable
 
 # Paths
 VIDEO_INPUT_PATH = 'data/raw/test_video.mp4'
 VIDEO_OUTPUT_PATH = 'outputs/videos/test_video_output.mp4'
+FRAME_STORE_DIR = 'data/frames'   # Decoded frame stores (decode_frames.py)
 
 # PID Controller Parameters
 STEERING_KP = 25.0   # Proportional gain (similar to previous implicit gain)
 STEERING_KI = 0.05   # Integral gain (small correction for steady state error)
 STEERING_KD = 5.0    # Derivative gain (damping for oscillation)
+
+# Closed-loop PID gain evaluation (vehicle_sim, run_pid_sweep.py)
+SIM_SPEED = 20.0              # Vehicle speed in m/s
+SIM_WHEELBASE = 2.7           # Bicycle model wheelbase in meters
+SIM_SETTLE_BAND = 0.1         # Offset (m) the vehicle must stay within to count as settled
+SIM_DEPARTURE_OFFSET = 1.85   # Offset (m) at which the vehicle leaves the lane (half the lane width)
+# Cost = weighted sum of these simulate() metrics, lower is better (see vehicle_sim.gain_cost)
+SIM_WEIGHTS = {
+    'rms_offset': 10.0,        # Meters
+    'overshoot': 5.0,          # Meters past the lane center
+    'settling_time': 0.1,      # Seconds
+    'steering_effort': 0.05,   # RMS steering angle, degrees
+    'steering_rate': 0.01,     # Mean steering change, degrees per second
+}
+
+# Parallel Video Runner
+PARALLEL_WORKERS = None      # Worker processes for the stateless stages (None = all cores)
+PARALLEL_QUEUE_DEPTH = 16    # Frames in flight (shared memory slots); bounds memory and backpressure
+
+# Batch Video Runner
+BATCH_OUTPUT_DIR = 'outputs/videos/batch'
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+# Streaming Mode
+STREAM_LATENCY_BUDGET = 0.033    # Per-frame processing deadline in seconds
+STREAM_RECOVER_RATIO = 0.6       # Step back up once latency stays below this fraction of the budget...
+STREAM_RECOVER_FRAMES = 30       # ...for this many consecutive frames
+
+# Multi-stream serving (StreamManager, run_streams.py)
+STREAM_WORKERS = None              # Shared worker threads (None = all cores)
+STREAM_QUEUE_SIZE = 4              # Frames queued per stream
+STREAM_DROP_POLICY = 'drop_oldest' # Full queue: 'drop_oldest', 'drop_newest' or 'block'
+
+# Frame-processing service (run_service.py)
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+SERVICE_MAX_BATCH = 8        # Requests per micro-batch
+SERVICE_MAX_WAIT = 0.005     # Seconds the batcher waits for more requests after the first
+SERVICE_QUEUE_SIZE = 64      # Pending requests before clients are slowed down
+SERVICE_MAX_STREAMS = 64     # Streams with live trackers; the least recently used is dropped beyond this
+SERVICE_JPEG_QUALITY = 90    # Quality of the overlay frames sent back
+
+# Stage cache: keep each frame's thresholded, ROI-masked binary on disk so
+# reruns that only change later stages skip thresholding (None disables)
+STAGE_CACHE_DIR = None
+
+# Parameter sweeps (run_sweep.py)
+SWEEP_WORKERS = None        # Worker processes (None = all cores)
+SWEEP_MAX_FRAMES = None     # Frames evaluated per clip (None = all)
+# Score = detection rate minus these weighted penalties (see sweep.score)
+SWEEP_WEIGHTS = {
+    'detection_rate': 1.0,         # Fraction of frames with a validated detection
+    'rejection_rate': 0.5,         # Fraction of detections rejected by validate_lines
+    'jitter': 50.0,                # Mean frame-to-frame line movement, fraction of the width
+    'steering_smoothness': 0.05,   # Mean absolute frame-to-frame steering change
+    'ms_per_frame': 0.002,         # Processing cost per frame
+}
+
+# Headless telemetry (run_telemetry.py)
+TELEMETRY_OUTPUT_PATH = 'outputs/telemetry/telemetry.npy'   # .npy, or .csv for CSV
+TELEMETRY_CHUNK_FRAMES = 256    # Records buffered between writes
+
+# Instrumentation
+METRICS_ENABLED = True    # Per-stage latency histograms and counters in LanePipeline.metrics
@@ -34,7 +34,7 @@ class PIDController:
         # Simple clamping for integral windup - optional, but good practice
         # Limiting integral contribution to 50% of max output can be a safe heuristic
         max_integral = abs(self.max_output) / (2.0 * self.ki) if self.ki > 0 else 0
-        self.integral = np.clip(self.integral, -max_integral, max_integral)
+        self.integral = min(max(self.integral, -max_integral), max_integral)
         
         i_term = self.ki * self.integral
         
@@ -48,8 +48,8 @@ class PIDController:
         # Update previous error
         self.prev_error = error
         
-        # Clip output
-        output = np.clip(output, self.min_output, self.max_output)
+        # Clip output (plain min/max: np.clip is slow on scalars)
+        output = min(max(output, self.min_output), self.max_output)
         
         return output
 
@@ -57,3 +57,37 @@ class PIDController:
         """Reset the controller state."""
         self.prev_error = 0.0
         self.integral = 0.0
+
+class BatchedPIDController:
+    """
+    Many independent PID controllers stepped together, one per element of
+    the gain arrays (e.g. a grid of thousands of gain sets). Each element
+    behaves exactly like PIDController with the same gains.
+    """
+    def __init__(self, kp, ki, kd, min_output=-25.0, max_output=25.0):
+        self.kp, self.ki, self.kd = np.broadcast_arrays(
+            np.asarray(kp, dtype=np.float64), np.asarray(ki, dtype=np.float64),
+            np.asarray(kd, dtype=np.float64))
+        self.min_output = min_output
+        self.max_output = max_output
+
+        # Anti-windup limit of the integral, as in PIDController
+        with np.errstate(divide='ignore'):
+            self.max_integral = np.where(self.ki > 0, abs(max_output) / (2.0 * self.ki), 0.0)
+        self.reset()
+
+    def update(self, error, dt=0.033):
+        """
+        Step every controller. `error` is a scalar (the same error for all)
+        or an array of the gains' shape. Returns the outputs as an array.
+        """
+        self.integral += error * dt
+        np.clip(self.integral, -self.max_integral, self.max_integral, out=self.integral)
+        output = self.kp * error + self.ki * self.integral + self.kd * ((error - self.prev_error) / dt)
+        self.prev_error = np.broadcast_to(error, self.kp.shape).astype(np.float64)
+        return np.clip(output, self.min_output, self.max_output)
+
+    def reset(self):
+        """Reset every controller's state."""
+        self.prev_error = np.zeros(self.kp.shape)
+        self.integral = np.zeros(self.kp.shape)
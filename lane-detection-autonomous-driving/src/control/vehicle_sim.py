@@ -0,0 +1,154 @@
+import numpy as np
+from src.config import settings
+from src.control.pid_controller import BatchedPIDController
+
+class DriveProfile:
+    """
+    The road and sensor conditions of one recorded drive, per frame: the
+    signed road curvature (1/m, positive curving left), the time step and
+    the measurement noise of the lane offset.
+    """
+    def __init__(self, curvature, dt, noise=None, initial_offset=0.0):
+        self.curvature = np.asarray(curvature, dtype=np.float64)
+        self.dt = np.broadcast_to(np.asarray(dt, dtype=np.float64), self.curvature.shape)
+        self.noise = np.zeros_like(self.curvature) if noise is None else np.asarray(noise, dtype=np.float64)
+        self.initial_offset = float(initial_offset)
+
+    def __len__(self):
+        return len(self.curvature)
+
+    @classmethod
+    def from_telemetry(cls, records, noise_window=15):
+        """
+        Build a profile from telemetry records (telemetry.read_telemetry).
+
+        The recorded curvature radius is signed from the fits' quadratic
+        terms (a > 0 bends the lane to the right ahead of the car). The
+        noise is the recorded offset minus its moving average over
+        `noise_window` frames: the detector's frame-to-frame jitter. Frames
+        without a tracked lane count as straight road without noise.
+        """
+        tracked = np.isfinite(records['left_fit'][:, 0]) & np.isfinite(records['right_fit'][:, 0])
+        a = (records['left_fit'][:, 0] + records['right_fit'][:, 0]) / 2
+        radius = records['curvature']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            curvature = np.where(tracked & (radius > 0), -np.sign(a) / radius, 0.0)
+        curvature = np.nan_to_num(curvature, nan=0.0, posinf=0.0, neginf=0.0)
+
+        timestamps = records['timestamp']
+        dt = np.full(len(records), settings.FRAME_DT)
+        if len(records) > 1:
+            steps = np.diff(timestamps)
+            dt[1:] = np.where(steps > 0, steps, settings.FRAME_DT)
+
+        offsets = np.where(tracked, records['offset'], 0.0)
+        kernel = np.ones(noise_window) / noise_window
+        smooth = np.convolve(np.pad(offsets, noise_window // 2, mode='edge'), kernel, mode='valid')[:len(offsets)]
+        noise = np.where(tracked, offsets - smooth, 0.0)
+        initial = offsets[np.argmax(tracked)] if tracked.any() else 0.0
+        return cls(curvature, dt, noise, initial)
+
+def gain_grid(kp, ki, kd):
+    """All combinations of the given gain values as three flat arrays."""
+    grids = np.meshgrid(np.asarray(kp, dtype=np.float64), np.asarray(ki, dtype=np.float64),
+                        np.asarray(kd, dtype=np.float64), indexing='ij')
+    return tuple(grid.ravel() for grid in grids)
+
+def simulate(profile, kp, ki, kd, speed=None, wheelbase=None, settle_band=None,
+             departure_offset=None, max_steering=25.0, trace=False):
+    """
+    Closed-loop lane keeping for every gain set at once.
+
+    Each gain set drives its own vehicle, a kinematic bicycle model in lane
+    coordinates: lateral offset e (m, positive right of center, as the
+    pipeline reports it) and heading error psi (rad, positive pointing to
+    the right of the lane direction):
+
+        de/dt   = v sin(psi)
+        dpsi/dt = v * curvature - v / L * tan(delta)
+
+    where delta is the controller output in degrees (positive steers left,
+    the correction for a positive offset). The controller sees e plus the
+    profile's measurement noise, exactly as PIDController sees the
+    pipeline's offset. Integration is explicit Euler at the profile's
+    per-frame time steps.
+
+    Returns a dict of per-gain-set arrays:
+        rms_offset: RMS lateral offset (m)
+        max_offset: largest |offset| (m)
+        overshoot: furthest excursion past the lane center, on the side
+            opposite the initial offset (m)
+        settling_time: time after which |offset| stays within settle_band (s)
+        steering_effort: RMS steering output (degrees)
+        steering_rate: mean |change of steering| per second (degrees/s)
+        departed: the offset exceeded departure_offset at some point
+    plus 'offset' and 'steering' (frames x gain sets) when `trace` is set.
+    """
+    speed = settings.SIM_SPEED if speed is None else speed
+    wheelbase = settings.SIM_WHEELBASE if wheelbase is None else wheelbase
+    settle_band = settings.SIM_SETTLE_BAND if settle_band is None else settle_band
+    departure_offset = settings.SIM_DEPARTURE_OFFSET if departure_offset is None else departure_offset
+
+    pid = BatchedPIDController(kp, ki, kd, -max_steering, max_steering)
+    shape = pid.kp.shape
+    e = np.full(shape, profile.initial_offset)
+    psi = np.zeros(shape)
+    side = np.sign(profile.initial_offset) or 1.0
+
+    squared = np.zeros(shape)
+    max_offset = np.zeros(shape)
+    overshoot = np.zeros(shape)
+    effort = np.zeros(shape)
+    rate = np.zeros(shape)
+    settled_since = np.zeros(shape)
+    previous = None
+    elapsed = 0.0
+    if trace:
+        offsets = np.empty((len(profile),) + shape)
+        steering = np.empty((len(profile),) + shape)
+
+    for t in range(len(profile)):
+        dt = float(profile.dt[t])
+        output = pid.update(e + profile.noise[t], dt=dt)
+        delta = np.radians(output)
+
+        e += speed * np.sin(psi) * dt
+        psi += (speed * profile.curvature[t] - speed / wheelbase * np.tan(delta)) * dt
+        elapsed += dt
+
+        squared += e * e
+        np.maximum(max_offset, np.abs(e), out=max_offset)
+        np.maximum(overshoot, -side * e, out=overshoot)
+        effort += output * output
+        if previous is not None:
+            rate += np.abs(output - previous)
+        previous = output
+        # Time of the last step spent outside the band
+        settled_since = np.where(np.abs(e) > settle_band, elapsed, settled_since)
+        if trace:
+            offsets[t] = e
+            steering[t] = output
+
+    frames = max(len(profile), 1)
+    result = {
+        'rms_offset': np.sqrt(squared / frames),
+        'max_offset': max_offset,
+        'overshoot': overshoot,
+        'settling_time': settled_since,
+        'steering_effort': np.sqrt(effort / frames),
+        'steering_rate': rate / max(elapsed, 1e-9),
+        'departed': max_offset > departure_offset,
+    }
+    if trace:
+        result['offset'] = offsets
+        result['steering'] = steering
+    return result
+
+def gain_cost(result, weights=None):
+    """
+    Cost of each gain set (lower is better) as the settings.SIM_WEIGHTS
+    weighted sum of the simulate() metrics; departures cost infinity.
+    """
+    weights = weights or settings.SIM_WEIGHTS
+    cost = sum(weight * result[name] for name, weight in weights.items())
+    return np.where(result['departed'], np.inf, cost)
@@ -1,34 +1,45 @@
 import cv2
 import numpy as np
+from src.perception.pixel_index import RowIndex
+from src.perception import poly_fit
 
-def find_lane_pixels_sliding_window(binary_warped):
+def histogram_bases(binary_warped):
     """
-    Finds lane pixels using sliding window search.
+    Finds the starting x positions of the left and right lines from the
+    histogram of the bottom half of the image.
+    Accepts a single H x W image or an N x H x W stack (returns arrays).
     """
     # Take a histogram of the bottom half of the image
-    histogram = np.sum(binary_warped[binary_warped.shape[0]//2:,:], axis=0)
-    
+    histogram = np.sum(binary_warped[..., binary_warped.shape[-2]//2:, :], axis=-2)
+
     # Find the peak of the left and right halves of the histogram
     # These will be the starting point for the left and right lines
-    midpoint = np.int64(histogram.shape[0]//2)
-    leftx_base = np.argmax(histogram[:midpoint])
-    rightx_base = np.argmax(histogram[midpoint:]) + midpoint
-
-    # HYPERPARAMETERS
-    # Choose the number of sliding windows
-    nwindows = 9
-    # Set the width of the windows +/- margin
-    margin = 100
-    # Set minimum number of pixels found to recenter window
-    minpix = 50
+    midpoint = np.int64(histogram.shape[-1]//2)
+    leftx_base = np.argmax(histogram[..., :midpoint], axis=-1)
+    rightx_base = np.argmax(histogram[..., midpoint:], axis=-1) + midpoint
+    return leftx_base, rightx_base
+
+def find_lane_pixels_sliding_window(binary_warped, bases=None, index=None,
+                                    nwindows=9, margin=100, minpix=50):
+    """
+    Finds lane pixels using sliding window search.
+    `bases` optionally supplies precomputed (leftx_base, rightx_base) and
+    `index` a RowIndex of `binary_warped` shared with other searches.
+    `nwindows` windows of +/- `margin` pixels are recentered when they hold
+    more than `minpix` pixels.
+    """
+    if bases is None:
+        bases = histogram_bases(binary_warped)
+    leftx_base, rightx_base = bases
 
     # Set height of windows - based on nwindows above and image shape
     window_height = np.int64(binary_warped.shape[0]//nwindows)
     
     # Identify the x and y positions of all nonzero pixels in the image
-    nonzero = binary_warped.nonzero()
-    nonzeroy = np.array(nonzero[0])
-    nonzerox = np.array(nonzero[1])
+    if index is None:
+        index = RowIndex(binary_warped)
+    nonzeroy = index.y
+    nonzerox = index.x
     
     # Current positions to be updated later for each window in nwindows
     leftx_current = leftx_base
@@ -51,10 +62,8 @@ def find_lane_pixels_sliding_window(binary_warped):
         win_xright_high = rightx_current + margin
         
         # Identify the nonzero pixels in x and y within the window #
-        good_left_inds = ((nonzeroy >= win_y_low) & (nonzeroy < win_y_high) & 
-        (nonzerox >= win_xleft_low) & (nonzerox < win_xleft_high)).nonzero()[0]
-        good_right_inds = ((nonzeroy >= win_y_low) & (nonzeroy < win_y_high) & 
-        (nonzerox >= win_xright_low) & (nonzerox < win_xright_high)).nonzero()[0]
+        good_left_inds = index.band(win_y_low, win_y_high, win_xleft_low, win_xleft_high)
+        good_right_inds = index.band(win_y_low, win_y_high, win_xright_low, win_xright_high)
         
         # Append these indices to the lists
         left_lane_inds.append(good_left_inds)
@@ -82,44 +91,49 @@ def find_lane_pixels_sliding_window(binary_warped):
 
     return leftx, lefty, rightx, righty
 
-def fit_polynomial(binary_warped):
+def fit_polynomial(binary_warped, bases=None, index=None, nwindows=9, margin=100, minpix=50):
     """
     Fits a second order polynomial to the lane pixels.
     Returns the polynomial coefficients and the plot values.
     """
     # Find pixels
-    leftx, lefty, rightx, righty = find_lane_pixels_sliding_window(binary_warped)
+    leftx, lefty, rightx, righty = find_lane_pixels_sliding_window(binary_warped, bases, index,
+                                                                   nwindows, margin, minpix)
 
     # Check if we found any pixels
     if len(leftx) == 0 or len(rightx) == 0:
         return None, None, None, None
 
-    # Fit a second order polynomial to each using `np.polyfit`
+    # Fit a second order polynomial to each from the pixels' moments
     # The equation is x = ay^2 + by + c
     try:
-        left_fit = np.polyfit(lefty, leftx, 2)
-        right_fit = np.polyfit(righty, rightx, 2)
+        left_fit, right_fit = fit_lines(binary_warped.shape, leftx, lefty, rightx, righty)
     except TypeError:
          return None, None, None, None
 
     return left_fit, right_fit, (leftx, lefty), (rightx, righty)
 
-def search_around_poly(binary_warped, left_fit, right_fit):
+def search_around_poly(binary_warped, left_fit, right_fit, fallback=True, index=None, margin=100):
     """
     Faster search: uses previous polynomial to search within a margin.
+    If no pixels are found, falls back to the sliding window search,
+    or returns Nones when `fallback` is False.
+    `index` optionally supplies a RowIndex of `binary_warped`.
+    `margin` is a half width in pixels, or a (left, right) pair of them;
+    each may also be an array with one half width per image row.
     """
-    margin = 100
-
-    nonzero = binary_warped.nonzero()
-    nonzeroy = np.array(nonzero[0])
-    nonzerox = np.array(nonzero[1])
-
-    left_lane_inds = ((nonzerox > (left_fit[0]*(nonzeroy**2) + left_fit[1]*nonzeroy + 
-                    left_fit[2] - margin)) & (nonzerox < (left_fit[0]*(nonzeroy**2) + 
-                    left_fit[1]*nonzeroy + left_fit[2] + margin)))
-    right_lane_inds = ((nonzerox > (right_fit[0]*(nonzeroy**2) + right_fit[1]*nonzeroy + 
-                    right_fit[2] - margin)) & (nonzerox < (right_fit[0]*(nonzeroy**2) + 
-                    right_fit[1]*nonzeroy + right_fit[2] + margin)))
+    left_margin, right_margin = margin if isinstance(margin, tuple) else (margin, margin)
+    if index is None:
+        index = RowIndex(binary_warped)
+    nonzeroy = index.y
+    nonzerox = index.x
+
+    # Evaluate the polynomials once per row rather than once per pixel
+    ploty = np.arange(index.height)
+    left_fitx = left_fit[0]*(ploty**2) + left_fit[1]*ploty + left_fit[2]
+    right_fitx = right_fit[0]*(ploty**2) + right_fit[1]*ploty + right_fit[2]
+    left_lane_inds = index.between(left_fitx - left_margin, left_fitx + left_margin)
+    right_lane_inds = index.between(right_fitx - right_margin, right_fitx + right_margin)
     
     # Extract left and right line pixel positions
     leftx = nonzerox[left_lane_inds]
@@ -128,14 +142,33 @@ def search_around_poly(binary_warped, left_fit, right_fit):
     righty = nonzeroy[right_lane_inds]
 
     if len(leftx) == 0 or len(rightx) == 0:
-         return fit_polynomial(binary_warped) # Fallback to sliding window
+         if not fallback:
+             return None, None, None, None
+         # Fallback to sliding window (with windows as wide as the widest search)
+         return fit_polynomial(binary_warped, index=index,
+                               margin=int(np.ceil(np.max([left_margin, right_margin]))))
 
     # Fit new polynomials
-    left_fit = np.polyfit(lefty, leftx, 2)
-    right_fit = np.polyfit(righty, rightx, 2)
+    left_fit, right_fit = fit_lines(binary_warped.shape, leftx, lefty, rightx, righty)
     
     return left_fit, right_fit, (leftx, lefty), (rightx, righty)
 
+def fit_lines(image_shape, leftx, lefty, rightx, righty):
+    """
+    Fits both lane lines in one batched solve of their normal equations,
+    with rows normalized to [-1, 1] over the image height.
+    """
+    half_height = max((image_shape[0] - 1) / 2, 1.0)
+    return poly_fit.fit_many([(leftx, lefty), (rightx, righty)], center=half_height, scale=half_height)
+
+def rescale_fit(fit, sx, sy):
+    """
+    Maps a fit x = ay^2 + by + c to an image scaled by sx in x and sy in y.
+    """
+    if fit is None:
+        return None
+    return np.array([fit[0] * sx / sy**2, fit[1] * sx / sy, fit[2] * sx])
+
 def generate_poly_points(image_shape, left_fit, right_fit):
     """
     Generates x and y values for plotting based on polynomial coefficients.
@@ -18,3 +18,42 @@ def inverse_birdeye(image, src, dst):
     Minv = cv2.getPerspectiveTransform(dst, src)
     unwarped = cv2.warpPerspective(image, Minv, img_size, flags=cv2.INTER_LINEAR)
     return unwarped, Minv
+
+def warp_perspective(image, M, img_size, dst=None):
+    """
+    Bird's-eye warp with a precomputed matrix M to an output of img_size
+    (width, height); the same output as birdeye.
+    """
+    return cv2.warpPerspective(image, M, img_size, dst=dst, flags=cv2.INTER_LINEAR)
+
+def warp(image, map1, map2, dst=None):
+    """
+    Apply precomputed remap tables (see build_undistort_warp_maps).
+    """
+    return cv2.remap(image, map1, map2, cv2.INTER_LINEAR, dst=dst)
+
+def build_undistort_warp_maps(M, img_size, camera_matrix, dist_coeffs):
+    """
+    Fixed-point (CV_16SC2) remap tables that undo the lens distortion and
+    apply the perspective transform M in a single pass. M maps undistorted
+    image pixels to the bird's-eye view; each output pixel samples the raw
+    (distorted) image where the lens puts the undistorted point Minv * pixel.
+    """
+    camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+    # initUndistortRectifyMap maps output pixels through inv(newCameraMatrix)
+    # into normalized camera coordinates: inv(M @ K) = inv(K) @ Minv
+    return cv2.initUndistortRectifyMap(camera_matrix, np.asarray(dist_coeffs, dtype=np.float64), None,
+                                       np.asarray(M, dtype=np.float64) @ camera_matrix, img_size, cv2.CV_16SC2)
+
+def distort_points(points, camera_matrix, dist_coeffs):
+    """
+    Positions in the raw camera image of undistorted pixel positions
+    (N x 2 array), e.g. to draw bird's-eye geometry onto distorted frames.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+    normalized = (points - camera_matrix[:2, 2]) / np.diag(camera_matrix)[:2]
+    rays = np.hstack([normalized, np.ones((len(points), 1))])
+    projected, _ = cv2.projectPoints(rays, np.zeros(3), np.zeros(3), camera_matrix,
+                                     np.asarray(dist_coeffs, dtype=np.float64))
+    return projected.reshape(-1, 2)
@@ -0,0 +1,62 @@
+import numpy as np
+
+class RowIndex:
+    """
+    Row-indexed (CSR-style) store of the nonzero pixels of a binary image.
+
+    Pixels are kept in row-major order, exactly as `binary.nonzero()` returns
+    them, together with a per-row offset table. Queries binary-search each
+    requested row for its column range, so their cost depends on the number
+    of rows and on the number of pixels returned, not on the total pixel count.
+    Query results are indices into `x` / `y`, in row-major order.
+    """
+    def __init__(self, binary):
+        self.height, self.width = binary.shape[:2]
+        # Sorted linear keys let a single searchsorted locate (row, column) pairs;
+        # flatnonzero + divmod is cheaper than nonzero() for the same coordinates
+        self._keys = np.flatnonzero(binary)
+        self.y, self.x = np.divmod(self._keys, self.width)
+        # Row r occupies [row_ptr[r], row_ptr[r+1])
+        self.row_ptr = np.searchsorted(self.y, np.arange(self.height + 1))
+
+    def __len__(self):
+        return len(self.x)
+
+    def row_counts(self):
+        """Number of pixels in each row."""
+        return np.diff(self.row_ptr)
+
+    def band(self, y_low, y_high, x_low, x_high):
+        """
+        Indices of pixels with y_low <= y < y_high and x_low <= x < x_high.
+        """
+        y_low = max(0, int(y_low))
+        y_high = min(self.height, int(y_high))
+        if y_high <= y_low:
+            return np.empty(0, dtype=np.intp)
+        rows = np.arange(y_low, y_high)
+        x_low = min(max(0, int(x_low)), self.width)
+        x_high = min(max(0, int(x_high)), self.width)
+        return self._ranges(rows, np.full(len(rows), x_low), np.full(len(rows), x_high))
+
+    def between(self, lower, upper):
+        """
+        Indices of pixels with lower[y] < x < upper[y] (strict, as floats).
+        `lower` and `upper` hold one bound per image row.
+        """
+        # Smallest integer column above `lower`, first integer column not below `upper`
+        x_low = np.clip(np.floor(lower) + 1, 0, self.width).astype(np.int64)
+        x_high = np.clip(np.ceil(upper), 0, self.width).astype(np.int64)
+        return self._ranges(np.arange(self.height), x_low, x_high)
+
+    def _ranges(self, rows, x_low, x_high):
+        base = rows * self.width
+        lo = np.searchsorted(self._keys, base + x_low)
+        hi = np.searchsorted(self._keys, base + x_high)
+        counts = np.maximum(hi - lo, 0)
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.intp)
+        # Concatenate the ranges [lo, hi) without a Python loop
+        starts = np.cumsum(counts) - counts
+        return np.repeat(lo - starts, counts) + np.arange(total)
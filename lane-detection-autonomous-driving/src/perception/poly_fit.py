@@ -0,0 +1,136 @@
+import numpy as np
+
+# Normal matrices with a larger condition number are treated as singular
+# (fewer than three distinct rows) and fitted with np.polyfit instead
+COND_LIMIT = 1e10
+
+class QuadraticMoments:
+    """
+    Sufficient statistics for a least squares fit of x = a*y^2 + b*y + c.
+
+    Holds the weighted power sums S_k = Σ w*t^k (k = 0..4) and
+    T_k = Σ w*x*t^k (k = 0..2), where t = (y - center) / scale keeps the
+    3x3 normal equations well conditioned. Pixels can be added and removed
+    at any time, so a fit can be refreshed when part of its pixel set
+    changes (e.g. one sliding window) without revisiting the rest.
+    """
+    def __init__(self, center=0.0, scale=1.0):
+        self.center = float(center)
+        self.scale = float(scale)
+        self.s = np.zeros(5)
+        self.t = np.zeros(3)
+
+    @property
+    def count(self):
+        """Total weight accumulated (the pixel count when unweighted)."""
+        return self.s[0]
+
+    def add(self, x, y, weights=None, sign=1.0):
+        """
+        Accumulate pixels at (x, y). Integer rows are reduced to per-row
+        sums first, so the powers are only taken once per row.
+        """
+        x = np.asarray(x)
+        y = np.asarray(y)
+        if len(y) == 0:
+            return self
+        if y.dtype.kind in 'iu' and y.min() >= 0:
+            counts = np.bincount(y, weights=weights)
+            x_sums = np.bincount(y, weights=x if weights is None else x * weights)
+            return self.add_rows(np.arange(len(counts)), counts, x_sums, sign)
+        w = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=np.float64)
+        return self.add_rows(y, w, w * x, sign)
+
+    def remove(self, x, y, weights=None):
+        """Undo a previous add() of the same pixels."""
+        return self.add(x, y, weights, sign=-1.0)
+
+    def add_rows(self, rows, counts, x_sums, sign=1.0):
+        """
+        Accumulate per-row aggregates: `counts[i]` pixels (or total weight)
+        on row `rows[i]` whose x values sum to `x_sums[i]`.
+        """
+        t = (np.asarray(rows, dtype=np.float64) - self.center) / self.scale
+        powers = np.vander(t, 5, increasing=True)
+        self.s += sign * (np.asarray(counts, dtype=np.float64) @ powers)
+        self.t += sign * (np.asarray(x_sums, dtype=np.float64) @ powers[:, :3])
+        return self
+
+    def merge(self, other):
+        """Add the statistics of another accumulator with the same center and scale."""
+        self.s += other.s
+        self.t += other.t
+        return self
+
+    def normal_equations(self):
+        """The 3x3 system (A, rhs) in normalized coordinates, highest power first."""
+        s = self.s
+        A = np.array([[s[4], s[3], s[2]],
+                      [s[3], s[2], s[1]],
+                      [s[2], s[1], s[0]]])
+        return A, self.t[::-1].copy()
+
+    def solve(self):
+        """
+        Coefficients [a, b, c] in pixel coordinates, like np.polyfit(y, x, 2),
+        or None if the system is singular.
+        """
+        A, rhs = self.normal_equations()
+        if not np.linalg.cond(A) < COND_LIMIT:
+            return None
+        return denormalize(np.linalg.solve(A, rhs), self.center, self.scale)
+
+def denormalize(coeffs, center, scale):
+    """Map [A, B, C] of x = A*t^2 + B*t + C, t = (y - center) / scale, back to y."""
+    A, B, C = coeffs[..., 0], coeffs[..., 1], coeffs[..., 2]
+    a = A / scale**2
+    b = B / scale - 2 * a * center
+    c = C - B * center / scale + a * center**2
+    return np.stack([a, b, c], axis=-1)
+
+def default_frame(y):
+    """Center and scale mapping the range of `y` onto [-1, 1]."""
+    low, high = float(np.min(y)), float(np.max(y))
+    return (low + high) / 2, max((high - low) / 2, 1.0)
+
+def fit_quadratic(x, y, weights=None, center=None, scale=None):
+    """
+    Least squares x = a*y^2 + b*y + c from the moments of the pixels.
+
+    Agrees with np.polyfit(y, x, 2, w=sqrt(weights)) to within about 1e-6
+    pixels of x over the fitted rows; fewer than three distinct rows fall
+    back to np.polyfit itself.
+    """
+    return fit_many([(x, y)], None if weights is None else [weights], center, scale)[0]
+
+def fit_many(lines, weights=None, center=None, scale=None):
+    """
+    Fit several lines, given as (x, y) pairs, with one batched 3x3 solve.
+    Returns a list of coefficient arrays (None for lines without pixels).
+    """
+    moments = []
+    for i, (x, y) in enumerate(lines):
+        if len(y) == 0:
+            moments.append(None)
+            continue
+        line_center, line_scale = default_frame(y) if center is None else (center, scale)
+        moments.append(QuadraticMoments(line_center, line_scale).add(
+            x, y, None if weights is None else weights[i]))
+
+    fits = [None] * len(lines)
+    solvable = [i for i, m in enumerate(moments) if m is not None]
+    if not solvable:
+        return fits
+    systems = [moments[i].normal_equations() for i in solvable]
+    A = np.stack([system[0] for system in systems])
+    rhs = np.stack([system[1] for system in systems])
+    well_posed = np.linalg.cond(A) < COND_LIMIT
+    if well_posed.any():
+        solution = np.linalg.solve(A[well_posed], rhs[well_posed][..., None])[..., 0]
+        for coeffs, i in zip(solution, np.asarray(solvable)[well_posed]):
+            fits[i] = denormalize(coeffs, moments[i].center, moments[i].scale)
+    for i in np.asarray(solvable)[~well_posed]:
+        x, y = lines[i]
+        w = None if weights is None else np.sqrt(weights[i])
+        fits[i] = np.polyfit(y, x, 2, w=w)
+    return fits
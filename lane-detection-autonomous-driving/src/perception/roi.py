@@ -23,3 +23,9 @@ def region_of_interest(image, vertices):
     # returning the image only where mask pixels are nonzero
     masked_image = cv2.bitwise_and(image, mask)
     return masked_image
+
+def apply_mask(image, mask):
+    """
+    Applies a precomputed single channel mask (see region_of_interest).
+    """
+    return cv2.bitwise_and(image, image, mask=mask)
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+from src.config import settings
+
+# One pipeline per worker process, created by _init_worker
+_pipeline = None
+
+def discover_clips(source):
+    """
+    List input videos from a directory or a manifest file.
+    A manifest has one video path per line; blank lines and lines starting
+    with '#' are ignored and relative paths are resolved against the manifest.
+    """
+    if os.path.isdir(source):
+        names = sorted(os.listdir(source))
+        return [os.path.join(source, name) for name in names
+                if os.path.splitext(name)[1].lower() in settings.VIDEO_EXTENSIONS]
+
+    base = os.path.dirname(os.path.abspath(source))
+    clips = []
+    with open(source) as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            clips.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return clips
+
+def clip_duration(path):
+    """
+    Clip length in seconds from the container header, or infinity when the
+    header has no frame count (such clips may be long, so they are
+    scheduled first).
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+    finally:
+        cap.release()
+    if frames > 0 and fps > 0:
+        return frames / fps
+    return float('inf')
+
+def output_paths(clip_path, output_dir):
+    """
+    Output video and timing record paths for one clip. The name keeps the
+    input's extension, so a.mp4 and a.avi get different outputs.
+    """
+    stem, ext = os.path.splitext(os.path.basename(clip_path))
+    name = f"{stem}_{ext[1:].lower()}_output" if ext else f"{stem}_output"
+    return os.path.join(output_dir, name + '.mp4'), os.path.join(output_dir, name + '.json')
+
+def check_output_names(clips, output_dir):
+    """
+    Raise ValueError if two clips would write the same output, e.g. clips
+    of the same name in different directories of a manifest. With resume
+    the second one would otherwise be skipped as already done.
+    """
+    owners = {}
+    for clip in clips:
+        video, _ = output_paths(clip, output_dir)
+        if video in owners and owners[video] != clip:
+            raise ValueError(f"{owners[video]} and {clip} would both write {video}; rename one of them")
+        owners[video] = clip
+
+def is_complete(clip_path, output_dir):
+    """A clip is done once both its video and its timing record exist."""
+    video, record = output_paths(clip_path, output_dir)
+    return os.path.exists(video) and os.path.exists(record)
+
+def _init_worker():
+    global _pipeline
+    from src.pipeline.lane_pipeline import LanePipeline
+    # Warmed up here, so a worker's first clip starts at full speed
+    _pipeline = LanePipeline.prewarmed()
+
+def _process_clip(clip_path, output_dir):
+    """
+    Render one clip with the worker's pipeline and write its timing record.
+    The video is written under a temporary name and the record last, so an
+    interrupted clip is never mistaken for a finished one.
+    """
+    from moviepy import VideoFileClip
+
+    video_path, record_path = output_paths(clip_path, output_dir)
+    temp_path = video_path[:-len('.mp4')] + '.part.mp4'
+    frames = 0
+
+    def process(get_frame, t):
+        nonlocal frames
+        frames += 1
+        return _pipeline.process_frame(get_frame(t), timestamp=t)
+
+    start = time.perf_counter()
+    clip = VideoFileClip(clip_path)
+    try:
+        output = clip.transform(process)
+        # moviepy renders the frame at t=0 once while building the clip;
+        # drop that call from the count and the tracking state
+        _pipeline.reset()
+        frames = 0
+        output.write_videofile(temp_path, audio=False, logger=None)
+        duration = clip.duration
+    finally:
+        clip.close()
+    wall = time.perf_counter() - start
+    os.replace(temp_path, video_path)
+
+    record = {
+        'input': clip_path,
+        'output': video_path,
+        'frames': frames,
+        'duration_s': duration,
+        'wall_s': wall,
+        'fps': frames / wall if wall > 0 else 0.0,
+    }
+    with open(record_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    return record
+
+def run_batch(source, output_dir=None, workers=None, resume=True):
+    """
+    Process every clip from `source` (directory or manifest) on a process pool.
+    Clips are scheduled longest first so the pool drains evenly; with
+    `resume`, clips that already have a complete output are skipped.
+    Returns (records, failures) where failures maps clip path to error text.
+    """
+    output_dir = output_dir or settings.BATCH_OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    clips = discover_clips(source)
+    check_output_names(clips, output_dir)
+    if resume:
+        skipped = [clip for clip in clips if is_complete(clip, output_dir)]
+        clips = [clip for clip in clips if clip not in skipped]
+        if skipped:
+            print(f"Skipping {len(skipped)} completed clip(s)")
+    clips.sort(key=clip_duration, reverse=True)
+
+    records, failures = [], {}
+    if not clips:
+        return records, failures
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_process_clip, clip, output_dir): clip for clip in clips}
+        for future in as_completed(futures):
+            clip = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                failures[clip] = repr(e)
+                print(f"FAILED {clip}: {e!r}")
+                continue
+            records.append(record)
+            print(f"Done {clip}: {record['frames']} frames in {record['wall_s']:.1f}s "
+                  f"({record['fps']:.1f} fps) [{len(records) + len(failures)}/{len(clips)}]")
+    return records, failures
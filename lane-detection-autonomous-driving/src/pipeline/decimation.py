@@ -0,0 +1,74 @@
+import numpy as np
+
+class DetectionScheduler:
+    """
+    Adaptive temporal decimation: decides on which frames lane detection
+    runs. Detection runs every `interval` frames, and the tracked fits are
+    carried over on the frames in between.
+
+    The interval starts at 1. After `stable_frames` consecutive stable
+    detections it grows by one per further stable detection, up to
+    `max_interval`. A detection is stable when it was validated, neither
+    line is coasting, the lines moved less than `fit_tolerance` (fraction
+    of the frame width) on every row since the previous detection, and the
+    curvature (1 / radius, in 1/m) changed less than `curvature_tolerance`.
+    Anything else drops the interval straight back to 1.
+    """
+    def __init__(self, max_interval=1, stable_frames=5, fit_tolerance=4 / 1280,
+                 curvature_tolerance=1 / 2000):
+        self.max_interval = max_interval
+        self.stable_frames = stable_frames
+        self.fit_tolerance = fit_tolerance
+        self.curvature_tolerance = curvature_tolerance
+        self.reset()
+
+    def reset(self):
+        """Detect on the next frame and forget the stability history."""
+        self.interval = 1
+        self._since_detection = 0
+        self._stable = 0
+        self._last_fits = None
+        self._last_curvature = None
+
+    def should_detect(self):
+        """
+        True if detection should run on the next frame; otherwise the frame
+        is counted as skipped.
+        """
+        if self._since_detection + 1 >= self.interval:
+            return True
+        self._since_detection += 1
+        return False
+
+    def detected(self, left_fit, right_fit, valid, coasting, curvature, shape):
+        """
+        Report a detection: the fits measured on this frame (frame pixels),
+        whether they passed validation, whether either tracker is coasting,
+        the tracked curvature radius (m) and the frame shape.
+        """
+        self._since_detection = 0
+        fits = None
+        stable = valid and not coasting
+        if stable:
+            fits = np.array([left_fit, right_fit], dtype=np.float64)
+            if self._last_fits is not None:
+                height, width = shape[:2]
+                rows = np.array([0.0, (height - 1) / 2, height - 1])
+                delta = fits - self._last_fits
+                moved = np.abs(delta[:, :1] * rows**2 + delta[:, 1:2] * rows + delta[:, 2:]).max()
+                stable = moved <= self.fit_tolerance * width
+            inverse_radius = 1.0 / curvature if curvature > 0 and np.isfinite(curvature) else 0.0
+            if self._last_curvature is not None:
+                stable = stable and abs(inverse_radius - self._last_curvature) <= self.curvature_tolerance
+            self._last_curvature = inverse_radius
+        else:
+            self._last_curvature = None
+        self._last_fits = fits
+
+        if not stable:
+            self.interval = 1
+            self._stable = 0
+            return
+        self._stable += 1
+        if self._stable >= self.stable_frames:
+            self.interval = min(self.interval + 1, self.max_interval)
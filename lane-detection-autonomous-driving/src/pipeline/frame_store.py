@@ -0,0 +1,170 @@
+import os
+import json
+import hashlib
+import numpy as np
+from src.config import settings
+
+FRAMES_FILE = 'frames.raw'
+TIMESTAMPS_FILE = 'timestamps.npy'
+META_FILE = 'meta.json'     # Written last: a store without it is incomplete
+
+def store_path(source, store_dir=None):
+    """
+    Default store directory for a source video:
+    <FRAME_STORE_DIR>/<clip name>-<hash of its absolute path>, so clips of
+    the same name in different directories get stores of their own.
+    """
+    name = os.path.splitext(os.path.basename(str(source)))[0]
+    location = str(source) if isinstance(source, int) else os.path.abspath(source)
+    digest = hashlib.sha256(location.encode()).hexdigest()[:8]
+    return os.path.join(store_dir or settings.FRAME_STORE_DIR, f"{name}-{digest}")
+
+def _source_signature(source):
+    # Size and modification time of a source file (None for devices)
+    if isinstance(source, int) or not os.path.isfile(source):
+        return None
+    stat = os.stat(source)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+def is_frame_store(path):
+    """True if `path` is a complete frame store directory."""
+    return os.path.isfile(os.path.join(str(path), META_FILE))
+
+def is_current(source, path):
+    """
+    True if `path` holds a complete store decoded from the current `source`
+    file. Never for a source that is not an existing file (a device, or a
+    store built from supplied frames), since there is nothing to compare.
+    """
+    if isinstance(source, int) or not os.path.isfile(source) or not is_frame_store(path):
+        return False
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    return meta.get('source_signature') == _source_signature(source)
+
+def decode_to_store(source, path=None, frames=None):
+    """
+    Decode `source` once into a frame store at `path` (default
+    store_path(source)) and return it as a FrameStore.
+
+    Frames (BGR, as read by cv2.VideoCapture) are appended to one raw file
+    as they are decoded, so memory use does not grow with the clip. All
+    frames must have the same shape. `frames` may supply the
+    (timestamp, frame) iterable instead of decoding `source`.
+    """
+    from src.pipeline.streaming import capture_frames
+    if path is None:
+        path = store_path(source)
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    shape = None
+    timestamps = []
+    frames_path = os.path.join(path, FRAMES_FILE)
+    try:
+        with open(frames_path + '.tmp', 'wb') as f:
+            for timestamp, frame in (capture_frames(source) if frames is None else frames):
+                frame = np.ascontiguousarray(frame, dtype=np.uint8)
+                if shape is None:
+                    shape = frame.shape
+                elif frame.shape != shape:
+                    raise ValueError(f"Frame {len(timestamps)} has shape {frame.shape}, expected {shape}")
+                f.write(frame.data)
+                timestamps.append(timestamp)
+        if shape is None:
+            raise ValueError(f"No frames decoded from {source!r}")
+    except BaseException:
+        os.remove(frames_path + '.tmp')
+        raise
+    os.replace(frames_path + '.tmp', frames_path)
+    np.save(os.path.join(path, TIMESTAMPS_FILE), np.asarray(timestamps, dtype=np.float64))
+
+    timestamps = np.asarray(timestamps)
+    meta = {
+        'source': str(source),
+        'source_signature': _source_signature(source),
+        'count': len(timestamps),
+        'shape': list(shape),
+        'dtype': 'uint8',
+        'color': 'bgr',
+        'fps': float((len(timestamps) - 1) / (timestamps[-1] - timestamps[0]))
+               if len(timestamps) > 1 and timestamps[-1] > timestamps[0] else None,
+    }
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + '.tmp', meta_path)
+    return FrameStore(path)
+
+def open_store(source, path=None):
+    """
+    The FrameStore for `source`, decoding it first unless an up-to-date
+    store already exists. `source` may also be a store directory itself.
+    """
+    if is_frame_store(source):
+        return FrameStore(source)
+    if path is None:
+        path = store_path(source)
+    if is_current(source, path):
+        return FrameStore(path)
+    return decode_to_store(source, path)
+
+class FrameStore:
+    """
+    Decoded frames of one clip, memory-mapped read-only from a raw file.
+
+    `frames` is an N x H x W x 3 uint8 array backed by the file and
+    `timestamps` the N capture times in seconds. Indexing returns views
+    into the mapping (no copy, no decode), so any frame range can be read
+    directly, e.g. by several processes each taking one of split(n).
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.shape = tuple(self.meta['shape'])
+        self.frames = np.memmap(os.path.join(path, FRAMES_FILE), dtype=self.meta['dtype'], mode='r',
+                                shape=(self.meta['count'],) + self.shape)
+        self.timestamps = np.load(os.path.join(path, TIMESTAMPS_FILE), mmap_mode='r')
+        # Identifies this decode of the source (see frame_key)
+        self._identity = hashlib.sha256(json.dumps(self.meta, sort_keys=True).encode()).hexdigest()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    def iter_frames(self, start=0, stop=None):
+        """
+        Generator over (timestamp, frame) for frames [start, stop), like
+        streaming.capture_frames. Frames are read-only views into the store.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        for i in range(start, stop):
+            yield float(self.timestamps[i]), self.frames[i]
+
+    def frame_key(self, index):
+        """
+        Stage cache key of frame `index` (see stage_cache.frame_key), derived
+        from the store's metadata instead of hashing the pixels.
+        """
+        return hashlib.sha256(f"{self._identity}:{index}".encode()).digest()[:20]
+
+    def split(self, parts):
+        """`parts` contiguous (start, stop) ranges covering the store."""
+        bounds = np.linspace(0, len(self), parts + 1).round().astype(int)
+        return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+def frame_source(source, start=0, stop=None):
+    """
+    (timestamp, frame) iterable for a runner: frames from a frame store
+    directory, or decoded from a video file or device otherwise.
+    """
+    if is_frame_store(source):
+        return FrameStore(source).iter_frames(start, stop)
+    from src.pipeline.streaming import capture_frames
+    if start or stop is not None:
+        raise ValueError("Frame ranges need a frame store (see decode_frames.py)")
+    return capture_frames(source)
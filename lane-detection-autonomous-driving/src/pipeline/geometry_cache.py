@@ -0,0 +1,223 @@
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+import cv2
+import numpy as np
+from src.perception import perspective_transform
+
+# Bump when the remap tables' layout or construction changes
+MAP_CACHE_VERSION = 1
+MAP_FILES = ('map1.npy', 'map2.npy', 'crop_map1.npy')
+
+def scale_points(points, width, height):
+    """
+    Scale normalized (x / width, y / height) points to pixel coordinates.
+    """
+    return np.asarray(points, dtype=np.float64) * (width, height)
+
+def camera_matrix(intrinsics, width, height):
+    """
+    3x3 camera matrix from normalized intrinsics (fx, fy, cx, cy), given as
+    fractions of the frame width (fx, cx) and height (fy, cy).
+    """
+    fx, fy, cx, cy = intrinsics
+    return np.array([[fx * width, 0.0, cx * width],
+                     [0.0, fy * height, cy * height],
+                     [0.0, 0.0, 1.0]])
+
+def _densify(polygon, samples=32):
+    # Points along the edges of a closed polygon, so the lens distortion can bend them
+    polygon = np.reshape(polygon, (-1, 2)).astype(np.float64)
+    t = np.arange(samples)[:, None] / samples
+    return np.vstack([a + t * (b - a) for a, b in zip(polygon, np.roll(polygon, -1, axis=0))])
+
+def _maps_key(*parts):
+    description = json.dumps([np.asarray(part).tolist() for part in parts] + [MAP_CACHE_VERSION])
+    return hashlib.sha256(description.encode()).hexdigest()[:40]
+
+def load_warp_maps(map_dir, key):
+    """
+    The (map1, map2, crop_map1) tables stored under `key`, memory-mapped
+    read-only, or None if they have not been saved yet or cannot be read.
+    """
+    path = os.path.join(map_dir, key)
+    if not os.path.isdir(path):
+        return None
+    try:
+        return tuple(np.load(os.path.join(path, name), mmap_mode='r') for name in MAP_FILES)
+    except (OSError, ValueError):
+        return None
+
+def save_warp_maps(map_dir, key, maps):
+    """
+    Store remap tables under `key`. The directory appears complete or not
+    at all, so concurrent processes can build the same tables safely.
+    Returns False if they could not be stored (the caller keeps its
+    in-memory tables).
+    """
+    path = os.path.join(map_dir, key)
+    try:
+        os.makedirs(map_dir, exist_ok=True)
+        temp = tempfile.mkdtemp(prefix=key + '.', suffix='.tmp', dir=map_dir)
+    except OSError:
+        return False
+    try:
+        for name, table in zip(MAP_FILES, maps):
+            np.save(os.path.join(temp, name), table)
+        os.rename(temp, path)
+        return True
+    except OSError:
+        # Another process stored them first, or the disk is full
+        shutil.rmtree(temp, ignore_errors=True)
+        return os.path.isdir(path)
+
+class LaneScale:
+    """
+    Lane detection and measurement parameters in pixels for one resolution,
+    scaled from the normalized settings.
+    """
+    def __init__(self, shape, settings):
+        height, width = shape[:2]
+        self.xm_per_pix = settings.LANE_WIDTH_METERS / (settings.LANE_WIDTH_NORM * width)
+        self.ym_per_pix = settings.LANE_LENGTH_METERS / height
+        self.nwindows = settings.SLIDING_WINDOWS
+        self.margin = max(1, int(round(settings.SEARCH_MARGIN * width)))
+        self.minpix = max(1, int(round(settings.WINDOW_MINPIX * width * height)))
+        self.lane_width_range = (settings.LANE_WIDTH_RANGE[0] * width, settings.LANE_WIDTH_RANGE[1] * width)
+        # Slopes in pixels (dx/dy) scale with width / height
+        self.slope_tolerance = settings.LANE_SLOPE_TOLERANCE * width / height
+
+class FrameGeometry:
+    """
+    Frame-invariant geometry for one input resolution and calibration.
+    Holds the perspective transforms, the ROI mask, the bird's-eye remap
+    tables, the y sample vectors used for polynomial evaluation and
+    (optionally) the LaneScale for this resolution.
+
+    `crop` is the bounding box (x0, y0, x1, y1) of the ROI and the source
+    quad. Nothing outside it survives the ROI mask, so thresholding can be
+    restricted to it; `crop_roi_mask` is the ROI mask for just the crop.
+
+    Without a camera the bird's-eye warp is warpPerspective with `M`, and
+    the remap tables are None. With a calibrated `camera` (camera matrix,
+    distortion coefficients), `src` and `roi_vertices` are positions in the
+    undistorted image. Remap tables (`map1`, `map2`, and `crop_map1` for an
+    image of just the crop) then undistort and warp the raw frame in one
+    pass, and the ROI mask and crop follow the distorted outlines. With
+    `map_dir` the remap tables are saved there once and memory-mapped
+    afterwards.
+    """
+    def __init__(self, shape, src, dst, roi_vertices, lane=None, camera=None, map_dir=None):
+        height, width = shape[:2]
+        self.shape = (height, width)
+        self.lane = lane
+
+        # Perspective transform and its inverse
+        self.M = cv2.getPerspectiveTransform(src, dst)
+        self.Minv = np.linalg.inv(self.M)
+
+        # Lens model for drawing onto raw frames (None: no undistortion)
+        self.camera = camera
+        src_points = np.reshape(src, (-1, 2))
+        if camera is not None:
+            # The ROI and source quad as the lens bends them in the raw frame
+            roi_vertices = [np.int32(np.round(perspective_transform.distort_points(_densify(polygon), *camera)))
+                            for polygon in roi_vertices]
+            src_points = perspective_transform.distort_points(_densify(src), *camera)
+
+        # Single channel ROI mask, filled once
+        self.roi_mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(self.roi_mask, roi_vertices, 255)
+
+        # Crop to the ROI and source quad
+        points = np.vstack([np.reshape(polygon, (-1, 2)) for polygon in roi_vertices] + [src_points])
+        x0, y0 = np.clip(np.floor(points.min(axis=0)), 0, (width, height)).astype(int)
+        x1, y1 = np.clip(np.floor(points.max(axis=0)) + 1, 0, (width, height)).astype(int)
+        self.crop = (int(x0), int(y0), int(x1), int(y1))
+        self.crop_roi_mask = np.ascontiguousarray(self.roi_mask[y0:y1, x0:x1])
+
+        # Fixed-point remap tables for the bird's-eye warp fused with the
+        # undistortion, from map_dir when they were stored before
+        self.map1 = self.map2 = self.crop_map1 = None
+        if camera is not None:
+            key = _maps_key(self.shape, self.M, self.crop, *camera)
+            maps = load_warp_maps(map_dir, key) if map_dir is not None else None
+            if maps is None:
+                maps = self._build_maps(camera)
+                if map_dir is not None:
+                    save_warp_maps(map_dir, key, maps)
+            self.map1, self.map2, self.crop_map1 = maps
+
+        # y sample vectors (one per warped row) and their squares
+        self.ploty = np.linspace(0, height-1, height)
+        self.ploty_sq = self.ploty**2
+
+    def _build_maps(self, camera):
+        height, width = self.shape
+        x0, y0 = self.crop[:2]
+        map1, map2 = perspective_transform.build_undistort_warp_maps(self.M, (width, height), *camera)
+        # Shifting the integer part of the source coordinates is exact; samples
+        # that leave the crop read the zero border, as masked pixels would
+        crop_map1 = np.clip(map1.astype(np.int32) - (x0, y0), -32768, 32767).astype(np.int16)
+        return map1, map2, crop_map1
+
+# Settings FrameGeometry depends on besides the resolution
+GEOMETRY_SETTINGS = (
+    'SRC_POINTS', 'DST_POINTS', 'ROI_VERTICES', 'CAMERA_INTRINSICS', 'DISTORTION_COEFFS', 'WARP_MAP_DIR',
+    'LANE_WIDTH_METERS', 'LANE_WIDTH_NORM', 'LANE_LENGTH_METERS',
+    'SLIDING_WINDOWS', 'SEARCH_MARGIN', 'WINDOW_MINPIX', 'LANE_WIDTH_RANGE', 'LANE_SLOPE_TOLERANCE',
+)
+
+class GeometryCache:
+    """
+    Builds FrameGeometry lazily, scaling the normalized settings to each
+    resolution. Geometries for the last few resolutions are kept (the
+    multi-scale mode uses two per frame); all are rebuilt when one of the
+    GEOMETRY_SETTINGS changes.
+    """
+    def __init__(self, settings, max_entries=4):
+        self.settings = settings
+        self.max_entries = max_entries
+        self._key = None
+        self._geometries = {}
+
+    def _make_key(self):
+        return tuple(np.asarray(getattr(self.settings, name)).tobytes() for name in GEOMETRY_SETTINGS)
+
+    def get(self, shape):
+        """
+        Return the FrameGeometry for an image of the given shape.
+        """
+        key = self._make_key()
+        if key != self._key:
+            self._geometries = {}
+            self._key = key
+        size = (shape[0], shape[1])
+        geometry = self._geometries.get(size)
+        if geometry is None:
+            if len(self._geometries) >= self.max_entries:
+                # Evict the oldest resolution
+                del self._geometries[next(iter(self._geometries))]
+            geometry = self._build(size)
+            self._geometries[size] = geometry
+        return geometry
+
+    def _build(self, size):
+        height, width = size
+        s = self.settings
+        src = np.float32(scale_points(s.SRC_POINTS, width, height))
+        dst = np.float32(scale_points(s.DST_POINTS, width, height))
+        roi_vertices = np.int32(np.round(scale_points(s.ROI_VERTICES, width, height)))
+        camera = None
+        if s.CAMERA_INTRINSICS is not None:
+            camera = (camera_matrix(s.CAMERA_INTRINSICS, width, height),
+                      np.asarray(s.DISTORTION_COEFFS, dtype=np.float64))
+        map_dir = os.path.expanduser(s.WARP_MAP_DIR) if s.WARP_MAP_DIR is not None else None
+        return FrameGeometry(size, src, dst, roi_vertices, LaneScale(size, s), camera, map_dir)
+
+    def clear(self):
+        """Drop the cached geometry."""
+        self._key = None
+        self._geometries = {}
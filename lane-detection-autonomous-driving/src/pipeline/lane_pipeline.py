@@ -1,3 +1,5 @@
+import os
+import time
 import cv2
 import numpy as np
 from src.config import settings
@@ -5,128 +7,596 @@ from src.preprocessing import image_utils
 from src.perception import edge_detection, roi, perspective_transform, lane_detection
 from src.geometry import steering_angle, lane_geometry
 from src.tracking import lane_line
-from src.visualization import overlay
+from src.tracking.kalman_lane_line import KalmanLaneLine
 from src.control.pid_controller import PIDController
+from src.preprocessing.buffer_pool import BufferPool
+from src.preprocessing.tiling import TiledPreprocessor
+from src.pipeline.geometry_cache import GeometryCache
+from src.pipeline.metrics import PipelineMetrics
+from src.pipeline.decimation import DetectionScheduler
+from src.pipeline import telemetry
+from src.perception.pixel_index import RowIndex
 
 class LanePipeline:
-    def __init__(self):
-        self.settings = settings
-        # Initialize LaneLine trackers
-        self.left_lane = lane_line.LaneLine(alpha=0.2)
-        self.right_lane = lane_line.LaneLine(alpha=0.2)
+    def __init__(self, config=None):
+        # `config` may replace the settings module with any object exposing the same names
+        self.settings = config if config is not None else settings
+        # Initialize lane line trackers (settings.LANE_TRACKER); the Kalman
+        # trackers are rebuilt for the actual frame size (see _size_trackers)
+        self._tracker_size = tuple(self.settings.FRAME_SIZE or self.settings.REFERENCE_SIZE)
+        self.left_lane = self._make_tracker(self._tracker_size)
+        self.right_lane = self._make_tracker(self._tracker_size)
         
         # Initialize PID Controller
         self.pid_controller = PIDController(
-            kp=settings.STEERING_KP,
-            ki=settings.STEERING_KI,
-            kd=settings.STEERING_KD
+            kp=self.settings.STEERING_KP,
+            ki=self.settings.STEERING_KI,
+            kd=self.settings.STEERING_KD
         )
 
-    def process_frame(self, frame):
-        # 0. Resize
-        frame = image_utils.resize_image(frame)
+        # Transforms, ROI mask and sample grids, rebuilt only when
+        # the resolution or the geometry settings change
+        self.geometry_cache = GeometryCache(self.settings)
+
+        # Per-pipeline scratch buffers reused across frames
+        self.buffer_pool = BufferPool()
+
+        # Thresholding, ROI masking and warp of one frame split into
+        # horizontal tiles on a thread pool (settings.TILE_THREADS)
+        threads = self.settings.TILE_THREADS or os.cpu_count() or 1
+        self.tiler = TiledPreprocessor(threads, self.buffer_pool) if threads > 1 else None
+
+        # Optional on-disk cache of the thresholded, ROI-masked binaries
+        self.stage_cache = None
+        if self.settings.STAGE_CACHE_DIR is not None:
+            from src.pipeline.stage_cache import StageCache
+            self.stage_cache = StageCache(self.settings.STAGE_CACHE_DIR)
+
+        # Lane area overlay, reused while the smoothed fits hold still
+        # (created on the first drawn frame, see lane_renderer)
+        self._lane_renderer = None
+
+        # Which frames run detection (settings.DETECTION_MAX_INTERVAL)
+        self.scheduler = DetectionScheduler(
+            max_interval=self.settings.DETECTION_MAX_INTERVAL,
+            stable_frames=self.settings.DETECTION_STABLE_FRAMES,
+            fit_tolerance=self.settings.DETECTION_FIT_TOLERANCE,
+            curvature_tolerance=self.settings.DETECTION_CURVATURE_TOLERANCE)
+        # Capture time of the previous frame passed to process_frame
+        self._last_timestamp = None
+
+        # Per-stage latency histograms and event counters (None disables them)
+        self.metrics = PipelineMetrics() if self.settings.METRICS_ENABLED else None
+
+        # Numbers behind the most recent frame (see src/pipeline/telemetry.py)
+        self.last_result = None
+
+    def _make_tracker(self, size):
+        s = self.settings
+        if s.LANE_TRACKER == 'ema':
+            return lane_line.LaneLine(alpha=s.LANE_SMOOTHING_ALPHA, max_lost=s.LANE_MAX_LOST)
+        if s.LANE_TRACKER != 'kalman':
+            raise ValueError(f"Unknown LANE_TRACKER {s.LANE_TRACKER!r}")
+        # The Kalman tracker works in frame pixels of frames of `size` (width, height)
+        width, height = size
+        min_margin, max_margin = s.KALMAN_MARGIN_RANGE
+        return KalmanLaneLine(
+            height=height,
+            process_noise=s.KALMAN_PROCESS_NOISE * width,
+            measurement_noise=s.KALMAN_MEASUREMENT_NOISE * width,
+            margin_sigmas=s.KALMAN_MARGIN_SIGMAS,
+            min_margin=min_margin * width,
+            max_margin=max_margin * width,
+            max_lost=s.LANE_MAX_LOST)
+
+    def _size_trackers(self, shape):
+        """
+        Rebuild the Kalman trackers, whose rows, noise and margins are in
+        frame pixels, when frames of `shape` are not the size they were
+        built for (native-size input with FRAME_SIZE = None, or a stream
+        changing resolution). The track restarts, as its fits are in the
+        old frame's pixels.
+        """
+        size = (shape[1], shape[0])
+        if size != self._tracker_size and self.settings.LANE_TRACKER == 'kalman':
+            self.left_lane = self._make_tracker(size)
+            self.right_lane = self._make_tracker(size)
+        self._tracker_size = size
+
+    def reset(self):
+        """
+        Reset tracking and controller state, e.g. before starting a new clip.
+        """
+        self.left_lane.reset()
+        self.right_lane.reset()
+        self.pid_controller.reset()
+        self.scheduler.reset()
+        self._last_timestamp = None
+        if self._lane_renderer is not None:
+            self._lane_renderer.reset()
+
+    @property
+    def lane_renderer(self):
+        # Visualization is only imported once something is drawn, so
+        # headless processes never load it
+        if self._lane_renderer is None:
+            from src.visualization.lane_renderer import LaneRenderer
+            self._lane_renderer = LaneRenderer(tolerance=self.settings.OVERLAY_REUSE_TOLERANCE)
+        return self._lane_renderer
+
+    @classmethod
+    def prewarmed(cls, config=None, input_shape=None, draw=True):
+        """A new pipeline with warm_up() already done."""
+        pipeline = cls(config)
+        pipeline.warm_up(input_shape, draw)
+        return pipeline
+
+    def warm_up(self, input_shape=None, draw=True):
+        """
+        Pay the one-time costs of the first frame up front: build the
+        geometry (warp maps, ROI mask, sample grids) for frames of
+        `input_shape` (default: settings.FRAME_SIZE, or REFERENCE_SIZE for
+        native-size frames) and run one blank frame through every stage,
+        including the overlay when `draw` is set. Tracking and controller
+        state are reset afterwards; metrics and the stage cache are left
+        untouched.
+        """
+        if input_shape is None:
+            width, height = self.settings.FRAME_SIZE or self.settings.REFERENCE_SIZE
+            input_shape = (height, width, 3)
+        metrics, cache = self.metrics, self.stage_cache
+        self.metrics = self.stage_cache = None
+        try:
+            self.process_frame(np.zeros(input_shape, dtype=np.uint8), draw=draw)
+        finally:
+            self.metrics, self.stage_cache = metrics, cache
+            self.last_result = None
+            self.reset()
+
+    def process_frame(self, frame, dt=None, draw=True, sliding_window_fallback=True, frame_key=None,
+                      timestamp=None):
+        """
+        Run every stage on one frame and return the (annotated) frame.
+        `timestamp` is the frame's capture time in seconds; the PID then
+        receives the real time since the previous frame unless `dt` is
+        given. Frames the scheduler skips (see DETECTION_MAX_INTERVAL) go
+        through propagate() instead of detection.
+        """
+        if timestamp is not None:
+            if dt is None and self._last_timestamp is not None and timestamp > self._last_timestamp:
+                dt = timestamp - self._last_timestamp
+            self._last_timestamp = timestamp
+        if not self.scheduler.should_detect():
+            return self.propagate(frame, dt=dt, draw=draw)
+        frame, warped_edges = self.preprocess(frame, frame_key)
+        return self.process_warped(frame, warped_edges, dt=dt, draw=draw,
+                                   sliding_window_fallback=sliding_window_fallback)
+
+    def output_size(self, input_shape):
+        """
+        (width, height) of the processed frames for inputs of `input_shape`.
+        """
+        if self.settings.FRAME_SIZE is None:
+            return input_shape[1], input_shape[0]
+        return tuple(self.settings.FRAME_SIZE)
+
+    def detection_size(self, input_shape):
+        """
+        (width, height) of the images detection runs on (see settings.DETECTION_SCALE).
+        """
+        width, height = self.output_size(input_shape)
+        scale = self.settings.DETECTION_SCALE
+        return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+    def preprocess(self, frame, frame_key=None):
+        """
+        Stateless stages: resize, thresholding, ROI masking and bird's-eye warp.
+        Returns the resized frame and the warped binary (at the detection size).
+
+        With a stage cache the ROI-masked binary is looked up by `frame_key`
+        (default: stage_cache.frame_key(frame)) and only computed on a miss;
+        the warp, which is cheap and depends on the perspective settings,
+        always runs. With settings.TILE_THREADS > 1 thresholding, masking and
+        the warp are tiled across threads (same output).
+        """
+        t = time.perf_counter()
+
+        # 0. Resize (to the output size and, from the source, to the detection size)
+        size = self.output_size(frame.shape)
+        detection_size = self.detection_size(frame.shape)
+        source = frame
+        frame = image_utils.resize_image(frame, size)
+        detection_frame = frame
+        if detection_size != size:
+            detection_frame = cv2.resize(source, detection_size, interpolation=cv2.INTER_AREA)
+        t = self._lap('resize', t)
 
         # 1. Preprocessing & Edge Detection
         # Use combined thresholding (HLS S-Channel + Sobel X) instead of simple Grayscale + Canny
-        edges = image_utils.combined_threshold(frame)
+        # (fused, allocation-free variant of image_utils.combined_threshold)
+        geometry = self.geometry_cache.get(detection_frame.shape)
+        crop, roi_mask = self._crop(geometry)
+        masked_edges = None
+        # The crop's origin moves with SRC_POINTS, which are not a mask setting
+        cache_extra = {'crop': crop}
+        if self.stage_cache is not None:
+            if frame_key is None:
+                from src.pipeline import stage_cache
+                frame_key = stage_cache.frame_key(source)
+            masked_edges = self.stage_cache.get('mask', frame_key, self.settings, roi_mask.shape, cache_extra)
+            self._count('stage_cache_hits' if masked_edges is not None else 'stage_cache_misses')
+            t = self._lap('stage_cache', t)
+
+        if masked_edges is None and self.tiler is not None:
+            # Threshold and ROI mask in one tiled pass (timed as 'threshold')
+            masked_edges = self.tiler.threshold_mask(detection_frame, roi_mask,
+                                                     self.settings.SOBEL_X_THRESHOLD,
+                                                     self.settings.S_CHANNEL_THRESHOLD, crop=crop)
+            if self.stage_cache is not None:
+                self.stage_cache.put('mask', frame_key, self.settings, masked_edges, cache_extra)
+            t = self._lap('threshold', t)
+        elif masked_edges is None:
+            edges = image_utils.fused_threshold(detection_frame, self.buffer_pool,
+                                                self.settings.SOBEL_X_THRESHOLD,
+                                                self.settings.S_CHANNEL_THRESHOLD, crop=crop)
+            t = self._lap('threshold', t)
 
-        # 3. ROI Masking
-        masked_edges = roi.region_of_interest(edges, [self.settings.ROI_VERTICES])
+            # 3. ROI Masking
+            masked_edges = roi.apply_mask(edges, roi_mask)
+            if self.stage_cache is not None:
+                self.stage_cache.put('mask', frame_key, self.settings, masked_edges, cache_extra)
+            t = self._lap('roi', t)
 
         # 4. Perspective Transform (Bird's Eye)
-        warped_edges, M = perspective_transform.birdeye(masked_edges, self.settings.SRC_POINTS, self.settings.DST_POINTS)
-        Minv = np.linalg.inv(M)
+        warped_edges = self._warp(masked_edges, geometry)
+        self._lap('warp', t)
+        return frame, warped_edges
+
+    def process_batch(self, frames):
+        """
+        Process an N x H x W x 3 uint8 stack of frames.
+        The stateless stages run batched over chunks of the stack (see
+        settings.BATCH_PIXEL_BUDGET), then tracking and PID run in frame order.
+        Returns an N x H x W x 3 stack identical to calling process_frame on
+        each frame in turn. Frames the detection scheduler skips
+        (DETECTION_MAX_INTERVAL) go through propagate(); they are
+        preprocessed with their chunk all the same.
+        """
+        frames = np.asarray(frames)
+        width, height = self.output_size(frames.shape[1:])
+        detection_width, detection_height = self.detection_size(frames.shape[1:])
+        results = np.empty((len(frames), height, width, 3), dtype=np.uint8)
+        chunk = max(1, self.settings.BATCH_PIXEL_BUDGET // (detection_width*detection_height))
+        for start in range(0, len(frames), chunk):
+            resized, warped = self.preprocess_batch(frames[start:start+chunk])
+            left_bases, right_bases = lane_detection.histogram_bases(warped)
+            for i in range(len(resized)):
+                if self.scheduler.should_detect():
+                    results[start+i] = self.process_warped(resized[i], warped[i],
+                                                           bases=(left_bases[i], right_bases[i]))
+                else:
+                    results[start+i] = self.propagate(resized[i])
+        return results
+
+    def preprocess_batch(self, frames):
+        """
+        Batched `preprocess` for an N x H x W x 3 stack.
+        Returns the resized frames and the warped binaries as stacks.
+        """
+        frames = np.asarray(frames)
+        width, height = self.output_size(frames.shape[1:])
+        detection_width, detection_height = self.detection_size(frames.shape[1:])
+        n = max(1, len(frames))
+        t = time.perf_counter()
+
+        # 0. Resize (a copy either way: later stages draw into the frames)
+        if frames.shape[1:3] == (height, width):
+            resized = frames.copy()
+        else:
+            resized = np.empty((len(frames), height, width, 3), dtype=np.uint8)
+            for i, frame in enumerate(frames):
+                resized[i] = image_utils.resize_image(frame, (width, height))
+        detection_frames = resized
+        if (detection_width, detection_height) != (width, height):
+            detection_frames = np.empty((len(frames), detection_height, detection_width, 3), dtype=np.uint8)
+            for i, frame in enumerate(frames):
+                cv2.resize(frame, (detection_width, detection_height), dst=detection_frames[i],
+                           interpolation=cv2.INTER_AREA)
+        t = self._lap('resize', t, n)
+
+        # 1. Thresholding over the whole stack
+        geometry = self.geometry_cache.get(detection_frames.shape[1:])
+        crop, roi_mask = self._crop(geometry)
+        edges = image_utils.batch_threshold(detection_frames, self.buffer_pool,
+                                            self.settings.SOBEL_X_THRESHOLD,
+                                            self.settings.S_CHANNEL_THRESHOLD, crop=crop)
+        t = self._lap('threshold', t, n)
+
+        # 3. ROI Masking, broadcast over the stack
+        np.bitwise_and(edges, roi_mask, out=edges)
+        t = self._lap('roi', t, n)
+
+        # 4. Perspective Transform (Bird's Eye), one warp per frame
+        warped = np.empty((len(edges),) + geometry.shape, dtype=np.uint8)
+        for i in range(len(edges)):
+            self._warp(edges[i], geometry, dst=warped[i])
+        self._lap('warp', t, n)
+        return resized, warped
+
+    def process_warped(self, frame, warped_edges, bases=None, dt=None, draw=True,
+                       sliding_window_fallback=True):
+        """
+        Stateful stages: detection, tracking, geometry, PID and overlay.
+        Takes the output of `preprocess` and returns the annotated frame.
+
+        Args:
+            bases: Optional precomputed histogram line bases for the sliding window.
+            dt: Seconds since the previous processed frame (default settings.FRAME_DT).
+            draw: If False, skip the overlay and return the frame unannotated.
+            sliding_window_fallback: If False, a failed search around the prior
+                fits is reported as a lost frame instead of re-running the
+                full sliding window search.
+        """
+        # Tracking, geometry and the overlay work at the frame's resolution,
+        # detection at the (possibly smaller) resolution of the warped binary
+        geometry = self.geometry_cache.get(frame.shape)
+        detection = self.geometry_cache.get(warped_edges.shape).lane
+        sx = frame.shape[1] / warped_edges.shape[1]
+        sy = frame.shape[0] / warped_edges.shape[0]
+        self._count('frames')
+        self._size_trackers(frame.shape)
+        t = time.perf_counter()
 
         # 5. Lane Detection (Polynomial Fit)
+        # One row index of the lane pixels serves every search on this frame
+        index = RowIndex(warped_edges)
+
         # Check if we have a valid prior track to search around
         left_fit_prior = self.left_lane.get_fit()
         right_fit_prior = self.right_lane.get_fit()
 
         if left_fit_prior is not None and right_fit_prior is not None:
              # Search around previous detection
-             left_fit, right_fit, _, _ = lane_detection.search_around_poly(warped_edges, left_fit_prior, right_fit_prior)
+             left_fit, right_fit, _, _ = lane_detection.search_around_poly(
+                 warped_edges, lane_detection.rescale_fit(left_fit_prior, 1 / sx, 1 / sy),
+                 lane_detection.rescale_fit(right_fit_prior, 1 / sx, 1 / sy),
+                 fallback=False, index=index,
+                 margin=self._search_margins(detection, warped_edges.shape[0], sx, sy))
+             search = telemetry.SEARCH_AROUND if left_fit is not None else telemetry.SEARCH_NONE
+             self._count('search_around_searches')
+             t = self._lap('detection_search_around', t)
+             if left_fit is None and sliding_window_fallback:
+                 # Nothing found around the prior: fall back to the sliding window
+                 left_fit, right_fit, _, _ = lane_detection.fit_polynomial(
+                     warped_edges, index=index, nwindows=detection.nwindows,
+                     margin=detection.margin, minpix=detection.minpix)
+                 search = telemetry.SEARCH_FALLBACK
+                 self._count('sliding_window_searches')
+                 self._count('sliding_window_fallbacks')
+                 t = self._lap('detection_sliding_window', t)
         else:
              # Full sliding window search
-             left_fit, right_fit, _, _ = lane_detection.fit_polynomial(warped_edges)
+             left_fit, right_fit, _, _ = lane_detection.fit_polynomial(
+                 warped_edges, bases, index, detection.nwindows, detection.margin, detection.minpix)
+             search = telemetry.SEARCH_SLIDING_WINDOW
+             self._count('sliding_window_searches')
+             t = self._lap('detection_sliding_window', t)
+
+        # Back to frame coordinates
+        if (sx, sy) != (1.0, 1.0):
+            left_fit = lane_detection.rescale_fit(left_fit, sx, sy)
+            right_fit = lane_detection.rescale_fit(right_fit, sx, sy)
         
         # SANITY CHECK
-        if self.validate_lines(left_fit, right_fit):
+        found = left_fit is not None and right_fit is not None
+        valid = self.validate_lines(left_fit, right_fit, frame.shape)
+        t = self._lap('validation', t)
+        resets = self.left_lane.resets + self.right_lane.resets
+        if valid:
             self.left_lane.update(left_fit)
             self.right_lane.update(right_fit)
         else:
             # If invalid, we ignore ANY new detection and stick to the history
             # (LaneLine.update is NOT called, so it keeps old state or decays confidence)
             # Or we can explicitly tell it "dropped frame"
+            self._count('validation_rejections')
             self.left_lane.update(None)
             self.right_lane.update(None)
-        
+        self._count('lane_resets', self.left_lane.resets + self.right_lane.resets - resets)
+        t = self._lap('tracking', t)
+
+        result = self._finish(frame, geometry, search, found, valid, dt, draw, t)
+
+        # Let the scheduler decide when to detect next
+        coasting = self.left_lane.lost_count > 0 or self.right_lane.lost_count > 0
+        self.scheduler.detected(left_fit, right_fit, valid, coasting, self.last_result['curvature'], frame.shape)
+        return result
+
+    def propagate(self, frame, dt=None, draw=True):
+        """
+        Stateful stages for a frame on which detection is skipped (see
+        DETECTION_MAX_INTERVAL): the tracked fits carry over unchanged and
+        geometry, PID and the overlay run on them as usual.
+        """
+        t = time.perf_counter()
+        frame = image_utils.resize_image(frame, self.output_size(frame.shape))
+        t = self._lap('resize', t)
+        self._count('frames')
+        self._count('detection_skips')
+        return self._finish(frame, self.geometry_cache.get(frame.shape), telemetry.SEARCH_SKIPPED,
+                            False, False, dt, draw, t)
+
+    def _finish(self, frame, geometry, search, found, valid, dt, draw, t):
+        """
+        Geometry, PID and overlay on the tracked fits; sets last_result.
+        """
         # Get smoothed fits for visualization and geometry
         best_left = self.left_lane.get_fit()
         best_right = self.right_lane.get_fit()
+        Minv = geometry.Minv
 
         # 6. Geometry & Steering
         # Calculate offset in pixels at the bottom of the image
-        offset = steering_angle.calculate_vehicle_offset(frame.shape[1], best_left, best_right, frame.shape[0], self.settings.XM_PER_PIX)
-        
-        # PID Control Update
-        # Assuming 30 FPS, dt = 1/30 approx 0.033
-        st_angle = self.pid_controller.update(offset, dt=0.033)
+        lane = geometry.lane
+        offset = steering_angle.calculate_vehicle_offset(frame.shape[1], best_left, best_right, frame.shape[0], lane.xm_per_pix)
         
         # Calculate Curvature
-        left_curverad, right_curverad = lane_geometry.measure_curvature_real(best_left, best_right, frame.shape[0], self.settings.XM_PER_PIX, self.settings.YM_PER_PIX)
+        left_curverad, right_curverad = lane_geometry.measure_curvature_real(best_left, best_right, frame.shape[0], lane.xm_per_pix, lane.ym_per_pix)
         avg_curvature = (left_curverad + right_curverad) / 2
+        t = self._lap('geometry', t)
+        
+        # PID Control Update
+        # Without timestamps assume a fixed frame interval (30 FPS, dt = 1/30 approx 0.033)
+        if dt is None:
+            dt = self.settings.FRAME_DT
+        st_angle = self.pid_controller.update(offset, dt=dt)
+        t = self._lap('pid', t)
         
         # Confidence logic
         if self.left_lane.lost_count > 0 or self.right_lane.lost_count > 0:
             confidence_text = "Tracking (Coast)"
             color = (0, 165, 255) # Orange
+            confidence = telemetry.CONFIDENCE_COAST
         else:
             confidence_text = "High Confidence"
             color = (0, 255, 0)   # Green
+            confidence = telemetry.CONFIDENCE_HIGH
+        if best_left is None or best_right is None:
+            confidence = telemetry.CONFIDENCE_NONE
+
+        self.last_result = {
+            'left_fit': best_left,
+            'right_fit': best_right,
+            'offset': offset,
+            'curvature': avg_curvature,
+            'steering': st_angle,
+            'confidence': confidence,
+            'search': search,
+            'found': found,
+            'valid': valid,
+        }
+
+        if not draw:
+            return frame
 
         # 7. Visualization
-        # Draw the filled lane area using the smoothed fits
-        result = overlay.draw_lane_area(frame, warped_edges, best_left, best_right, Minv)
+        from src.visualization import overlay
+        # Draw the filled lane area using the smoothed fits (into the frame)
+        reuses = self.lane_renderer.reuses
+        result = self.lane_renderer.draw(frame, best_left, best_right, Minv, geometry.ploty, geometry.camera)
+        self._count('overlay_reuses', self.lane_renderer.reuses - reuses)
         
         # Add Text with curvature
         result = overlay.draw_info(result, st_angle, offset, avg_curvature, confidence_text, color)
+        self._lap('overlay', t)
         
         return result
 
-    def validate_lines(self, left_fit, right_fit):
+    def _search_margins(self, detection, height, sx, sy):
+        """
+        Search-around margin at the detection resolution: the trackers'
+        per-row (left, right) margins when they provide them, otherwise
+        the fixed margin of `detection`.
+        """
+        rows = np.arange(height) * sy
+        left_margin = self.left_lane.search_margin(rows)
+        right_margin = self.right_lane.search_margin(rows)
+        if left_margin is None or right_margin is None:
+            return detection.margin
+        return left_margin / sx, right_margin / sx
+
+    def _crop(self, geometry):
+        """
+        (crop, roi_mask) for the stateless stages: the ROI crop and its mask
+        with settings.CROP_TO_ROI, the whole frame otherwise.
+        """
+        if self.settings.CROP_TO_ROI:
+            return geometry.crop, geometry.crop_roi_mask
+        return None, geometry.roi_mask
+
+    def _warp(self, masked_edges, geometry, dst=None):
+        """
+        Bird's-eye warp of the ROI-masked binary (of its crop with
+        settings.CROP_TO_ROI).
+        With a calibrated camera this is the remap fused with the
+        undistortion, tiled by output rows when tiling is on. Otherwise it is
+        warpPerspective with the cached matrix; a crop is first put back into
+        a zero frame, so the result is exactly that of the full masked frame
+        (warping the crop with a shifted matrix rounds differently).
+        """
+        if geometry.map1 is not None:
+            map1 = geometry.crop_map1 if masked_edges.shape != geometry.shape else geometry.map1
+            if self.tiler is not None:
+                return self.tiler.warp(masked_edges, map1, geometry.map2, dst=dst)
+            return perspective_transform.warp(masked_edges, map1, geometry.map2, dst=dst)
+        if masked_edges.shape != geometry.shape:
+            x0, y0, x1, y1 = geometry.crop
+            masked = self.buffer_pool.get('warp.masked', geometry.shape, np.uint8)
+            masked[:y0] = 0
+            masked[y1:] = 0
+            masked[y0:y1, :x0] = 0
+            masked[y0:y1, x1:] = 0
+            masked[y0:y1, x0:x1] = masked_edges
+            masked_edges = masked
+        height, width = geometry.shape
+        return perspective_transform.warp_perspective(masked_edges, geometry.M, (width, height), dst=dst)
+
+    def _lap(self, stage, start, frames=1):
+        """
+        Record the time since `start` for `stage` (split evenly over `frames`
+        for batched stages) and return the current time.
+        """
+        now = time.perf_counter()
+        if self.metrics is not None:
+            elapsed = (now - start) / frames
+            for _ in range(frames):
+                self.metrics.observe(stage, elapsed)
+        return now
+
+    def _count(self, counter, amount=1):
+        if self.metrics is not None and amount:
+            self.metrics.increment(counter, amount)
+
+    def validate_lines(self, left_fit, right_fit, shape=None):
         """
         Checks if the detected lines are valid lanes.
+        `shape` is the (height, width) of the image the fits belong to
+        (default: settings.REFERENCE_SIZE); the limits scale with it.
         """
         if left_fit is None or right_fit is None:
             return False
+        if shape is None:
+            shape = self.settings.REFERENCE_SIZE[::-1]
+        lane = self.geometry_cache.get(shape).lane
+        bottom = shape[0] - 1
+        middle = shape[0] // 2
+        min_width, max_width = lane.lane_width_range
 
         # Check 1: Calculate Lane Width at bottom and middle
-        # We expect around 700 pixels (roughly) based on settings.
-        # Let's say valid is 500 to 900.
-        ploty = np.linspace(0, 719, 720)
-        
+        # We expect around settings.LANE_WIDTH_NORM of the width (700 px at 1280)
+        # and accept settings.LANE_WIDTH_RANGE (500 to 900 px at 1280).
         # Bottom
-        left_x_bottom = left_fit[0]*719**2 + left_fit[1]*719 + left_fit[2]
-        right_x_bottom = right_fit[0]*719**2 + right_fit[1]*719 + right_fit[2]
+        left_x_bottom = left_fit[0]*bottom**2 + left_fit[1]*bottom + left_fit[2]
+        right_x_bottom = right_fit[0]*bottom**2 + right_fit[1]*bottom + right_fit[2]
         lane_width_bottom = right_x_bottom - left_x_bottom
 
         # Middle
-        left_x_mid = left_fit[0]*360**2 + left_fit[1]*360 + left_fit[2]
-        right_x_mid = right_fit[0]*360**2 + right_fit[1]*360 + right_fit[2]
+        left_x_mid = left_fit[0]*middle**2 + left_fit[1]*middle + left_fit[2]
+        right_x_mid = right_fit[0]*middle**2 + right_fit[1]*middle + right_fit[2]
         lane_width_mid = right_x_mid - left_x_mid
 
-        if not (500 < lane_width_bottom < 900):
+        if not (min_width < lane_width_bottom < max_width):
             return False
-        if not (500 < lane_width_mid < 900):
+        if not (min_width < lane_width_mid < max_width):
             return False
 
         # Check 2: Parallelism (similar slopes)
         # derivative = 2*A*y + B
         # Evaluate slope at middle
-        left_slope = 2*left_fit[0]*360 + left_fit[1]
-        right_slope = 2*right_fit[0]*360 + right_fit[1]
+        left_slope = 2*left_fit[0]*middle + left_fit[1]
+        right_slope = 2*right_fit[0]*middle + right_fit[1]
         
-        if abs(left_slope - right_slope) > 0.5: # Tune this threshold
+        if abs(left_slope - right_slope) > lane.slope_tolerance: # settings.LANE_SLOPE_TOLERANCE
             return False
             
         return True
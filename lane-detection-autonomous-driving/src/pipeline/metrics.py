@@ -0,0 +1,106 @@
+import json
+import numpy as np
+
+STAGES = (
+    'resize', 'stage_cache', 'threshold', 'roi', 'warp',
+    'detection_sliding_window', 'detection_search_around',
+    'validation', 'tracking', 'geometry', 'pid', 'overlay',
+)
+
+COUNTERS = (
+    'frames',
+    'sliding_window_searches',
+    'search_around_searches',
+    'sliding_window_fallbacks',
+    'validation_rejections',
+    'lane_resets',
+    'overlay_reuses',
+    'stage_cache_hits',
+    'stage_cache_misses',
+    'detection_skips',
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+class StageHistogram:
+    """
+    Rolling window of the most recent latency samples of one stage,
+    plus lifetime count and sum.
+    """
+    def __init__(self, window):
+        self._samples = np.zeros(window)
+        self._next = 0
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self._samples[self._next] = seconds
+        self._next = (self._next + 1) % len(self._samples)
+        self.count += 1
+        self.total += seconds
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Quantiles over the rolling window (zeros before the first sample)."""
+        filled = self._samples[:min(self.count, len(self._samples))]
+        if len(filled) == 0:
+            return [0.0] * len(quantiles)
+        return list(np.quantile(filled, quantiles))
+
+class PipelineMetrics:
+    """
+    Per-stage latency histograms and event counters for LanePipeline.
+    Recording is a couple of array writes per stage, so it can stay on in
+    production; quantiles are only computed on export.
+    """
+    def __init__(self, window=1024):
+        self.window = window
+        self.stages = {stage: StageHistogram(window) for stage in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def observe(self, stage, seconds):
+        self.stages[stage].observe(seconds)
+
+    def increment(self, counter, amount=1):
+        self.counters[counter] += amount
+
+    def snapshot(self):
+        """
+        Plain dict of all metrics: per stage count, mean and p50/p95/p99
+        (seconds, over the rolling window), and the counters.
+        """
+        stages = {}
+        for stage, histogram in self.stages.items():
+            p50, p95, p99 = histogram.quantiles()
+            stages[stage] = {
+                'count': histogram.count,
+                'mean': histogram.total / histogram.count if histogram.count else 0.0,
+                'p50': p50,
+                'p95': p95,
+                'p99': p99,
+            }
+        return {'window': self.window, 'stages': stages, 'counters': dict(self.counters)}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix='lane_pipeline'):
+        """Prometheus text exposition format (stage latencies as summaries)."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Per-stage processing latency.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, histogram in self.stages.items():
+            for quantile, value in zip(QUANTILES, histogram.quantiles()):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {value:.9f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.9f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        for counter, value in self.counters.items():
+            lines.append(f"# TYPE {prefix}_{counter}_total counter")
+            lines.append(f"{prefix}_{counter}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write to `path`: Prometheus text for *.prom, JSON otherwise."""
+        text = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        with open(path, 'w') as f:
+            f.write(text)
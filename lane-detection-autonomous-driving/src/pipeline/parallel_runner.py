@@ -0,0 +1,251 @@
+import os
+import queue
+import threading
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from src.config import settings
+
+class SharedFrameRing:
+    """
+    A fixed number of fixed-shape array slots in one shared memory block.
+    Processes exchange slot indices instead of pickled frames.
+    """
+    def __init__(self, slots, shape, dtype=np.uint8, name=None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = slots * int(np.prod(self.shape)) * self.dtype.itemsize
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self._array = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self._shm.buf)
+
+    @property
+    def spec(self):
+        """Arguments needed to attach to this ring from another process."""
+        return (self.slots, self.shape, self.dtype.str, self._shm.name)
+
+    @classmethod
+    def attach(cls, spec):
+        slots, shape, dtype, name = spec
+        return cls(slots, shape, dtype, name=name)
+
+    def __getitem__(self, slot):
+        return self._array[slot]
+
+    def close(self):
+        """Detach; the creating process also frees the shared memory."""
+        self._array = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+def _stage_worker(input_spec, frame_spec, warped_spec, tasks, done, config=None):
+    """
+    Worker process: runs LanePipeline.preprocess (with `config`, default the
+    settings module) on frames in the input ring and writes the resized
+    frame and warped binary into the output rings.
+    """
+    # Imported here so spawned workers build their own pipeline
+    from src.pipeline.lane_pipeline import LanePipeline
+    input_ring = SharedFrameRing.attach(input_spec)
+    # Warm up on the input shape while the first frames are being decoded
+    pipeline = LanePipeline.prewarmed(config, input_shape=input_ring.shape, draw=False)
+    frame_ring = SharedFrameRing.attach(frame_spec)
+    warped_ring = SharedFrameRing.attach(warped_spec)
+    try:
+        while True:
+            item = tasks.get()
+            if item is None:
+                break
+            seq, slot = item
+            try:
+                frame, warped = pipeline.preprocess(input_ring[slot])
+                frame_ring[slot][...] = frame
+                warped_ring[slot][...] = warped
+                done.put((seq, slot, None))
+            except Exception:
+                done.put((seq, slot, traceback.format_exc()))
+    finally:
+        input_ring.close()
+        frame_ring.close()
+        warped_ring.close()
+
+class ParallelVideoRunner:
+    """
+    Staged video runner.
+
+    - A decode thread copies source frames into a shared memory ring.
+    - A pool of worker processes runs the stateless stages
+      (resize, thresholding, ROI, bird's-eye warp).
+    - The calling thread reassembles results in frame order and runs the
+      stateful stages (detection, LaneLine tracking, PID, overlay) on `pipeline`.
+    - An encode thread hands finished frames to the sink.
+
+    The number of shared memory slots bounds the frames in flight, so a slow
+    stage back-pressures the decoder. Output is frame-identical to calling
+    `pipeline.process_frame` serially, including the frames the detection
+    scheduler skips (DETECTION_MAX_INTERVAL). Those frames are still
+    preprocessed by the workers, since whether a frame is skipped is only
+    known once the frame before it has been detected.
+    """
+    def __init__(self, pipeline, workers=None, queue_depth=None):
+        self.pipeline = pipeline
+        if workers is None:
+            workers = settings.PARALLEL_WORKERS
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_depth = queue_depth or settings.PARALLEL_QUEUE_DEPTH
+
+    def run(self, frames, input_shape, sink, dt=None):
+        """
+        Process an iterable of frames of `input_shape` (H, W, 3) and pass each
+        annotated frame, in order, to `sink`. `dt` is the time between frames
+        given to the PID (default settings.FRAME_DT). Returns the number of frames.
+        """
+        width, height = self.pipeline.output_size(input_shape)
+        detection_width, detection_height = self.pipeline.detection_size(input_shape)
+        slots = self.queue_depth
+        ctx = mp.get_context()
+
+        input_ring = SharedFrameRing(slots, input_shape)
+        frame_ring = SharedFrameRing(slots, (height, width, 3))
+        warped_ring = SharedFrameRing(slots, (detection_height, detection_width))
+        tasks = ctx.Queue()
+        done = ctx.Queue()
+
+        free_slots = queue.Queue()
+        for slot in range(slots):
+            free_slots.put(slot)
+        encode_queue = queue.Queue(maxsize=slots)
+        stop = threading.Event()
+        errors = []
+
+        # The workers preprocess with the pipeline's own settings; the
+        # settings module itself cannot be pickled, workers import it
+        config = None if self.pipeline.settings is settings else self.pipeline.settings
+        workers = [ctx.Process(target=_stage_worker, daemon=True,
+                               args=(input_ring.spec, frame_ring.spec, warped_ring.spec, tasks, done, config))
+                   for _ in range(self.workers)]
+        for worker in workers:
+            worker.start()
+
+        def decode():
+            count = 0
+            try:
+                for frame in frames:
+                    slot = self._take_slot(free_slots, stop)
+                    if slot is None:
+                        return
+                    if frame.shape != input_ring.shape:
+                        raise ValueError(f"Frame shape {frame.shape} does not match {input_ring.shape}")
+                    input_ring[slot][...] = frame
+                    tasks.put((count, slot))
+                    count += 1
+            except Exception:
+                done.put((None, None, traceback.format_exc()))
+            finally:
+                # End of stream marker carries the frame count
+                done.put((None, count, None))
+
+        def encode():
+            while True:
+                item = encode_queue.get()
+                if item is None:
+                    return
+                result, slot = item
+                try:
+                    if not errors:
+                        sink(result)
+                except Exception:
+                    errors.append(traceback.format_exc())
+                    stop.set()
+                free_slots.put(slot)
+
+        decoder = threading.Thread(target=decode, daemon=True)
+        encoder = threading.Thread(target=encode, daemon=True)
+        decoder.start()
+        encoder.start()
+
+        pending = {}
+        result = None
+        next_seq = 0
+        total = None
+        try:
+            while (total is None or next_seq < total) and not errors:
+                try:
+                    seq, slot, error = done.get(timeout=1.0)
+                except queue.Empty:
+                    if any(worker.exitcode not in (None, 0) for worker in workers):
+                        errors.append("A worker process exited unexpectedly")
+                    continue
+                if error is not None:
+                    errors.append(error)
+                    break
+                if seq is None:
+                    total = slot
+                    continue
+                pending[seq] = slot
+                # Stateful stages strictly in frame order
+                while next_seq in pending:
+                    slot = pending.pop(next_seq)
+                    if self.pipeline.scheduler.should_detect():
+                        result = self.pipeline.process_warped(frame_ring[slot], warped_ring[slot], dt=dt)
+                    else:
+                        result = self.pipeline.propagate(frame_ring[slot], dt=dt)
+                    encode_queue.put((result, slot))
+                    next_seq += 1
+        finally:
+            # Drop the last view into the rings before they are closed
+            result = None
+            stop.set()
+            encode_queue.put(None)
+            encoder.join()
+            for _ in workers:
+                tasks.put(None)
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+            decoder.join(timeout=5)
+            input_ring.close()
+            frame_ring.close()
+            warped_ring.close()
+
+        if errors:
+            raise RuntimeError(f"Parallel pipeline failed:\n{errors[0]}")
+        return next_seq
+
+    @staticmethod
+    def _take_slot(free_slots, stop):
+        while not stop.is_set():
+            try:
+                return free_slots.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+def run_video(input_path, output_path, workers=None, queue_depth=None, pipeline=None):
+    """
+    Parallel equivalent of run.py: read `input_path`, write the annotated
+    video to `output_path`. `pipeline` runs the stateful stages (a new
+    LanePipeline by default).
+    """
+    from moviepy import VideoFileClip
+    from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+    from src.pipeline.lane_pipeline import LanePipeline
+
+    pipeline = pipeline or LanePipeline()
+    clip = VideoFileClip(input_path)
+    input_shape = (clip.size[1], clip.size[0], 3)
+    writer = FFMPEG_VideoWriter(output_path, pipeline.output_size(input_shape), clip.fps)
+    try:
+        runner = ParallelVideoRunner(pipeline, workers, queue_depth)
+        return runner.run(clip.iter_frames(), input_shape, writer.write_frame, dt=1.0 / clip.fps)
+    finally:
+        writer.close()
+        clip.close()
@@ -0,0 +1,317 @@
+import json
+import time
+import struct
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from src.config import settings
+from src.perception import lane_detection
+
+# Wire format, both directions: (header length, payload length) as two
+# big-endian uint32, a JSON header, then the payload bytes.
+# Request header: {'id', 'stream' (string or integer), 'timestamp' (optional,
+# seconds), 'overlay' (bool)}; payload: one frame in any format cv2.imdecode
+# reads (JPEG, PNG, ...). Malformed requests get an error response.
+# Response header: {'id', 'stream', 'left_fit', 'right_fit', 'offset',
+# 'curvature', 'steering', 'confidence', 'search', 'found', 'valid', 'batch_size',
+# 'latency'} or {'id', 'stream', 'error'}; payload: the JPEG overlay frame
+# if requested, else empty.
+FRAME_HEADER = struct.Struct('>II')
+
+async def read_message(reader):
+    """
+    Read one (header, payload) message; raises IncompleteReadError at EOF and
+    ValueError for a header that is not JSON. The whole message is read
+    before the header is decoded, so the next message can still be read.
+    """
+    header_size, payload_size = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    header = await reader.readexactly(header_size)
+    payload = await reader.readexactly(payload_size) if payload_size else b''
+    return json.loads(header), payload
+
+def write_message(writer, header, payload=b''):
+    """Queue one (header, payload) message on a StreamWriter."""
+    data = json.dumps(header).encode()
+    writer.writelines([FRAME_HEADER.pack(len(data), len(payload)), data, payload])
+
+def _request_error(header):
+    # Why a request header cannot be processed, or None if it can
+    if not isinstance(header, dict):
+        return "request header is not an object"
+    stream = header.get('stream', 0)
+    if isinstance(stream, bool) or not isinstance(stream, (str, int)):
+        return "stream must be a string or an integer"
+    timestamp = header.get('timestamp')
+    if timestamp is not None and (isinstance(timestamp, bool) or not isinstance(timestamp, (int, float))):
+        return "timestamp must be a number"
+    return None
+
+def _error_header(header, message):
+    # Error response for any request header, well-formed or not
+    if not isinstance(header, dict):
+        return {'id': None, 'stream': None, 'error': message}
+    return {'id': header.get('id'), 'stream': header.get('stream'), 'error': message}
+
+def _result_header(result):
+    # LanePipeline.last_result as JSON-friendly values
+    header = {}
+    for key, value in result.items():
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        elif isinstance(value, np.generic):
+            value = value.item()
+        header[key] = value
+    return header
+
+class LaneService:
+    """
+    asyncio frame-processing service around LanePipeline.
+
+    Requests from all connections go into one queue. A batcher takes the
+    first waiting request and collects more until it has `max_batch` of them
+    or `max_wait` seconds have passed; while a batch is being processed new
+    requests pile up, so batches grow with the load. Each batch runs the
+    stateless stages batched per frame shape (preprocess_batch on a shared
+    pipeline), then the stateful stages request by request in arrival order
+    on each stream's own pipeline. Batches run one at a time on a single
+    worker thread, so every stream's frames are tracked in order.
+
+    Responses on a connection come back in request order, and a client
+    may pipeline requests without waiting for the answers. At most
+    `max_streams` streams keep their trackers; a new stream beyond that
+    drops the least recently used one, which starts afresh if it returns.
+    """
+    def __init__(self, pipeline_factory=None, max_batch=None, max_wait=None, queue_size=None,
+                 jpeg_quality=None, max_streams=None):
+        if pipeline_factory is None:
+            from src.pipeline.lane_pipeline import LanePipeline
+            pipeline_factory = LanePipeline
+        self.pipeline_factory = pipeline_factory
+        self.max_batch = max_batch or settings.SERVICE_MAX_BATCH
+        self.max_wait = settings.SERVICE_MAX_WAIT if max_wait is None else max_wait
+        self.queue_size = queue_size or settings.SERVICE_QUEUE_SIZE
+        self.jpeg_quality = jpeg_quality or settings.SERVICE_JPEG_QUALITY
+        self.max_streams = max_streams or settings.SERVICE_MAX_STREAMS
+
+        # Stateless stages for every stream; trackers and PID per stream,
+        # least recently used first
+        self.stateless = pipeline_factory()
+        self.streams = {}
+        self._last_timestamps = {}
+
+        self.requests = 0
+        self.batches = 0
+        self._queue = None
+        self._batcher = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def start(self, host=None, port=None, path=None):
+        """
+        Start listening on a Unix socket at `path`, or on TCP host:port
+        (default settings.SERVICE_HOST / SERVICE_PORT). Returns the server.
+        """
+        self._queue = asyncio.Queue(self.queue_size)
+        self._batcher = asyncio.create_task(self._run_batches())
+        if path is not None:
+            return await asyncio.start_unix_server(self._handle, path=path)
+        return await asyncio.start_server(
+            self._handle,
+            settings.SERVICE_HOST if host is None else host,
+            settings.SERVICE_PORT if port is None else port)
+
+    async def stop(self):
+        """Stop the batcher (after start(); close the server first)."""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        self._executor.shutdown()
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        responses = asyncio.Queue()
+        sender = asyncio.create_task(self._send(responses, writer))
+        try:
+            while True:
+                try:
+                    header, payload = await read_message(reader)
+                    error = _request_error(header)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except ValueError:
+                    header, error = None, "request header is not valid JSON"
+                future = loop.create_future()
+                await responses.put(future)
+                if error is not None:
+                    # Answered here, in order with the connection's other requests
+                    future.set_result((_error_header(header, error), b''))
+                    continue
+                await self._queue.put((header, payload, future, time.perf_counter()))
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+
+    async def _send(self, responses, writer):
+        while True:
+            future = await responses.get()
+            if future is None:
+                break
+            header, payload = await future
+            write_message(writer, header, payload)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                break
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                responses = await loop.run_in_executor(self._executor, self.process_batch, batch)
+            except Exception as exc:
+                responses = [(_error_header(header, str(exc)), b'') for header, _, _, _ in batch]
+            for (_, _, future, _), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    def process_batch(self, batch):
+        """
+        Process a list of (header, payload, future, arrival time) requests.
+        Returns one (header, payload) response per request.
+        """
+        self.batches += 1
+        self.requests += len(batch)
+        responses = [None] * len(batch)
+        frames = [None] * len(batch)
+        for i, (header, payload, _, _) in enumerate(batch):
+            frame = None
+            if payload:
+                frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                responses[i] = (_error_header(header, "could not decode frame"), b'')
+            frames[i] = frame
+
+        # Stateless stages, batched per frame shape
+        prepared = {}
+        groups = {}
+        for i, frame in enumerate(frames):
+            if frame is not None:
+                groups.setdefault(frame.shape, []).append(i)
+        for indices in groups.values():
+            resized, warped = self.stateless.preprocess_batch(np.stack([frames[i] for i in indices]))
+            left_bases, right_bases = lane_detection.histogram_bases(warped)
+            for j, i in enumerate(indices):
+                prepared[i] = (resized[j], warped[j], (left_bases[j], right_bases[j]))
+
+        # Stateful stages in arrival order
+        for i, (header, _, _, arrived) in enumerate(batch):
+            if i not in prepared:
+                continue
+            resized, warped, bases = prepared[i]
+            stream = header.get('stream', 0)
+            pipeline = self._stream_pipeline(stream)
+
+            timestamp = header.get('timestamp')
+            last_timestamp = self._last_timestamps.get(stream)
+            dt = None
+            if timestamp is not None and last_timestamp is not None and timestamp > last_timestamp:
+                dt = timestamp - last_timestamp
+            self._last_timestamps[stream] = timestamp
+
+            overlay = bool(header.get('overlay', False))
+            # Frames the stream's detection scheduler skips carry the tracked fits over
+            if pipeline.scheduler.should_detect():
+                output = pipeline.process_warped(resized, warped, bases=bases, dt=dt, draw=overlay)
+            else:
+                output = pipeline.propagate(resized, dt=dt, draw=overlay)
+            response = _result_header(pipeline.last_result)
+            response.update(id=header.get('id'), stream=stream, batch_size=len(batch),
+                            latency=time.perf_counter() - arrived)
+            payload = b''
+            if overlay:
+                payload = cv2.imencode('.jpg', output, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])[1].tobytes()
+            responses[i] = (response, payload)
+        return responses
+
+    def _stream_pipeline(self, stream):
+        # The stream's pipeline, now the most recently used; creating one
+        # beyond max_streams drops the least recently used stream
+        pipeline = self.streams.pop(stream, None)
+        if pipeline is None:
+            pipeline = self.pipeline_factory()
+            while len(self.streams) >= self.max_streams:
+                dropped = next(iter(self.streams))
+                del self.streams[dropped]
+                self._last_timestamps.pop(dropped, None)
+        self.streams[stream] = pipeline
+        return pipeline
+
+class LaneClient:
+    """
+    Client for LaneService. send() and receive() may be used independently
+    to keep several requests in flight; process() does one round trip.
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._next_id = 0
+
+    @classmethod
+    async def connect(cls, host=None, port=None, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(
+                settings.SERVICE_HOST if host is None else host,
+                settings.SERVICE_PORT if port is None else port)
+        return cls(reader, writer)
+
+    async def send(self, stream, frame, timestamp=None, overlay=False):
+        """
+        Send a frame (a BGR image, or bytes already encoded) and return its request id.
+        """
+        if isinstance(frame, np.ndarray):
+            frame = cv2.imencode('.jpg', frame)[1].tobytes()
+        request_id = self._next_id
+        self._next_id += 1
+        write_message(self.writer, {'id': request_id, 'stream': stream, 'timestamp': timestamp,
+                                    'overlay': overlay}, frame)
+        await self.writer.drain()
+        return request_id
+
+    async def receive(self):
+        """
+        The next response as (header, overlay): overlay is the decoded
+        frame, or None when it was not requested.
+        """
+        header, payload = await read_message(self.reader)
+        overlay = None
+        if payload:
+            overlay = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return header, overlay
+
+    async def process(self, stream, frame, timestamp=None, overlay=False):
+        await self.send(stream, frame, timestamp, overlay)
+        return await self.receive()
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
@@ -0,0 +1,142 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# Bump when a cached stage's code changes its output
+CACHE_VERSION = 1
+
+# Settings each cached stage's output depends on, besides the input frame.
+# 'mask' is the thresholded, ROI-masked binary: resize + threshold + ROI
+# (the ROI is bent by the lens distortion when the camera is calibrated).
+# With CROP_TO_ROI it is the crop around the ROI and SRC_POINTS, so
+# LanePipeline adds the crop box (extra={'crop': ...}) to the key.
+STAGE_SETTINGS = {
+    'mask': ('FRAME_SIZE', 'DETECTION_SCALE', 'SOBEL_X_THRESHOLD', 'S_CHANNEL_THRESHOLD',
+             'ROI_VERTICES', 'CROP_TO_ROI', 'CAMERA_INTRINSICS', 'DISTORTION_COEFFS'),
+}
+
+DIGEST_SIZE = 20    # Bytes of the frame keys stored on disk
+
+def frame_key(frame):
+    """Content key of a frame: a digest of its shape and pixels."""
+    digest = hashlib.sha256(str(np.shape(frame)).encode())
+    digest.update(np.ascontiguousarray(frame).data)
+    return digest.digest()[:DIGEST_SIZE]
+
+def _digest(text):
+    return hashlib.sha256(text.encode()).digest()[:DIGEST_SIZE]
+
+class _Segment:
+    """
+    Append-only store of equally shaped binaries produced with one set of
+    parameters: bit-packed entries in `bits.raw` (memory-mapped for reading)
+    and their frame keys, in the same order, in `keys.bin`.
+    """
+    def __init__(self, path, shape, description):
+        self.path = path
+        self.shape = tuple(shape)
+        self.size = int(np.prod(self.shape))
+        self.entry_bytes = (self.size + 7) // 8
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            with open(meta_path, 'w') as f:
+                json.dump({'shape': list(self.shape), 'parameters': description}, f, indent=2)
+
+        bits_path = os.path.join(path, 'bits.raw')
+        keys_path = os.path.join(path, 'keys.bin')
+        # Entries are written before their keys, so a key always has its entry;
+        # a torn trailing entry (no key) is simply overwritten
+        keys = b''
+        if os.path.exists(keys_path):
+            with open(keys_path, 'rb') as f:
+                keys = f.read()
+        count = len(keys) // DIGEST_SIZE
+        self.slots = {keys[i*DIGEST_SIZE:(i+1)*DIGEST_SIZE]: i for i in range(count)}
+        self._bits = open(bits_path, 'ab' if os.path.exists(bits_path) else 'wb')
+        self._bits.truncate(count * self.entry_bytes)
+        self._bits.seek(0, os.SEEK_END)
+        self._keys = open(keys_path, 'ab')
+        self._keys.truncate(count * DIGEST_SIZE)
+        self._map = None
+
+    def get(self, key, value):
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+        if self._map is None or slot >= len(self._map):
+            self._bits.flush()
+            self._map = np.memmap(self._bits.name, dtype=np.uint8, mode='r',
+                                  shape=(len(self.slots), self.entry_bytes))
+        binary = np.unpackbits(self._map[slot], count=self.size).reshape(self.shape)
+        if value != 1:
+            binary *= np.uint8(value)
+        return binary
+
+    def put(self, key, binary):
+        if key in self.slots:
+            return
+        self._bits.write(np.packbits(binary.ravel() != 0).data)
+        self._bits.flush()
+        self._keys.write(key)
+        self._keys.flush()
+        self.slots[key] = len(self.slots)
+
+    def close(self):
+        self._map = None
+        self._bits.close()
+        self._keys.close()
+
+class StageCache:
+    """
+    On-disk cache of per-frame stage outputs, keyed by the content of the
+    input frame and by every setting the stage and its upstream stages use
+    (STAGE_SETTINGS), so changing any of those misses the cache while
+    changing anything downstream (tracking, validation, PID, ...) hits it.
+
+    Outputs are binaries (0 / `value`) stored bit-packed, 8x smaller than
+    the uint8 masks, and read back through a memory map. Entries for one
+    parameter set live in one segment directory under `directory`; a cache
+    directory should have a single writer process at a time.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._segments = {}
+
+    def _segment(self, stage, settings, shape, extra):
+        description = {name: np.asarray(getattr(settings, name)).tolist()
+                       for name in STAGE_SETTINGS[stage]}
+        description.update(extra or {})
+        description['version'] = CACHE_VERSION
+        description['shape'] = list(shape)
+        name = _digest(json.dumps(description, sort_keys=True)).hex()
+        segment = self._segments.get((stage, name))
+        if segment is None:
+            segment = _Segment(os.path.join(self.directory, stage, name), shape, description)
+            self._segments[(stage, name)] = segment
+        return segment
+
+    def get(self, stage, key, settings, shape, extra=None, value=255):
+        """
+        The cached `stage` output of shape `shape` for the frame `key`
+        (see frame_key), or None. `extra` adds key material (e.g. the
+        input resolution) to the stage's settings.
+        """
+        binary = self._segment(stage, settings, shape, extra).get(key, value)
+        if binary is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return binary
+
+    def put(self, stage, key, settings, binary, extra=None):
+        """Store the `stage` output for the frame `key`."""
+        self._segment(stage, settings, binary.shape, extra).put(key, binary)
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments = {}
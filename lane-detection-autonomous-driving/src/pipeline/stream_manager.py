@@ -0,0 +1,248 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from src.config import settings
+
+# What submit() does when a stream's queue is full
+DROP_OLDEST = 'drop_oldest'   # Discard the oldest queued frame (live cameras: stay current)
+DROP_NEWEST = 'drop_newest'   # Reject the incoming frame
+BLOCK = 'block'               # Wait for room (recorded streams: lose nothing)
+
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+class StreamState:
+    """
+    Everything one stream owns: its pipeline (trackers, PID controller,
+    geometry cache, buffers), its queue of pending frames and its counters.
+    """
+    def __init__(self, name, pipeline, queue_size, on_result=None):
+        self.name = name
+        self.pipeline = pipeline
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.on_result = on_result
+        self.busy = False
+        self.last_timestamp = None
+
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.callback_errors = 0
+        self.callback_error = None   # Last exception raised by on_result
+        self.first_submit = None
+        self.last_done = None
+        self.latency_total = 0.0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    def stats(self):
+        elapsed = 0.0
+        if self.first_submit is not None and self.last_done is not None:
+            elapsed = self.last_done - self.first_submit
+        processed = max(self.processed, 1)
+        return {
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'callback_errors': self.callback_errors,
+            'queued': len(self.queue),
+            'fps': self.processed / elapsed if elapsed > 0 else 0.0,
+            'latency_mean': self.latency_total / processed,
+            'lag_mean': self.lag_total / processed,
+            'lag_max': self.lag_max,
+        }
+
+class StreamManager:
+    """
+    Serves many video streams from one shared worker pool.
+
+    Each stream keeps its own LanePipeline, so tracker and controller state
+    never mix, and has at most one frame in flight: its frames are processed
+    strictly in order. Whenever a worker is free the next stream (round-robin)
+    with a queued frame is dispatched, so a fast camera cannot starve the
+    others. Each stream's queue holds at most `queue_size` frames; what
+    happens to frames beyond that is the `drop_policy` (DROP_*, BLOCK).
+
+    Workers are threads: OpenCV and NumPy release the GIL for the heavy
+    stages, and the stateful per-stream pipelines stay in this process.
+    Lag is the time from submit() until a frame's result is ready.
+    """
+    def __init__(self, pipeline_factory=None, workers=None, queue_size=None, drop_policy=None,
+                 draw=True):
+        if pipeline_factory is None:
+            from src.pipeline.lane_pipeline import LanePipeline
+            pipeline_factory = LanePipeline
+        self.pipeline_factory = pipeline_factory
+        self.workers = workers or settings.STREAM_WORKERS or os.cpu_count() or 1
+        self.queue_size = queue_size or settings.STREAM_QUEUE_SIZE
+        self.drop_policy = drop_policy or settings.STREAM_DROP_POLICY
+        if self.drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {self.drop_policy!r}")
+        self.draw = draw
+
+        self.streams = {}
+        self._order = []
+        self._next = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def add_stream(self, name, on_result=None, pipeline=None):
+        """
+        Register a stream. `on_result(name, output, info)` is called from a
+        worker thread with each processed frame, in frame order (output is
+        None and info['error'] holds the exception if processing failed).
+        An exception raised by on_result is counted as a callback error and
+        kept in the stream's `callback_error`; the stream carries on.
+        """
+        with self._condition:
+            if name in self.streams:
+                raise ValueError(f"Stream {name!r} already exists")
+            if pipeline is None:
+                pipeline = self.pipeline_factory()
+            self.streams[name] = StreamState(name, pipeline, self.queue_size, on_result)
+            self._order.append(name)
+        return self.streams[name].pipeline
+
+    def remove_stream(self, name):
+        """Unregister a stream once its queued and in-flight frames are done."""
+        with self._condition:
+            stream = self.streams[name]
+            while stream.queue or stream.busy:
+                self._condition.wait()
+            del self.streams[name]
+            self._order.remove(name)
+            self._next = 0
+
+    def submit(self, name, timestamp, frame):
+        """
+        Queue a frame of stream `name`. Returns False if it was dropped
+        (DROP_NEWEST with a full queue); with DROP_OLDEST it is the oldest
+        queued frame that is dropped instead.
+        """
+        with self._condition:
+            stream = self.streams[name]
+            now = time.perf_counter()
+            if stream.first_submit is None:
+                stream.first_submit = now
+            stream.submitted += 1
+            if len(stream.queue) >= stream.queue_size:
+                if self.drop_policy == DROP_NEWEST:
+                    stream.dropped += 1
+                    return False
+                if self.drop_policy == DROP_OLDEST:
+                    stream.queue.popleft()
+                    stream.dropped += 1
+                else:
+                    while len(stream.queue) >= stream.queue_size:
+                        self._condition.wait()
+            stream.queue.append((timestamp, frame, now))
+            self._dispatch()
+        return True
+
+    def join(self):
+        """Wait until every queued frame has been processed."""
+        with self._condition:
+            while self._in_flight or any(stream.queue for stream in self.streams.values()):
+                self._condition.wait()
+
+    def close(self):
+        self.join()
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        """Per-stream counters, throughput (fps) and lag in seconds."""
+        with self._condition:
+            return {name: stream.stats() for name, stream in self.streams.items()}
+
+    def run(self, sources):
+        """
+        Feed several streams, given as {name: iterable of (timestamp, frame)}
+        (e.g. streaming.capture_frames), one frame from each in turn until
+        all are exhausted, then wait for the results. Streams not yet added
+        are added without a result callback.
+        """
+        iterators = {}
+        for name, frames in sources.items():
+            if name not in self.streams:
+                self.add_stream(name)
+            iterators[name] = iter(frames)
+        while iterators:
+            for name in list(iterators):
+                item = next(iterators[name], None)
+                if item is None:
+                    del iterators[name]
+                else:
+                    self.submit(name, *item)
+        self.join()
+        return self.stats()
+
+    def _dispatch(self):
+        # Called with the lock held: hand queued frames to free workers,
+        # visiting the streams round-robin starting after the last one served
+        count = len(self._order)
+        scanned = 0
+        while self._in_flight < self.workers and scanned < count:
+            name = self._order[self._next % count]
+            self._next = (self._next + 1) % count
+            stream = self.streams[name]
+            if stream.busy or not stream.queue:
+                scanned += 1
+                continue
+            scanned = 0
+            timestamp, frame, submitted = stream.queue.popleft()
+            stream.busy = True
+            self._in_flight += 1
+            self._condition.notify_all()
+            self._executor.submit(self._process, stream, timestamp, frame, submitted)
+
+    def _process(self, stream, timestamp, frame, submitted):
+        dt = None
+        if stream.last_timestamp is not None and timestamp > stream.last_timestamp:
+            dt = timestamp - stream.last_timestamp
+        start = time.perf_counter()
+        try:
+            output = stream.pipeline.process_frame(frame, dt=dt, draw=self.draw)
+            error = None
+        except Exception as exc:
+            output, error = None, exc
+        done = time.perf_counter()
+        stream.last_timestamp = timestamp
+
+        info = {'timestamp': timestamp, 'latency': done - start, 'lag': done - submitted,
+                'error': error}
+        callback_error = None
+        if stream.on_result is not None:
+            try:
+                stream.on_result(stream.name, output, info)
+            except Exception as exc:
+                # A failing consumer (e.g. a video writer) must not leave the
+                # stream busy forever and hang submit(), join() and close()
+                callback_error = exc
+
+        with self._condition:
+            if callback_error is not None:
+                stream.callback_errors += 1
+                stream.callback_error = callback_error
+            if error is None:
+                stream.processed += 1
+                stream.latency_total += info['latency']
+                stream.lag_total += info['lag']
+                stream.lag_max = max(stream.lag_max, info['lag'])
+            else:
+                stream.errors += 1
+            stream.last_done = done
+            stream.busy = False
+            self._in_flight -= 1
+            self._dispatch()
+            self._condition.notify_all()
@@ -0,0 +1,122 @@
+import time
+import cv2
+from src.config import settings
+
+# Degradation levels, cheapest last
+LEVEL_FULL = 0         # Everything, including the overlay
+LEVEL_NO_OVERLAY = 1   # Skip draw_lane_area / draw_info
+LEVEL_FAST_SEARCH = 2  # Also never fall back from search_around_poly to the sliding window
+LEVEL_DROP = 3         # Also drop frames until processing has caught up
+
+LEVEL_NAMES = {
+    LEVEL_FULL: "full",
+    LEVEL_NO_OVERLAY: "no_overlay",
+    LEVEL_FAST_SEARCH: "fast_search",
+    LEVEL_DROP: "drop",
+}
+
+def capture_frames(source):
+    """
+    Generator over (timestamp, frame) from cv2.VideoCapture.
+    `source` is a file path or a device index. Timestamps are in seconds,
+    taken from the capture position when the backend reports a monotonic
+    one and from the wall clock otherwise (e.g. for some cameras).
+    """
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video source: {source!r}")
+    start = time.monotonic()
+    last_timestamp = None
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if last_timestamp is not None and timestamp <= last_timestamp:
+                timestamp = time.monotonic() - start
+            last_timestamp = timestamp
+            yield timestamp, frame
+    finally:
+        cap.release()
+
+class StreamingRunner:
+    """
+    Runs a LanePipeline against a per-frame latency budget.
+
+    When a frame takes longer than the budget the runner steps one level
+    down (see LEVEL_*); once latency has stayed well under the budget for a
+    while it steps back up. At LEVEL_DROP the overrun is tracked as a time
+    debt and incoming frames are dropped until it is paid off, while the
+    LaneLine trackers keep coasting on their last fits. The PID controller
+    always receives the real time between processed frames.
+    """
+    def __init__(self, pipeline, budget=None, recover_ratio=None, recover_frames=None):
+        self.pipeline = pipeline
+        self.budget = budget or settings.STREAM_LATENCY_BUDGET
+        self.recover_ratio = recover_ratio or settings.STREAM_RECOVER_RATIO
+        self.recover_frames = recover_frames or settings.STREAM_RECOVER_FRAMES
+
+        self.level = LEVEL_FULL
+        self.debt = 0.0
+        self._fast_frames = 0
+        self._last_timestamp = None
+
+    def process(self, timestamp, frame):
+        """
+        Process (or drop) one frame.
+        Returns (output, info): output is the (possibly unannotated) frame or
+        None if dropped; info reports the level used, latency and drop flag.
+        """
+        level = self.level
+        if level == LEVEL_DROP and self.debt > 0:
+            # Give this frame's time slot to catching up
+            self.debt = max(0.0, self.debt - self.budget)
+            return None, {'timestamp': timestamp, 'level': level, 'latency': 0.0, 'dropped': True}
+
+        dt = None
+        if self._last_timestamp is not None and timestamp > self._last_timestamp:
+            dt = timestamp - self._last_timestamp
+
+        start = time.perf_counter()
+        output = self.pipeline.process_frame(
+            frame, dt=dt,
+            draw=level < LEVEL_NO_OVERLAY,
+            sliding_window_fallback=level < LEVEL_FAST_SEARCH)
+        latency = time.perf_counter() - start
+        self._last_timestamp = timestamp
+
+        self._adapt(latency)
+        return output, {'timestamp': timestamp, 'level': level, 'latency': latency, 'dropped': False}
+
+    def run(self, frames):
+        """
+        Generator over (output, info) for an iterable of (timestamp, frame),
+        e.g. capture_frames(source).
+        """
+        for index, (timestamp, frame) in enumerate(frames):
+            output, info = self.process(timestamp, frame)
+            info['index'] = index
+            yield output, info
+
+    def _adapt(self, latency):
+        if latency > self.budget:
+            self._fast_frames = 0
+            if self.level < LEVEL_DROP:
+                self.level += 1
+            else:
+                self.debt += latency - self.budget
+            return
+
+        if self.level == LEVEL_DROP:
+            self.debt = max(0.0, self.debt - (self.budget - latency))
+
+        if latency < self.recover_ratio * self.budget:
+            self._fast_frames += 1
+            if self._fast_frames >= self.recover_frames and self.level > LEVEL_FULL:
+                self.level -= 1
+                self._fast_frames = 0
+                if self.level < LEVEL_DROP:
+                    self.debt = 0.0
+        else:
+            self._fast_frames = 0
@@ -0,0 +1,243 @@
+import json
+import time
+import types
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from src.config import settings
+from src.pipeline import stage_cache
+
+# Settings the stateless stages (preprocess) depend on; configurations that
+# agree on all of them share one preprocessing pass per frame
+UPSTREAM_SETTINGS = stage_cache.STAGE_SETTINGS['mask'] + ('SRC_POINTS', 'DST_POINTS')
+
+# Per-configuration metrics (see score for how they combine)
+METRICS = ('detection_rate', 'rejection_rate', 'jitter', 'steering_smoothness', 'ms_per_frame')
+
+def make_config(overrides, base=settings):
+    """
+    A settings object: every upper-case name of `base`, with `overrides`
+    applied. Unknown names are an error, so a typo cannot silently sweep nothing.
+    """
+    names = {name: getattr(base, name) for name in dir(base) if name.isupper()}
+    unknown = set(overrides) - set(names)
+    if unknown:
+        raise KeyError(f"Unknown settings: {', '.join(sorted(unknown))}")
+    names.update({name: _setting_value(names[name], value) for name, value in overrides.items()})
+    return types.SimpleNamespace(**names)
+
+def _setting_value(current, value):
+    # JSON gives lists; keep tuples and arrays in the type the pipeline expects
+    if isinstance(current, np.ndarray):
+        return np.asarray(value, dtype=current.dtype)
+    if isinstance(current, tuple) and isinstance(value, list):
+        return tuple(value)
+    return value
+
+def grid(space):
+    """
+    Every combination of a {name: [values]} space, as override dicts.
+    """
+    names = sorted(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+def random_search(space, count, seed=0):
+    """
+    `count` random override dicts. Each entry of `space` is a list to choose
+    from, or a range {'low', 'high', optional 'log': true, 'int': true}.
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        overrides = {}
+        for name in sorted(space):
+            spec = space[name]
+            if isinstance(spec, dict):
+                low, high = spec['low'], spec['high']
+                if spec.get('log'):
+                    value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+                else:
+                    value = float(rng.uniform(low, high))
+                if spec.get('int'):
+                    value = int(round(value))
+            else:
+                value = spec[rng.integers(len(spec))]
+            overrides[name] = value
+        yield overrides
+
+def _upstream_key(config):
+    return tuple(np.asarray(getattr(config, name)).tobytes() for name in UPSTREAM_SETTINGS)
+
+def group_by_upstream(candidates):
+    """
+    Split override dicts into groups with identical stateless stages.
+    Returns a list of lists of candidate indices.
+    """
+    groups = {}
+    for i, overrides in enumerate(candidates):
+        groups.setdefault(_upstream_key(make_config(overrides)), []).append(i)
+    return list(groups.values())
+
+class ClipScore:
+    """
+    Accumulates the per-frame numbers of one configuration on one clip.
+    """
+    def __init__(self, width):
+        self.width = width
+        self.frames = 0
+        self.valid = 0
+        self.found = 0
+        self.rejected = 0
+        self.jitter_sum = 0.0
+        self.jitter_count = 0
+        self.steering_sum = 0.0
+        self.steering_count = 0
+        self.seconds = 0.0
+        self._last_x = None
+        self._last_steering = None
+
+    def add(self, result, height, seconds):
+        self.frames += 1
+        self.seconds += seconds
+        self.valid += result['valid']
+        self.found += result['found']
+        self.rejected += result['found'] and not result['valid']
+
+        # Frame-to-frame movement of the tracked lines at the bottom row
+        x = None
+        if result['left_fit'] is not None and result['right_fit'] is not None:
+            y = height - 1
+            x = np.array([np.polyval(result['left_fit'], y), np.polyval(result['right_fit'], y)])
+        if x is not None and self._last_x is not None:
+            self.jitter_sum += float(np.abs(x - self._last_x).mean()) / self.width
+            self.jitter_count += 1
+        self._last_x = x
+
+        steering = result['steering']
+        if self._last_steering is not None:
+            self.steering_sum += abs(steering - self._last_steering)
+            self.steering_count += 1
+        self._last_steering = steering
+
+    def totals(self):
+        return {
+            'frames': self.frames, 'valid': self.valid, 'found': self.found,
+            'rejected': self.rejected, 'jitter_sum': self.jitter_sum,
+            'jitter_count': self.jitter_count, 'steering_sum': self.steering_sum,
+            'steering_count': self.steering_count, 'seconds': self.seconds,
+        }
+
+def summarize(totals):
+    """METRICS from summed ClipScore.totals() over any number of clips."""
+    frames = max(totals['frames'], 1)
+    return {
+        'frames': totals['frames'],
+        'detection_rate': totals['valid'] / frames,
+        'rejection_rate': totals['rejected'] / max(totals['found'], 1),
+        'jitter': totals['jitter_sum'] / max(totals['jitter_count'], 1),
+        'steering_smoothness': totals['steering_sum'] / max(totals['steering_count'], 1),
+        'ms_per_frame': 1000 * totals['seconds'] / frames,
+    }
+
+def score(metrics, weights=None):
+    """
+    One number to rank configurations by (higher is better): the weighted
+    detection rate minus the weighted penalties (settings.SWEEP_WEIGHTS).
+    """
+    weights = weights or settings.SWEEP_WEIGHTS
+    return (weights['detection_rate'] * metrics['detection_rate']
+            - weights['rejection_rate'] * metrics['rejection_rate']
+            - weights['jitter'] * metrics['jitter']
+            - weights['steering_smoothness'] * metrics['steering_smoothness']
+            - weights['ms_per_frame'] * metrics['ms_per_frame'])
+
+def evaluate_clip(clip, candidates, max_frames=None):
+    """
+    Run every override dict in `candidates` (all sharing the same stateless
+    stages) over one clip, preprocessing each frame once. The stateful
+    stages run per configuration, timed separately and charged the shared
+    preprocessing time. Returns one ClipScore.totals() per candidate.
+    """
+    from src.pipeline.lane_pipeline import LanePipeline
+    from src.pipeline.frame_store import frame_source
+
+    configs = [make_config(overrides) for overrides in candidates]
+    pipelines = [LanePipeline(config) for config in configs]
+    for pipeline in pipelines:
+        pipeline.metrics = None
+    shared = pipelines[0]
+    scores = None
+    last_timestamp = None
+    for index, (timestamp, frame) in enumerate(frame_source(clip)):
+        if max_frames is not None and index >= max_frames:
+            break
+        start = time.perf_counter()
+        resized, warped = shared.preprocess(frame)
+        preprocess_seconds = time.perf_counter() - start
+        # Decimated configurations only pay for preprocessing on detected frames
+        # (DETECTION_MAX_INTERVAL)
+        if scores is None:
+            scores = [ClipScore(resized.shape[1]) for _ in pipelines]
+        dt = None
+        if last_timestamp is not None and timestamp > last_timestamp:
+            dt = timestamp - last_timestamp
+        last_timestamp = timestamp
+
+        for pipeline, clip_score in zip(pipelines, scores):
+            start = time.perf_counter()
+            if pipeline.scheduler.should_detect():
+                pipeline.process_warped(resized, warped, dt=dt, draw=False)
+                seconds = time.perf_counter() - start + preprocess_seconds
+            else:
+                pipeline.propagate(resized, dt=dt, draw=False)
+                seconds = time.perf_counter() - start
+            clip_score.add(pipeline.last_result, resized.shape[0], seconds)
+    return [clip_score.totals() for clip_score in (scores or [ClipScore(1) for _ in pipelines])]
+
+def _evaluate_task(clip, indices, candidates, max_frames):
+    return clip, indices, evaluate_clip(clip, [candidates[i] for i in indices], max_frames)
+
+def run_sweep(clips, candidates, workers=None, max_frames=None, weights=None, progress=None):
+    """
+    Evaluate override dicts on a list of clips (videos or frame stores) on a
+    process pool. Work is split into one task per (clip, group of
+    candidates with identical stateless stages). Returns one entry per
+    candidate, {'overrides', 'metrics', 'score'}, best first; a
+    candidate's metrics sum its frames over all clips.
+    """
+    candidates = [dict(overrides) for overrides in candidates]
+    groups = group_by_upstream(candidates)
+    totals = [None] * len(candidates)
+    tasks = [(clip, indices) for clip in clips for indices in groups]
+
+    with ProcessPoolExecutor(max_workers=workers or settings.SWEEP_WORKERS) as pool:
+        futures = [pool.submit(_evaluate_task, clip, indices, candidates, max_frames)
+                   for clip, indices in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            clip, indices, results = future.result()
+            for i, clip_totals in zip(indices, results):
+                if totals[i] is None:
+                    totals[i] = clip_totals
+                else:
+                    totals[i] = {key: totals[i][key] + value for key, value in clip_totals.items()}
+            if progress is not None:
+                progress(done, len(tasks), clip)
+
+    results = []
+    for overrides, candidate_totals in zip(candidates, totals):
+        metrics = summarize(candidate_totals)
+        results.append({'overrides': overrides, 'metrics': metrics, 'score': score(metrics, weights)})
+    results.sort(key=lambda result: result['score'], reverse=True)
+    return results
+
+def load_space(path):
+    """
+    Read a sweep space from JSON: {"grid": {name: [values]}} or
+    {"random": {name: [values] or {"low", "high", ...}}, "samples": n, "seed": s}.
+    Returns the list of candidate override dicts.
+    """
+    with open(path) as f:
+        spec = json.load(f)
+    if 'grid' in spec:
+        return list(grid(spec['grid']))
+    return list(random_search(spec['random'], spec.get('samples', 20), spec.get('seed', 0)))
@@ -0,0 +1,190 @@
+import os
+import csv
+import numpy as np
+from src.config import settings
+
+# Which detection path produced a frame's fits (LanePipeline.last_result['search'])
+SEARCH_NONE = 0              # Search around the prior found nothing and no fallback was allowed
+SEARCH_SLIDING_WINDOW = 1
+SEARCH_AROUND = 2
+SEARCH_FALLBACK = 3          # Search around the prior failed, sliding window fallback
+SEARCH_SKIPPED = 4           # Detection skipped, tracked fits carried over (see DETECTION_MAX_INTERVAL)
+
+SEARCH_NAMES = {
+    SEARCH_NONE: "none",
+    SEARCH_SLIDING_WINDOW: "sliding_window",
+    SEARCH_AROUND: "search_around",
+    SEARCH_FALLBACK: "sliding_window_fallback",
+    SEARCH_SKIPPED: "skipped",
+}
+
+# Tracking confidence (LanePipeline.last_result['confidence'])
+CONFIDENCE_NONE = 0    # No lane tracked
+CONFIDENCE_COAST = 1   # Coasting on earlier fits
+CONFIDENCE_HIGH = 2    # Both lines detected this frame
+
+CONFIDENCE_NAMES = {
+    CONFIDENCE_NONE: "none",
+    CONFIDENCE_COAST: "coast",
+    CONFIDENCE_HIGH: "high",
+}
+
+# One record per processed frame; fits are NaN while no lane is tracked
+RECORD_DTYPE = np.dtype([
+    ('frame', '<i8'),
+    ('timestamp', '<f8'),
+    ('left_fit', '<f8', (3,)),
+    ('right_fit', '<f8', (3,)),
+    ('offset', '<f8'),
+    ('curvature', '<f8'),
+    ('steering', '<f8'),
+    ('confidence', 'u1'),
+    ('search', 'u1'),
+    ('valid', '?'),
+])
+
+def _flat_dtype(dtype):
+    fields = []
+    for name in dtype.names:
+        field = dtype[name]
+        if field.shape:
+            fields += [(f"{name}_{i}", field.base) for i in range(field.shape[0])]
+        else:
+            fields.append((name, field))
+    return np.dtype(fields)
+
+# Same memory layout with one scalar field per CSV column (left_fit_0, ...)
+FLAT_DTYPE = _flat_dtype(RECORD_DTYPE)
+
+def _npy_header(count, dtype=RECORD_DTYPE):
+    """
+    .npy v1.0 header for `count` records, padded to the length of the
+    largest possible count so it can be rewritten in place as records are
+    appended.
+    """
+    def header(shape):
+        return "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+            np.lib.format.dtype_to_descr(dtype), shape)
+    prefix = np.lib.format.MAGIC_PREFIX + bytes([1, 0])
+    size = len(prefix) + 2 + len(header((2**63 - 1,))) + 1
+    size += -size % 64
+    text = header((count,))
+    text += ' ' * (size - len(prefix) - 2 - len(text) - 1) + '\n'
+    return prefix + (len(text)).to_bytes(2, 'little') + text.encode('latin1')
+
+class TelemetryWriter:
+    """
+    Appends per-frame records to a columnar file in chunks.
+
+    `path` ending in .csv writes one CSV row per frame; anything else writes
+    a .npy file of RECORD_DTYPE. Records are buffered in a structured array
+    and flushed every `chunk_size` frames; after each flush the file is a
+    complete, loadable array of everything written so far.
+    """
+    def __init__(self, path, chunk_size=None):
+        self.path = path
+        self.chunk_size = chunk_size or settings.TELEMETRY_CHUNK_FRAMES
+        self.csv = path.endswith('.csv')
+        self.count = 0
+        self._chunk = np.zeros(self.chunk_size, dtype=RECORD_DTYPE)
+        self._pending = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.csv:
+            self._file = open(path, 'w', newline='')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(FLAT_DTYPE.names)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(_npy_header(0))
+        self._file.flush()
+
+    def append(self, frame, timestamp, result):
+        """
+        Add the record of one frame: `result` is LanePipeline.last_result.
+        """
+        record = self._chunk[self._pending]
+        record['frame'] = frame
+        record['timestamp'] = timestamp
+        record['left_fit'] = np.nan if result['left_fit'] is None else result['left_fit']
+        record['right_fit'] = np.nan if result['right_fit'] is None else result['right_fit']
+        record['offset'] = result['offset']
+        record['curvature'] = result['curvature']
+        record['steering'] = result['steering']
+        record['confidence'] = result['confidence']
+        record['search'] = result['search']
+        record['valid'] = result['valid']
+        self._pending += 1
+        if self._pending == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records and update the record count."""
+        if self._pending:
+            chunk = self._chunk[:self._pending]
+            if self.csv:
+                self._csv.writerows(chunk.view(FLAT_DTYPE).tolist())
+            else:
+                self._file.write(chunk.tobytes())
+                self._file.seek(0)
+                self._file.write(_npy_header(self.count + self._pending))
+                self._file.seek(0, os.SEEK_END)
+            self.count += self._pending
+            self._pending = 0
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_telemetry(path, mmap_mode='r'):
+    """
+    Load a telemetry file as a RECORD_DTYPE structured array.
+    .npy files are memory-mapped by default (pass mmap_mode=None to load
+    them into memory); CSV files are parsed into memory.
+    """
+    if not path.endswith('.csv'):
+        return np.load(path, mmap_mode=mmap_mode)
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    if tuple(rows[0]) != FLAT_DTYPE.names:
+        raise ValueError(f"Unexpected telemetry columns in {path!r}")
+    columns = np.array(rows[1:], dtype=str).reshape(-1, len(FLAT_DTYPE.names)).T
+    records = np.zeros(columns.shape[1], dtype=RECORD_DTYPE)
+    flat = records.view(FLAT_DTYPE)
+    for name, values in zip(FLAT_DTYPE.names, columns):
+        if FLAT_DTYPE[name] == np.bool_:
+            flat[name] = values == 'True'
+        else:
+            flat[name] = values.astype(FLAT_DTYPE[name])
+    return records
+
+def record_drive(pipeline, frames, writer, frame_keys=None):
+    """
+    Headless run: process an iterable of (timestamp, frame), e.g.
+    streaming.capture_frames(source), without drawing anything and append
+    one record per frame to `writer`. The PID controller receives the real
+    time between frames. `frame_keys` optionally gives each frame's stage
+    cache key. Returns the number of frames.
+    """
+    count = 0
+    last_timestamp = None
+    keys = iter(frame_keys) if frame_keys is not None else None
+    for timestamp, frame in frames:
+        dt = None
+        if last_timestamp is not None and timestamp > last_timestamp:
+            dt = timestamp - last_timestamp
+        frame_key = next(keys) if keys is not None else None
+        pipeline.process_frame(frame, dt=dt, draw=False, frame_key=frame_key)
+        writer.append(count, timestamp, pipeline.last_result)
+        last_timestamp = timestamp
+        count += 1
+    return count
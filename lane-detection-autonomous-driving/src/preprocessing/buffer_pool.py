@@ -0,0 +1,27 @@
+import numpy as np
+
+class BufferPool:
+    """
+    Named, reusable image buffers.
+    A buffer is only reallocated when the requested shape or dtype changes,
+    so steady-state processing of same-sized frames does not allocate.
+    """
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        """
+        Return the buffer registered under `name`, (re)allocating it if needed.
+        Contents are whatever the previous user left in it.
+        """
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buf
+        return buf
+
+    def clear(self):
+        """Release all buffers."""
+        self._buffers.clear()
@@ -55,3 +55,122 @@ def combined_threshold(image):
     # Combine the two binary thresholds
     combined_binary[(s_binary == 1) | (gradx == 1)] = 255
     return combined_binary
+
+def sobel_bounds(max_value, thresh_min, thresh_max):
+    """
+    Integer bounds on |Sobel| equivalent to thresholding the 0-255 scaled
+    gradient `uint8(255*abs_sobel/max_value)` to [thresh_min, thresh_max].
+    Returns None if the image has no gradient at all.
+    """
+    max_value = int(max_value)
+    if max_value == 0:
+        return None
+    # floor(255*a/m) >= t  <=>  a >= ceil(t*m/255)
+    low = (thresh_min*max_value + 254) // 255
+    # floor(255*a/m) <= t  <=>  a < ceil((t+1)*m/255)
+    high = ((thresh_max+1)*max_value + 254) // 255 - 1
+    return low, high
+
+def fused_threshold(image, pool, sobel_thresh=(20, 100), s_thresh=(170, 255), crop=None):
+    """
+    Allocation-free equivalent of combined_threshold.
+    Works in int16/uint8 and writes into buffers taken from `pool`.
+
+    The output is bit-identical to combined_threshold (tolerance: zero pixels).
+    The one exception is a frame with no x gradient at all, where
+    combined_threshold divides by zero; here the Sobel binary is simply empty.
+    The returned array belongs to the pool and is overwritten by the next call.
+
+    `crop` = (x0, y0, x1, y1) returns only image[y0:y1, x0:x1] of that output.
+    The Sobel filter still runs on the whole frame, because the gradient is
+    scaled by its frame-wide maximum; the HLS conversion and both thresholds
+    run on the crop only.
+    """
+    height, width = image.shape[:2]
+    x0, y0, x1, y1 = crop if crop is not None else (0, 0, width, height)
+    shape = (y1 - y0, x1 - x0)
+
+    # Sobel X on the grayscale image, exact in int16 (|value| <= 4*255)
+    gray = pool.get('threshold.gray', (height, width), np.uint8)
+    cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=gray)
+    sobel = pool.get('threshold.sobel', (height, width), np.int16)
+    cv2.Sobel(gray, cv2.CV_16S, 1, 0, dst=sobel)
+    min_value, max_value, _, _ = cv2.minMaxLoc(sobel)
+    abs_sobel = pool.get('threshold.abs_sobel', shape, np.int16)
+    np.abs(sobel[y0:y1, x0:x1], out=abs_sobel)
+
+    # Scale-free threshold on |Sobel| (see sobel_bounds)
+    gradx = pool.get('threshold.gradx', shape, np.uint8)
+    bounds = sobel_bounds(max(max_value, -min_value), sobel_thresh[0], sobel_thresh[1])
+    if bounds is None:
+        gradx.fill(0)
+    else:
+        cv2.inRange(abs_sobel, bounds[0], bounds[1], dst=gradx)
+
+    # S channel threshold, (thresh[0], thresh[1]]
+    hls = pool.get('threshold.hls', shape + (3,), np.uint8)
+    cv2.cvtColor(image[y0:y1, x0:x1], cv2.COLOR_BGR2HLS, dst=hls)
+    s_channel = pool.get('threshold.s_channel', shape, np.uint8)
+    cv2.extractChannel(hls, 2, dst=s_channel)
+    s_binary = pool.get('threshold.s_binary', shape, np.uint8)
+    cv2.inRange(s_channel, s_thresh[0] + 1, s_thresh[1], dst=s_binary)
+
+    combined_binary = pool.get('threshold.combined', shape, np.uint8)
+    cv2.bitwise_or(gradx, s_binary, dst=combined_binary)
+    return combined_binary
+
+def batch_threshold(images, pool, sobel_thresh=(20, 100), s_thresh=(170, 255), crop=None):
+    """
+    Batched fused_threshold for an N x H x W x 3 stack of frames.
+    Color conversions, the Sobel filter, the S-channel threshold and the
+    final combine each run once over the whole stack; only the gradient
+    threshold, whose bounds depend on each frame's maximum, is applied per frame.
+    Output (N x H x W, 0/255) is bit-identical to fused_threshold per frame,
+    including with `crop` (N x crop height x crop width).
+    The returned array belongs to the pool and is overwritten by the next call.
+    """
+    images = np.ascontiguousarray(images)
+    n, height, width = images.shape[:3]
+    flat = images.reshape(n*height, width, 3)
+    x0, y0, x1, y1 = crop if crop is not None else (0, 0, width, height)
+
+    # Sobel X over the stack. Each frame is padded with its reflected
+    # second row above and second-to-last row below, which is exactly the
+    # BORDER_REFLECT_101 neighbourhood cv2.Sobel uses on a single frame.
+    gray = pool.get('batch.gray', (n*height, width), np.uint8)
+    cv2.cvtColor(flat, cv2.COLOR_BGR2GRAY, dst=gray)
+    gray = gray.reshape(n, height, width)
+    padded = pool.get('batch.gray_padded', (n, height+2, width), np.uint8)
+    padded[:, 1:-1] = gray
+    padded[:, 0] = gray[:, 1]
+    padded[:, -1] = gray[:, -2]
+    sobel = pool.get('batch.sobel', (n*(height+2), width), np.int16)
+    cv2.Sobel(padded.reshape(n*(height+2), width), cv2.CV_16S, 1, 0, dst=sobel)
+    np.abs(sobel, out=sobel)
+    sobel = sobel.reshape(n, height+2, width)[:, 1:-1]
+    maxima = sobel.reshape(n, -1).max(axis=1)
+
+    # Everything from here on only covers the crop
+    height, width = y1 - y0, x1 - x0
+    sobel = sobel[:, y0:y1, x0:x1]
+    gradx = pool.get('batch.gradx', (n, height, width), np.uint8)
+    for i in range(n):
+        bounds = sobel_bounds(maxima[i], sobel_thresh[0], sobel_thresh[1])
+        if bounds is None:
+            gradx[i].fill(0)
+        else:
+            cv2.inRange(sobel[i], bounds[0], bounds[1], dst=gradx[i])
+
+    # S channel threshold, (thresh[0], thresh[1]]
+    if crop is not None:
+        flat = np.ascontiguousarray(images[:, y0:y1, x0:x1]).reshape(n*height, width, 3)
+    hls = pool.get('batch.hls', (n*height, width, 3), np.uint8)
+    cv2.cvtColor(flat, cv2.COLOR_BGR2HLS, dst=hls)
+    s_channel = pool.get('batch.s_channel', (n*height, width), np.uint8)
+    cv2.extractChannel(hls, 2, dst=s_channel)
+    s_binary = pool.get('batch.s_binary', (n*height, width), np.uint8)
+    cv2.inRange(s_channel, s_thresh[0] + 1, s_thresh[1], dst=s_binary)
+
+    combined_binary = pool.get('batch.combined', (n, height, width), np.uint8)
+    cv2.bitwise_or(gradx.reshape(n*height, width), s_binary, dst=combined_binary.reshape(n*height, width))
+    return combined_binary
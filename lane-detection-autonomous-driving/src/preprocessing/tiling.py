@@ -0,0 +1,127 @@
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from src.preprocessing.image_utils import sobel_bounds
+
+def tile_rows(start, stop, tiles):
+    """
+    Split the rows [start, stop) into at most `tiles` contiguous
+    (first, last) ranges of near-equal height, none of them empty.
+    """
+    tiles = max(1, min(tiles, stop - start))
+    edges = np.linspace(start, stop, tiles + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
+
+class TiledPreprocessor:
+    """
+    Intra-frame parallelism for the stateless stages of a single frame:
+    thresholding, ROI masking and the bird's-eye remap run as horizontal
+    tiles on a thread pool (the OpenCV calls release the GIL).
+
+    The output is bit-identical to fused_threshold + roi.apply_mask +
+    perspective_transform.warp:
+    - Each tile runs the Sobel filter on its rows plus one halo row above
+      and below, the full neighbourhood of the 3x3 kernel, so its own rows
+      match the filter over the whole frame; at the frame's top and bottom
+      the tile has no halo and sees the same border as the whole frame.
+    - The gradient threshold depends on the frame-wide |Sobel| maximum, so
+      the tiles report their local maxima and the bounds are computed from
+      the overall maximum before any tile thresholds the gradient.
+    - The remap (calibrated cameras) is split by output rows; every output
+      pixel samples the complete masked binary, so it starts once all
+      masking is done. warpPerspective is not split: bands warped with a
+      shifted matrix round differently, and OpenCV threads it internally.
+
+    The calling thread works on the first tile itself, so `threads` tiles
+    need threads - 1 pool threads. Buffers come from `pool` and belong to it.
+    """
+    def __init__(self, threads, pool):
+        self.threads = max(1, threads)
+        self.pool = pool
+        self._executor = None
+
+    def _run(self, function, tasks):
+        """Call function(*task) for each task, in parallel; results in task order."""
+        if len(tasks) == 1:
+            return [function(*tasks[0])]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads - 1)
+        futures = [self._executor.submit(function, *task) for task in tasks[1:]]
+        first = function(*tasks[0])
+        return [first] + [future.result() for future in futures]
+
+    def threshold_mask(self, image, roi_mask, sobel_thresh=(20, 100), s_thresh=(170, 255), crop=None):
+        """
+        Tiled fused_threshold (with the same `crop`) followed by the ROI mask
+        `roi_mask` (0/255, the shape of the crop). Returns the masked binary.
+        """
+        height, width = image.shape[:2]
+        x0, y0, x1, y1 = crop if crop is not None else (0, 0, width, height)
+        shape = (y1 - y0, x1 - x0)
+        abs_sobel = self.pool.get('tiling.abs_sobel', shape, np.int16)
+        s_binary = self.pool.get('tiling.s_binary', shape, np.uint8)
+        masked = self.pool.get('tiling.masked', shape, np.uint8)
+
+        # 1. Sobel over the whole frame (it sets the scale) and the S channel
+        # threshold over the crop, tile by tile
+        tasks = []
+        for i, (a, b) in enumerate(tile_rows(0, height, self.threads)):
+            top, bottom = max(a - 1, 0), min(b + 1, height)
+            gray = self.pool.get(f'tiling.gray.{i}', (bottom - top, width), np.uint8)
+            sobel = self.pool.get(f'tiling.sobel.{i}', (bottom - top, width), np.int16)
+            rows = max(0, min(b, y1) - max(a, y0))
+            hls = self.pool.get(f'tiling.hls.{i}', (rows, x1 - x0, 3), np.uint8)
+            s_channel = self.pool.get(f'tiling.s_channel.{i}', (rows, x1 - x0), np.uint8)
+            tasks.append((image, a, b, top, gray, sobel, hls, s_channel, (x0, y0, x1, y1),
+                          abs_sobel, s_binary, s_thresh))
+        max_value = max(self._run(_gradient_tile, tasks))
+
+        # 2. Gradient threshold with the frame-wide bounds, combine and mask
+        bounds = sobel_bounds(max_value, sobel_thresh[0], sobel_thresh[1])
+        tasks = [(abs_sobel[a:b], s_binary[a:b], roi_mask[a:b], bounds, masked[a:b])
+                 for a, b in tile_rows(0, shape[0], self.threads)]
+        self._run(_mask_tile, tasks)
+        return masked
+
+    def warp(self, image, map1, map2, dst=None):
+        """
+        Tiled perspective_transform.warp: each tile remaps a band of output
+        rows from the whole of `image`. Writes into `dst` if given, else
+        into a new array.
+        """
+        warped = dst if dst is not None else np.empty(map1.shape[:2], dtype=image.dtype)
+        tasks = [(image, map1[a:b], map2[a:b] if map2 is not None else None, warped[a:b])
+                 for a, b in tile_rows(0, len(map1), self.threads)]
+        self._run(_warp_tile, tasks)
+        return warped
+
+def _gradient_tile(image, a, b, top, gray, sobel, hls, s_channel, crop, abs_sobel, s_binary, s_thresh):
+    """
+    Rows [a, b) of the frame (computed from rows [top, top + len(gray))):
+    |Sobel x| and the S channel binary of their part of the crop.
+    Returns the largest |Sobel x| on these rows.
+    """
+    x0, y0, x1, y1 = crop
+    cv2.cvtColor(image[top:top + len(gray)], cv2.COLOR_BGR2GRAY, dst=gray)
+    cv2.Sobel(gray, cv2.CV_16S, 1, 0, dst=sobel)
+    min_value, max_value, _, _ = cv2.minMaxLoc(sobel[a - top:b - top])
+
+    first, last = max(a, y0), min(b, y1)
+    if first < last:
+        np.abs(sobel[first - top:last - top, x0:x1], out=abs_sobel[first - y0:last - y0])
+        cv2.cvtColor(image[first:last, x0:x1], cv2.COLOR_BGR2HLS, dst=hls)
+        cv2.extractChannel(hls, 2, dst=s_channel)
+        cv2.inRange(s_channel, s_thresh[0] + 1, s_thresh[1], dst=s_binary[first - y0:last - y0])
+    return int(max(max_value, -min_value))
+
+def _mask_tile(abs_sobel, s_binary, roi_mask, bounds, out):
+    """Gradient threshold, OR with the S channel binary and ROI mask, on one band of rows."""
+    if bounds is None:
+        out.fill(0)
+    else:
+        cv2.inRange(abs_sobel, bounds[0], bounds[1], dst=out)
+    cv2.bitwise_or(out, s_binary, dst=out)
+    cv2.bitwise_and(out, roi_mask, dst=out)
+
+def _warp_tile(image, map1, map2, out):
+    cv2.remap(image, map1, map2, cv2.INTER_LINEAR, dst=out)
@@ -0,0 +1,108 @@
+import numpy as np
+
+class KalmanLaneLine:
+    """
+    Tracks a lane line with a Kalman filter; a drop-in alternative to LaneLine.
+
+    The state is the line's x position on three rows (top, middle and bottom
+    of the image), which maps one-to-one onto the fit coefficients but has
+    noise that is easy to reason about in pixels. Each frame is one predict
+    step (the positions random-walk, mostly together, as the car drifts
+    within the lane) followed by an update with the new fit, if any. While
+    the line is lost only the prediction runs, so the covariance grows.
+
+    `search_margin` turns the predicted covariance into a per-row half width
+    for the search around the prior fit: narrow while the line is tracked
+    well, wider while it is coasting.
+    """
+    def __init__(self, height=720, process_noise=5.0, measurement_noise=10.0,
+                 margin_sigmas=3.0, min_margin=40.0, max_margin=150.0, max_lost=10):
+        self.height = height
+        self.margin_sigmas = margin_sigmas
+        self.min_margin = min_margin
+        self.max_margin = max_margin
+        self.max_lost = max_lost
+
+        # Fit coefficients -> x on the state rows, and back
+        self.rows = np.array([0.0, (height - 1) / 2, height - 1])
+        self._to_state = np.vander(self.rows, 3)
+        self._to_fit = np.linalg.inv(self._to_state)
+
+        # Lateral motion moves all rows together; curvature changes move them apart
+        self.Q = process_noise**2 * (0.5 * np.eye(3) + 0.5 * np.ones((3, 3)))
+        self.R = measurement_noise**2 * np.eye(3)
+
+        # Number of times the track was lost for too long and reset
+        self.resets = 0
+
+        # Radius of curvature and distance from the vehicle center (as in LaneLine)
+        self.radius_of_curvature = None
+        self.line_base_pos = None
+        self.reset()
+
+    def update(self, new_fit):
+        """
+        Advance one frame and correct the prediction with a new fit
+        (None for a frame without a valid detection).
+        """
+        if self.x is not None:
+            # Predict: the positions stay put, their uncertainty grows
+            self.P = self.P + self.Q
+
+        if new_fit is None:
+            self.detected = False
+            self.lost_count += 1
+            if self.lost_count > self.max_lost:
+                self.resets += 1
+                self.reset()
+            return
+
+        self.detected = True
+        self.lost_count = 0
+        self.current_fit = new_fit
+        z = self._to_state @ np.asarray(new_fit, dtype=np.float64)
+
+        if self.x is None:
+            # First detection
+            self.x = z
+            self.P = self.R.copy()
+        else:
+            # Correct with the measured positions (measurement matrix = identity)
+            gain = self.P @ np.linalg.inv(self.P + self.R)
+            self.x = self.x + gain @ (z - self.x)
+            self.P = (np.eye(3) - gain) @ self.P
+        self.best_fit = self._to_fit @ self.x
+
+    def get_fit(self):
+        """
+        Return the filtered fit if available, otherwise the current one or None.
+        """
+        if self.best_fit is not None:
+            return self.best_fit
+        return self.current_fit
+
+    def search_margin(self, rows):
+        """
+        Half width of the search around the prior fit on each of `rows`:
+        `margin_sigmas` standard deviations of where the next measurement
+        is expected (prediction plus measurement noise), clipped to
+        [min_margin, max_margin]. None while nothing is tracked.
+        """
+        if self.x is None:
+            return None
+        covariance = self.P + self.Q + self.R
+        # Lagrange weights of the state rows give x on any row from the state
+        weights = np.vander(np.asarray(rows, dtype=np.float64), 3) @ self._to_fit
+        variance = ((weights @ covariance) * weights).sum(axis=1)
+        return np.clip(self.margin_sigmas * np.sqrt(variance), self.min_margin, self.max_margin)
+
+    def reset(self):
+        """
+        Reset state (e.g., if outlier detected or track lost for too long).
+        """
+        self.detected = False
+        self.lost_count = 0
+        self.current_fit = None
+        self.best_fit = None
+        self.x = None
+        self.P = None
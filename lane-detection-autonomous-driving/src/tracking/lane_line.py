@@ -13,6 +13,9 @@ class LaneLine:
         
         # Count of consecutive lost frames
         self.lost_count = 0
+
+        # Number of times the track was lost for too long and reset
+        self.resets = 0
         
         # Polynomial coefficients for the most recent fit
         self.current_fit = None  
@@ -34,6 +37,7 @@ class LaneLine:
             self.detected = False
             self.lost_count += 1
             if self.lost_count > self.max_lost:
+                self.resets += 1
                 self.reset()
             return
 
@@ -57,6 +61,13 @@ class LaneLine:
              return self.best_fit
         return self.current_fit
 
+    def search_margin(self, rows):
+        """
+        Search margin for the given rows; the EMA has no uncertainty
+        estimate, so None (use the fixed settings.SEARCH_MARGIN).
+        """
+        return None
+
     def reset(self):
         """
         Reset state (e.g., if outlier detected or track lost for too long).
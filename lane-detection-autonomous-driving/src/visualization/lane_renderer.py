@@ -0,0 +1,103 @@
+import cv2
+import numpy as np
+from src.perception import perspective_transform
+
+class LaneRenderer:
+    """
+    Draws the lane area between two bird's-eye fits onto camera frames.
+
+    The lane polygon (one vertex per bird's-eye row on each line) is clipped
+    to the bird's-eye image, projected into the frame with
+    cv2.perspectiveTransform (and through the lens distortion for a
+    calibrated camera) and filled directly in image space. Blending
+    only touches the polygon's bounding box. The colored patch is kept and
+    reused while the fits move less than `tolerance` bird's-eye pixels on
+    every row and the frame size, inverse transform and camera are unchanged.
+    """
+    def __init__(self, color=(0, 255, 0), alpha=0.3, tolerance=0.5):
+        self.color = color
+        self.alpha = alpha
+        self.tolerance = tolerance
+        self.renders = 0
+        self.reuses = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the cached patch."""
+        self._fits = None
+        self._Minv = None
+        self._camera = None
+        self._shape = None
+        self._box = None
+        self._patch = None
+
+    def draw(self, image, left_fit, right_fit, Minv, ploty=None, camera=None):
+        """
+        Blend the lane area into `image` (in place) and return it.
+        `ploty` may pass in the precomputed bird's-eye row samples. With
+        `camera` (camera matrix, distortion coefficients) Minv maps to the
+        undistorted image and `image` is the raw, distorted frame.
+        """
+        if left_fit is None or right_fit is None:
+            return image
+        if ploty is None:
+            ploty = np.linspace(0, image.shape[0]-1, image.shape[0])
+
+        if self._can_reuse(image.shape, left_fit, right_fit, Minv, ploty, camera):
+            self.reuses += 1
+        else:
+            self._render(image.shape, left_fit, right_fit, Minv, ploty, camera)
+            self.renders += 1
+
+        if self._patch is not None:
+            x0, y0, x1, y1 = self._box
+            region = image[y0:y1, x0:x1]
+            cv2.addWeighted(region, 1, self._patch, self.alpha, 0, dst=region)
+        return image
+
+    def _can_reuse(self, shape, left_fit, right_fit, Minv, ploty, camera):
+        if self._fits is None or shape != self._shape or not np.array_equal(Minv, self._Minv):
+            return False
+        if (camera is None) != (self._camera is None) or (
+                camera is not None and not all(map(np.array_equal, camera, self._camera))):
+            return False
+        # Largest horizontal movement of either line over the drawn rows
+        for fit, cached in zip((left_fit, right_fit), self._fits):
+            delta = np.asarray(fit, dtype=np.float64) - cached
+            if np.abs(delta[0]*ploty**2 + delta[1]*ploty + delta[2]).max() >= self.tolerance:
+                return False
+        return True
+
+    def _render(self, shape, left_fit, right_fit, Minv, ploty, camera):
+        height, width = shape[:2]
+        self._fits = (np.array(left_fit, dtype=np.float64), np.array(right_fit, dtype=np.float64))
+        self._Minv = np.array(Minv)
+        self._camera = None if camera is None else tuple(np.array(part) for part in camera)
+        self._shape = shape
+
+        # Polygon in bird's-eye space: down the left line, up the right line.
+        # Clipping x to the bird's-eye image keeps exactly the visible lane area.
+        left_fitx = left_fit[0]*ploty**2 + left_fit[1]*ploty + left_fit[2]
+        right_fitx = right_fit[0]*ploty**2 + right_fit[1]*ploty + right_fit[2]
+        xs = np.clip(np.concatenate([left_fitx, right_fitx[::-1]]), 0, width - 1)
+        ys = np.concatenate([ploty, ploty[::-1]])
+        pts = np.stack([xs, ys], axis=-1).reshape(-1, 1, 2)
+
+        # Project into the frame
+        pts = cv2.perspectiveTransform(pts, Minv).reshape(-1, 2)
+        if camera is not None and np.isfinite(pts).all():
+            pts = perspective_transform.distort_points(pts, *camera)
+        if not np.isfinite(pts).all():
+            self._box = self._patch = None
+            return
+        x0, y0 = np.clip(np.floor(pts.min(axis=0)), 0, (width, height)).astype(int)
+        x1, y1 = np.clip(np.ceil(pts.max(axis=0)) + 1, 0, (width, height)).astype(int)
+        if x1 <= x0 or y1 <= y0:
+            self._box = self._patch = None
+            return
+
+        # Fill (with 4 fractional bits) in a patch covering the bounding box
+        self._box = (x0, y0, x1, y1)
+        self._patch = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        vertices = np.round((pts - (x0, y0)) * 16).astype(np.int32)
+        cv2.fillPoly(self._patch, [vertices], self.color, cv2.LINE_8, 4)
@@ -17,18 +17,22 @@ def draw_info(image, steering_angle, offset, curvature=None, confidence_text=Non
     
     return image
 
-def draw_lane_area(image, binary_warped, left_fit, right_fit, Minv):
+def draw_lane_area(image, binary_warped, left_fit, right_fit, Minv, ploty=None, ploty_sq=None):
     """
     Draw the lane area (filled polygon) back onto the original image.
+    `ploty` and `ploty_sq` may be passed in to reuse precomputed y sample vectors.
     """
     if left_fit is None or right_fit is None:
         return image
 
     # Generate x and y values for plotting
-    ploty = np.linspace(0, binary_warped.shape[0]-1, binary_warped.shape[0])
+    if ploty is None:
+        ploty = np.linspace(0, binary_warped.shape[0]-1, binary_warped.shape[0])
+    if ploty_sq is None:
+        ploty_sq = ploty**2
     try:
-        left_fitx = left_fit[0]*ploty**2 + left_fit[1]*ploty + left_fit[2]
-        right_fitx = right_fit[0]*ploty**2 + right_fit[1]*ploty + right_fit[2]
+        left_fitx = left_fit[0]*ploty_sq + left_fit[1]*ploty + left_fit[2]
+        right_fitx = right_fit[0]*ploty_sq + right_fit[1]*ploty + right_fit[2]
     except TypeError:
         return image
 
@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pipeline import batch_runner
+
+def write_clip(path, frames=6, size=(160, 96)):
+    # Two bright lane markings on a dark road
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 10, size)
+    for i in range(frames):
+        frame = np.full((height, width, 3), 60, dtype=np.uint8)
+        cv2.line(frame, (30 + i, height), (70 + i, height // 2), (0, 220, 255), 3)
+        cv2.line(frame, (130 + i, height), (90 + i, height // 2), (0, 220, 255), 3)
+        writer.write(frame)
+    writer.release()
+
+class TestDiscovery(unittest.TestCase):
+    def test_manifest(self):
+        with tempfile.TemporaryDirectory() as root:
+            manifest = os.path.join(root, 'clips.txt')
+            with open(manifest, 'w') as f:
+                f.write("# comment\n\nday/a.mp4\n  /data/b.avi  \n")
+            self.assertEqual(batch_runner.discover_clips(manifest),
+                             [os.path.join(root, 'day', 'a.mp4'), '/data/b.avi'])
+
+    def test_directory_filters_extensions(self):
+        with tempfile.TemporaryDirectory() as root:
+            for name in ('b.MP4', 'a.avi', 'notes.txt'):
+                open(os.path.join(root, name), 'w').close()
+            self.assertEqual(batch_runner.discover_clips(root),
+                             [os.path.join(root, 'a.avi'), os.path.join(root, 'b.MP4')])
+
+    def test_unknown_duration_scheduled_first(self):
+        with tempfile.NamedTemporaryFile(suffix='.mp4') as f:
+            f.write(b'not a video')
+            f.flush()
+            self.assertEqual(batch_runner.clip_duration(f.name), float('inf'))
+
+class TestOutputNames(unittest.TestCase):
+    def test_extension_kept(self):
+        first, _ = batch_runner.output_paths('/in/a.mp4', 'out')
+        second, _ = batch_runner.output_paths('/in/a.avi', 'out')
+        self.assertNotEqual(first, second)
+
+    def test_duplicates_rejected(self):
+        with self.assertRaises(ValueError):
+            batch_runner.check_output_names(['/day/a.mp4', '/night/a.mp4'], 'out')
+        batch_runner.check_output_names(['/day/a.mp4', '/day/a.mp4.bak', '/day/a.avi'], 'out')
+
+class TestRunBatch(unittest.TestCase):
+    def test_process_pool_and_resume(self):
+        with tempfile.TemporaryDirectory() as root:
+            inputs = os.path.join(root, 'in')
+            os.makedirs(inputs)
+            write_clip(os.path.join(inputs, 'a.mp4'), frames=6)
+            write_clip(os.path.join(inputs, 'b.avi'), frames=4)
+            output_dir = os.path.join(root, 'out')
+
+            records, failures = batch_runner.run_batch(inputs, output_dir, workers=1)
+            self.assertEqual(failures, {})
+            frames = {os.path.basename(record['input']): record['frames'] for record in records}
+            self.assertEqual(frames, {'a.mp4': 6, 'b.avi': 4})
+            for record in records:
+                self.assertTrue(os.path.exists(record['output']))
+                self.assertEqual(cv2.VideoCapture(record['output']).get(cv2.CAP_PROP_FRAME_COUNT),
+                                 record['frames'])
+
+            # Completed clips are skipped; an interrupted one (no record) is redone
+            os.remove(batch_runner.output_paths(os.path.join(inputs, 'b.avi'), output_dir)[1])
+            records, failures = batch_runner.run_batch(inputs, output_dir, workers=1)
+            self.assertEqual([os.path.basename(record['input']) for record in records], ['b.avi'])
+            with open(batch_runner.output_paths(os.path.join(inputs, 'a.mp4'), output_dir)[1]) as f:
+                self.assertEqual(json.load(f)['frames'], 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+from unittest import mock
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import run_benchmarks
+from benchmarks.synthetic import render_road_frame, RESOLUTIONS, SCENES
+
+def make_baseline(results):
+    return {'schema': run_benchmarks.SCHEMA_VERSION, 'results': results}
+
+class TestCompare(unittest.TestCase):
+    def test_flags_slowdowns_over_threshold(self):
+        baseline = make_baseline({'a': 1.0, 'b': 2.0, 'c': 0.5})
+        results = {'a': 1.05, 'b': 2.5, 'c': 0.2}
+        self.assertEqual(run_benchmarks.compare(results, baseline, 0.10), [('b', 2.0, 2.5, 1.25)])
+        self.assertEqual(run_benchmarks.compare(results, baseline, 0.30), [])
+        # Exactly at the threshold passes
+        self.assertEqual(run_benchmarks.compare({'a': 1.5}, make_baseline({'a': 1.0}), 0.5), [])
+
+    def test_ignores_unmatched_and_zero_entries(self):
+        baseline = make_baseline({'a': 1.0, 'gone': 1.0, 'zero': 0.0})
+        results = {'a': 1.0, 'new': 100.0, 'zero': 1.0}
+        self.assertEqual(run_benchmarks.compare(results, baseline, 0.10), [])
+
+    def test_main_exits_nonzero_on_regression(self):
+        with tempfile.TemporaryDirectory() as root, \
+                mock.patch.object(run_benchmarks, 'BASELINE_DIR', root), \
+                mock.patch.object(run_benchmarks, 'run', return_value={'a': 1.0}):
+            run_benchmarks.save_baseline('fast', {'a': 0.5})
+            run_benchmarks.save_baseline('slow', {'a': 2.0})
+            with mock.patch('builtins.print'):
+                self.assertEqual(run_benchmarks.main(['--compare', 'fast']), 1)
+                self.assertEqual(run_benchmarks.main(['--compare', 'slow']), 0)
+
+class TestReferenceBaseline(unittest.TestCase):
+    def test_covers_every_benchmark(self):
+        """The committed baseline has an entry for each benchmark the suite runs"""
+        baseline = run_benchmarks.load_baseline('reference')
+        names = [name for name, _ in run_benchmarks.stage_benchmarks(render_road_frame(320, 180))]
+        names.append('pipeline.process_frame')
+        expected = {f"{name}[{resolution}/{scene}]" for name in names
+                    for resolution in RESOLUTIONS for scene in SCENES}
+        self.assertEqual(sorted(expected - set(baseline['results'])), [])
+
+    def test_schema_mismatch_rejected(self):
+        with tempfile.TemporaryDirectory() as root, mock.patch.object(run_benchmarks, 'BASELINE_DIR', root):
+            with open(run_benchmarks.baseline_path('old'), 'w') as f:
+                json.dump({'schema': run_benchmarks.SCHEMA_VERSION - 1, 'results': {}}, f)
+            with self.assertRaises(ValueError):
+                run_benchmarks.load_baseline('old')
+
+if __name__ == '__main__':
+    unittest.main()
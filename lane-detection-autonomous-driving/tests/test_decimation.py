@@ -0,0 +1,138 @@
+import unittest
+import sys
+import os
+import types
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.pipeline import telemetry
+from src.pipeline.decimation import DetectionScheduler
+from src.pipeline.lane_pipeline import LanePipeline
+from src.pipeline.parallel_runner import ParallelVideoRunner
+from src.pipeline.service import LaneService
+
+LEFT = np.array([0.0, 0.0, 300.0])
+RIGHT = np.array([0.0, 0.0, 980.0])
+
+def make_frame():
+    # Two bright lane markings on a dark road
+    frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+    cv2.line(frame, (110, 360), (290, 215), (0, 220, 255), 8)
+    cv2.line(frame, (560, 360), (350, 215), (0, 220, 255), 8)
+    return frame
+
+def make_config(**overrides):
+    names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+    names.update(overrides)
+    return types.SimpleNamespace(**names)
+
+class TestDetectionScheduler(unittest.TestCase):
+    def run_detections(self, scheduler, count, curvature=1000.0, valid=True, coasting=False, fits=(LEFT, RIGHT)):
+        for _ in range(count):
+            scheduler.detected(fits[0], fits[1], valid, coasting, curvature, (720, 1280))
+
+    def test_interval_grows_while_stable(self):
+        scheduler = DetectionScheduler(max_interval=4, stable_frames=3)
+        self.run_detections(scheduler, 2)
+        self.assertEqual(scheduler.interval, 1)
+        self.run_detections(scheduler, 1)
+        self.assertEqual(scheduler.interval, 2)
+        self.run_detections(scheduler, 10)
+        self.assertEqual(scheduler.interval, 4)
+        # Detection on every 4th frame
+        self.assertEqual([scheduler.should_detect() for _ in range(4)], [False, False, False, True])
+
+    def test_drops_to_one(self):
+        changes = {
+            'rejection': dict(valid=False),
+            'coasting': dict(coasting=True),
+            'curvature': dict(curvature=300.0),
+            'movement': dict(fits=(LEFT + (0, 0, 20), RIGHT)),
+        }
+        for name, change in changes.items():
+            with self.subTest(name):
+                scheduler = DetectionScheduler(max_interval=4, stable_frames=1)
+                self.run_detections(scheduler, 5)
+                self.assertEqual(scheduler.interval, 4)
+                self.run_detections(scheduler, 1, **change)
+                self.assertEqual(scheduler.interval, 1)
+                self.assertTrue(scheduler.should_detect())
+
+class TestDecimatedPipeline(unittest.TestCase):
+    def test_skipped_frames_carry_fits_over(self):
+        pipeline = LanePipeline(make_config(FRAME_SIZE=None, DETECTION_MAX_INTERVAL=3,
+                                            DETECTION_STABLE_FRAMES=2))
+        frame = make_frame()
+        searches, fits = [], []
+        for i in range(12):
+            pipeline.process_frame(frame, draw=False, timestamp=i / 30)
+            searches.append(pipeline.last_result['search'])
+            fits.append(pipeline.last_result['left_fit'].copy())
+        self.assertIn(telemetry.SEARCH_SKIPPED, searches)
+        self.assertEqual(pipeline.metrics.counters['detection_skips'], searches.count(telemetry.SEARCH_SKIPPED))
+        # A skipped frame reports the tracked fits unchanged
+        for i, search in enumerate(searches):
+            if search == telemetry.SEARCH_SKIPPED:
+                np.testing.assert_array_equal(fits[i], fits[i - 1])
+
+    def test_pid_uses_frame_timestamps(self):
+        # Integral-only controller: the output is the offset integrated over time
+        pipeline = LanePipeline(make_config(FRAME_SIZE=None, STEERING_KP=0.0, STEERING_KI=1.0,
+                                            STEERING_KD=0.0))
+        frame = make_frame()
+        offsets = []
+        for i in range(4):
+            pipeline.process_frame(frame, draw=False, timestamp=0.1 * i)
+            offsets.append(pipeline.last_result['offset'])
+        expected = offsets[0] * settings.FRAME_DT + sum(offsets[1:]) * 0.1
+        self.assertAlmostEqual(pipeline.last_result['steering'], expected)
+
+class TestDecimatedPaths(unittest.TestCase):
+    """Every entry point skips the same frames as process_frame"""
+    def setUp(self):
+        self.config = make_config(DETECTION_MAX_INTERVAL=4, DETECTION_STABLE_FRAMES=2)
+        self.frames = [make_frame() for _ in range(30)]
+        serial = LanePipeline(self.config)
+        self.expected, self.searches, self.steering = [], [], []
+        for frame in self.frames:
+            self.expected.append(serial.process_frame(frame.copy()))
+            self.searches.append(serial.last_result['search'])
+            self.steering.append(serial.last_result['steering'])
+        self.assertGreater(self.searches.count(telemetry.SEARCH_SKIPPED), 10)
+
+    def test_parallel_runner(self):
+        pipeline = LanePipeline(self.config)
+        results = []
+        ParallelVideoRunner(pipeline, workers=2, queue_depth=3).run(
+            iter(self.frames), self.frames[0].shape, lambda result: results.append(result.copy()))
+        self.assertEqual(pipeline.metrics.counters['detection_skips'], self.searches.count(telemetry.SEARCH_SKIPPED))
+        for actual, expected in zip(results, self.expected):
+            np.testing.assert_array_equal(actual, expected)
+
+    def test_process_batch(self):
+        pipeline = LanePipeline(self.config)
+        results = np.concatenate([pipeline.process_batch(np.stack(self.frames[i:i+8]))
+                                  for i in range(0, len(self.frames), 8)])
+        self.assertEqual(pipeline.metrics.counters['detection_skips'], self.searches.count(telemetry.SEARCH_SKIPPED))
+        np.testing.assert_array_equal(results, np.stack(self.expected))
+
+    def test_service(self):
+        service = LaneService(lambda: LanePipeline(self.config), max_batch=4)
+        self.addCleanup(service._executor.shutdown)
+        searches, steering = [], []
+        for i in range(0, len(self.frames), 4):
+            batch = [({'id': j, 'stream': 0, 'timestamp': None},
+                      cv2.imencode('.png', self.frames[j])[1].tobytes(), None, 0.0)
+                     for j in range(i, min(i + 4, len(self.frames)))]
+            for header, _ in service.process_batch(batch):
+                searches.append(header['search'])
+                steering.append(header['steering'])
+        self.assertEqual(searches, self.searches)
+        self.assertEqual(steering, self.steering)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pipeline import frame_store
+
+def make_frames(count, shape=(24, 32, 3)):
+    rng = np.random.default_rng(0)
+    return [(i / 30.0, rng.integers(0, 256, shape, dtype=np.uint8)) for i in range(count)]
+
+class TestFrameStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'clip')
+
+    def test_round_trip(self):
+        frames = make_frames(5)
+        store = frame_store.decode_to_store('clip.mp4', self.path, frames=frames)
+        self.assertTrue(frame_store.is_frame_store(self.path))
+        self.assertEqual(len(store), 5)
+        self.assertAlmostEqual(store.meta['fps'], 30.0)
+        for (timestamp, frame), (stored_timestamp, stored) in zip(frames, store.iter_frames()):
+            self.assertEqual(timestamp, stored_timestamp)
+            np.testing.assert_array_equal(frame, stored)
+
+        # Views into the read-only mapping, not copies
+        self.assertIsInstance(store[3].base, np.ndarray)
+        self.assertFalse(store[3].flags.writeable)
+
+    def test_ranges(self):
+        frame_store.decode_to_store('clip.mp4', self.path, frames=make_frames(10))
+        store = frame_store.FrameStore(self.path)
+        ranges = store.split(3)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], 10)
+        self.assertEqual(sum(stop - start for start, stop in ranges), 10)
+        timestamps = [t for t, _ in frame_store.frame_source(self.path, 2, 5)]
+        np.testing.assert_allclose(timestamps, [2 / 30, 3 / 30, 4 / 30])
+
+    def test_up_to_date_check(self):
+        source = os.path.join(self.tmp.name, 'clip.mp4')
+        with open(source, 'wb') as f:
+            f.write(b'video')
+        self.assertFalse(frame_store.is_current(source, self.path))
+        frame_store.decode_to_store(source, self.path, frames=make_frames(2))
+        self.assertTrue(frame_store.is_current(source, self.path))
+        os.utime(source, (0, 0))
+        self.assertFalse(frame_store.is_current(source, self.path))
+
+    def test_missing_source_is_not_current(self):
+        source = os.path.join(self.tmp.name, 'missing.mp4')
+        frame_store.decode_to_store(source, self.path, frames=make_frames(2))
+        self.assertFalse(frame_store.is_current(source, self.path))
+
+    def test_store_paths_differ_by_directory(self):
+        first = frame_store.store_path(os.path.join('drive1', 'front.mp4'), self.tmp.name)
+        second = frame_store.store_path(os.path.join('drive2', 'front.mp4'), self.tmp.name)
+        self.assertNotEqual(first, second)
+        self.assertTrue(os.path.basename(first).startswith('front-'))
+        # The same clip, however it is named, has one store
+        self.assertEqual(first, frame_store.store_path(os.path.abspath(os.path.join('drive1', 'front.mp4')),
+                                                       self.tmp.name))
+
+    def test_rejects_mixed_shapes(self):
+        frames = make_frames(2) + make_frames(1, shape=(10, 10, 3))
+        with self.assertRaises(ValueError):
+            frame_store.decode_to_store('clip.mp4', self.path, frames=frames)
+        self.assertFalse(frame_store.is_frame_store(self.path))
+
+if __name__ == '__main__':
+    unittest.main()
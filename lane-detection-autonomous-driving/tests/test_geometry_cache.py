@@ -0,0 +1,166 @@
+import unittest
+import sys
+import os
+import types
+import tempfile
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.perception import roi, perspective_transform
+from src.preprocessing import image_utils
+from src.preprocessing.buffer_pool import BufferPool
+from src.pipeline.geometry_cache import GeometryCache, scale_points
+from src.pipeline.lane_pipeline import LanePipeline
+
+def make_settings():
+    names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+    for name in ('SRC_POINTS', 'DST_POINTS', 'ROI_VERTICES'):
+        names[name] = names[name].copy()
+    names['WARP_MAP_DIR'] = None
+    return types.SimpleNamespace(**names)
+
+class TestGeometryCache(unittest.TestCase):
+    def test_reused_between_frames(self):
+        cache = GeometryCache(make_settings())
+        first = cache.get((720, 1280))
+        second = cache.get((720, 1280, 3))
+        self.assertIs(first, second)
+
+    def test_invalidated_on_resolution_change(self):
+        cache = GeometryCache(make_settings())
+        first = cache.get((720, 1280))
+        second = cache.get((360, 640))
+        self.assertIsNot(first, second)
+        self.assertEqual(second.roi_mask.shape, (360, 640))
+        self.assertEqual(len(second.ploty), 360)
+
+    def test_invalidated_on_settings_change(self):
+        s = make_settings()
+        cache = GeometryCache(s)
+        first = cache.get((720, 1280))
+        s.SRC_POINTS[0, 0] += 0.01
+        second = cache.get((720, 1280))
+        self.assertIsNot(first, second)
+        self.assertFalse(np.allclose(first.M, second.M))
+
+    def test_matches_uncached_stages(self):
+        s = make_settings()
+        geometry = GeometryCache(s).get((720, 1280))
+        image = np.full((720, 1280), 255, dtype=np.uint8)
+
+        expected_mask = roi.region_of_interest(image, [np.int32(scale_points(s.ROI_VERTICES, 1280, 720))])
+        np.testing.assert_array_equal(roi.apply_mask(image, geometry.roi_mask), expected_mask)
+
+        M = cv2.getPerspectiveTransform(np.float32(scale_points(s.SRC_POINTS, 1280, 720)),
+                                        np.float32(scale_points(s.DST_POINTS, 1280, 720)))
+        np.testing.assert_allclose(geometry.M, M)
+        np.testing.assert_allclose(geometry.Minv, np.linalg.inv(M))
+
+    def test_reference_resolution_keeps_pixel_constants(self):
+        # The normalized settings reproduce the values tuned at 1280x720
+        geometry = GeometryCache(make_settings()).get((720, 1280))
+        lane = geometry.lane
+        np.testing.assert_array_equal(np.float32(scale_points(settings.SRC_POINTS, 1280, 720)),
+                                      np.float32([[585, 420], [203, 720], [1127, 720], [695, 420]]))
+        self.assertAlmostEqual(lane.xm_per_pix, 3.7 / 700)
+        self.assertAlmostEqual(lane.ym_per_pix, 30 / 720)
+        self.assertEqual((lane.nwindows, lane.margin, lane.minpix), (9, 100, 50))
+        self.assertEqual(lane.lane_width_range, (500, 900))
+        self.assertAlmostEqual(lane.slope_tolerance, 0.5)
+
+    def test_lane_scale_follows_resolution(self):
+        lane = GeometryCache(make_settings()).get((180, 320)).lane
+        self.assertEqual((lane.margin, lane.minpix), (25, 3))
+        self.assertEqual(lane.lane_width_range, (125, 225))
+        self.assertAlmostEqual(lane.xm_per_pix, 4 * 3.7 / 700)
+
+    def test_warp_matches_birdeye(self):
+        """Without calibration the warp equals birdeye of the full masked frame, cropped or not"""
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 256, (360, 640, 3), dtype=np.uint8)
+        for crop in (True, False):
+            with self.subTest(crop=crop):
+                s = make_settings()
+                s.FRAME_SIZE, s.CROP_TO_ROI = None, crop
+                pipeline = LanePipeline(s)
+                geometry = pipeline.geometry_cache.get(frame.shape)
+                self.assertIsNone(geometry.map1)
+                masked = roi.apply_mask(image_utils.fused_threshold(frame, BufferPool()), geometry.roi_mask)
+                expected, _ = perspective_transform.birdeye(masked, np.float32(scale_points(s.SRC_POINTS, 640, 360)),
+                                                            np.float32(scale_points(s.DST_POINTS, 640, 360)))
+                np.testing.assert_array_equal(pipeline.preprocess(frame)[1], expected)
+
+    def test_warp_maps_stored_and_memory_mapped(self):
+        s = make_settings()
+        s.CAMERA_INTRINSICS = (0.8, 0.8 * 16 / 9, 0.5, 0.5)
+        expected = GeometryCache(s).get((180, 320))
+        with tempfile.TemporaryDirectory() as map_dir:
+            s.WARP_MAP_DIR = map_dir
+            built = GeometryCache(s).get((180, 320))
+            loaded = GeometryCache(s).get((180, 320))
+            self.assertIsInstance(loaded.map1, np.memmap)
+            for name in ('map1', 'map2', 'crop_map1'):
+                np.testing.assert_array_equal(getattr(built, name), getattr(expected, name))
+                np.testing.assert_array_equal(getattr(loaded, name), getattr(expected, name))
+            loaded = None
+
+    def test_unwritable_map_dir_falls_back_to_memory(self):
+        s = make_settings()
+        s.CAMERA_INTRINSICS = (0.8, 0.8 * 16 / 9, 0.5, 0.5)
+        expected = GeometryCache(s).get((180, 320))
+        with tempfile.TemporaryDirectory() as root:
+            # A directory below a regular file cannot be created
+            blocker = os.path.join(root, 'file')
+            open(blocker, 'w').close()
+            s.WARP_MAP_DIR = os.path.join(blocker, 'maps')
+            geometry = GeometryCache(s).get((180, 320))
+            np.testing.assert_array_equal(geometry.map1, expected.map1)
+
+            # Unreadable stored tables are rebuilt
+            s.WARP_MAP_DIR = os.path.join(root, 'maps')
+            GeometryCache(s).get((180, 320))
+            for path, _, files in os.walk(s.WARP_MAP_DIR):
+                for name in files:
+                    with open(os.path.join(path, name), 'wb') as f:
+                        f.write(b'corrupt')
+            geometry = GeometryCache(s).get((180, 320))
+            np.testing.assert_array_equal(geometry.map1, expected.map1)
+
+    def test_map_dir_change_rebuilds(self):
+        s = make_settings()
+        cache = GeometryCache(s)
+        first = cache.get((180, 320))
+        s.WARP_MAP_DIR = 'elsewhere'
+        self.assertIsNot(cache.get((180, 320)), first)
+
+    def test_fused_undistort_matches_two_passes(self):
+        # One remap of the distorted frame gives the warp of the undistorted frame
+        s = make_settings()
+        s.CAMERA_INTRINSICS = (0.8, 0.8 * 16 / 9, 0.5, 0.5)
+        s.DISTORTION_COEFFS = (-0.3, 0.1, 0.0, 0.0, 0.0)
+        geometry = GeometryCache(s).get((180, 320))
+        K, dist = geometry.camera
+
+        rng = np.random.default_rng(0)
+        undistorted = cv2.GaussianBlur(rng.integers(0, 256, (180, 320), dtype=np.uint8).astype(np.float32), (0, 0), 4)
+        # Render the raw frame: each distorted pixel shows its undistorted position
+        ys, xs = np.mgrid[0:180, 0:320].astype(np.float32)
+        points = cv2.undistortPoints(np.stack([xs, ys], axis=-1).reshape(-1, 1, 2), K, dist, P=K).reshape(180, 320, 2)
+        distorted = cv2.remap(undistorted, points[..., 0], points[..., 1], cv2.INTER_LINEAR)
+
+        fused = cv2.remap(distorted, geometry.map1, geometry.map2, cv2.INTER_LINEAR)
+        expected = cv2.warpPerspective(undistorted, geometry.M, (320, 180), flags=cv2.INTER_LINEAR)
+        inside = cv2.erode(((fused > 0) & (expected > 0)).astype(np.uint8), np.ones((5, 5)))
+        self.assertGreater(inside.mean(), 0.5)
+        self.assertLess(np.abs(fused - expected)[inside > 0].mean(), 0.1)
+
+        # The ROI mask follows the lens: its bottom corners move inward
+        self.assertEqual(geometry.roi_mask[179, 0], 0)
+        self.assertGreater(geometry.crop[0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import sys
+import os
+import types
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.tracking.kalman_lane_line import KalmanLaneLine
+from src.tracking.lane_line import LaneLine
+from src.perception import lane_detection
+from src.pipeline.lane_pipeline import LanePipeline
+from src.pipeline import telemetry
+
+FIT = np.array([1e-4, -0.1, 320.0])
+
+class TestKalmanLaneLine(unittest.TestCase):
+    def test_first_fit_and_smoothing(self):
+        line = KalmanLaneLine(height=720)
+        self.assertIsNone(line.get_fit())
+        self.assertIsNone(line.search_margin(np.arange(720)))
+        line.update(FIT)
+        np.testing.assert_allclose(line.get_fit(), FIT)
+
+        # A jump is only partly followed
+        line.update(FIT + [0, 0, 20])
+        c = line.get_fit()[2]
+        self.assertTrue(320 < c < 340)
+
+    def test_margin_narrows_when_tracked_and_widens_when_coasting(self):
+        line = KalmanLaneLine(height=720, process_noise=5, measurement_noise=10,
+                              min_margin=10, max_margin=150)
+        rows = np.arange(720)
+        line.update(FIT)
+        first = line.search_margin(rows)
+        for _ in range(10):
+            line.update(FIT)
+        tracked = line.search_margin(rows)
+        self.assertTrue(np.all(tracked < first))
+        for _ in range(5):
+            line.update(None)
+        coasting = line.search_margin(rows)
+        self.assertTrue(np.all(coasting > tracked))
+        self.assertTrue(np.all(coasting <= 150))
+        self.assertEqual(line.lost_count, 5)
+
+    def test_reset_after_max_lost(self):
+        line = KalmanLaneLine(max_lost=2)
+        line.update(FIT)
+        for _ in range(3):
+            line.update(None)
+        self.assertIsNone(line.get_fit())
+        self.assertEqual(line.resets, 1)
+
+    def test_lane_line_has_no_margin(self):
+        self.assertIsNone(LaneLine().search_margin(np.arange(10)))
+
+class TestAdaptiveSearch(unittest.TestCase):
+    def test_per_line_margins(self):
+        binary = np.zeros((100, 200), dtype=np.uint8)
+        binary[:, 50] = 1
+        binary[:, 62] = 1    # noise next to the left line
+        binary[:, 150] = 1
+        left, right = np.array([0, 0, 50.0]), np.array([0, 0, 150.0])
+        wide = lane_detection.search_around_poly(binary, left, right, fallback=False, margin=20)
+        narrow = lane_detection.search_around_poly(binary, left, right, fallback=False,
+                                                   margin=(np.full(100, 5.0), 20))
+        self.assertEqual(len(wide[2][0]), 200)
+        self.assertEqual(len(narrow[2][0]), 100)
+        self.assertEqual(len(narrow[3][0]), 100)
+
+    def test_pipeline_with_kalman_tracker(self):
+        names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+        names.update(FRAME_SIZE=(640, 360), LANE_TRACKER='kalman')
+        pipeline = LanePipeline(types.SimpleNamespace(**names))
+        self.assertIsInstance(pipeline.left_lane, KalmanLaneLine)
+        for i in range(4):
+            frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+            cv2.line(frame, (110 + i, 360), (290 + i, 215), (0, 220, 255), 8)
+            cv2.line(frame, (560 + i, 360), (350 + i, 215), (0, 220, 255), 8)
+            pipeline.process_frame(frame, draw=False)
+        self.assertEqual(pipeline.last_result['search'], telemetry.SEARCH_AROUND)
+        self.assertTrue(pipeline.last_result['valid'])
+
+        names.update(LANE_TRACKER='unknown')
+        with self.assertRaises(ValueError):
+            LanePipeline(types.SimpleNamespace(**names))
+
+    def test_native_size_frames(self):
+        """With FRAME_SIZE = None the tracker is sized to the actual frames"""
+        names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+        names.update(FRAME_SIZE=None, LANE_TRACKER='kalman')
+        pipeline = LanePipeline(types.SimpleNamespace(**names))
+        frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+        cv2.line(frame, (110, 360), (290, 215), (0, 220, 255), 8)
+        cv2.line(frame, (560, 360), (350, 215), (0, 220, 255), 8)
+        pipeline.process_frame(frame, draw=False)
+        tracker = pipeline.left_lane
+        self.assertEqual(tracker.height, 360)
+        self.assertAlmostEqual(tracker.min_margin, settings.KALMAN_MARGIN_RANGE[0] * 640)
+        self.assertAlmostEqual(tracker.max_margin, settings.KALMAN_MARGIN_RANGE[1] * 640)
+        np.testing.assert_allclose(tracker.R, (settings.KALMAN_MEASUREMENT_NOISE * 640)**2 * np.eye(3))
+        self.assertIsNotNone(tracker.get_fit())
+
+        # Same size: the track carries on
+        pipeline.process_frame(frame, draw=False)
+        self.assertIs(pipeline.left_lane, tracker)
+        self.assertEqual(pipeline.last_result['search'], telemetry.SEARCH_AROUND)
+
+if __name__ == '__main__':
+    unittest.main()
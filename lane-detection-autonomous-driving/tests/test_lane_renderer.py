@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.pipeline.geometry_cache import GeometryCache
+from src.visualization import overlay
+from src.visualization.lane_renderer import LaneRenderer
+
+LEFT_FIT = np.array([1e-4, -0.05, 300.0])
+RIGHT_FIT = np.array([1e-4, -0.05, 980.0])
+
+class TestLaneRenderer(unittest.TestCase):
+    def setUp(self):
+        self.geometry = GeometryCache(settings).get((720, 1280))
+        self.frame = np.full((720, 1280, 3), 90, dtype=np.uint8)
+
+    def test_matches_warped_overlay(self):
+        """Same lane area as warping a filled bird's-eye polygon, up to its edges"""
+        g = self.geometry
+        expected = overlay.draw_lane_area(self.frame, g.roi_mask, LEFT_FIT, RIGHT_FIT, g.Minv, g.ploty, g.ploty_sq)
+        actual = LaneRenderer().draw(self.frame.copy(), LEFT_FIT, RIGHT_FIT, g.Minv, g.ploty)
+        expected_area = (expected != self.frame).any(axis=2)
+        actual_area = (actual != self.frame).any(axis=2)
+        overlap = (expected_area & actual_area).sum() / (expected_area | actual_area).sum()
+        self.assertGreater(overlap, 0.98)
+        # Interior colors agree; the warped overlay only fades out along the edges
+        both = expected_area & actual_area
+        close = np.abs(expected[both].astype(int) - actual[both]).max(axis=1) <= 1
+        self.assertGreater(close.mean(), 0.98)
+
+    def test_reuses_patch_while_fits_hold_still(self):
+        g = self.geometry
+        renderer = LaneRenderer(tolerance=0.5)
+        first = renderer.draw(self.frame.copy(), LEFT_FIT, RIGHT_FIT, g.Minv, g.ploty)
+        second = renderer.draw(self.frame.copy(), LEFT_FIT + [0, 0, 0.2], RIGHT_FIT, g.Minv, g.ploty)
+        self.assertEqual((renderer.renders, renderer.reuses), (1, 1))
+        np.testing.assert_array_equal(first, second)
+
+        renderer.draw(self.frame.copy(), LEFT_FIT + [0, 0, 2.0], RIGHT_FIT, g.Minv, g.ploty)
+        self.assertEqual(renderer.renders, 2)
+        renderer.reset()
+        renderer.draw(self.frame.copy(), LEFT_FIT + [0, 0, 2.0], RIGHT_FIT, g.Minv, g.ploty)
+        self.assertEqual(renderer.renders, 3)
+
+    def test_missing_fit_leaves_frame(self):
+        frame = self.frame.copy()
+        LaneRenderer().draw(frame, None, RIGHT_FIT, self.geometry.Minv)
+        np.testing.assert_array_equal(frame, self.frame)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+import json
+import numpy as np
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pipeline.metrics import PipelineMetrics
+from src.pipeline.lane_pipeline import LanePipeline
+
+class TestPipelineMetrics(unittest.TestCase):
+    def test_rolling_quantiles(self):
+        metrics = PipelineMetrics(window=100)
+        # Old samples fall out of the window
+        for _ in range(100):
+            metrics.observe('warp', 1.0)
+        for i in range(100):
+            metrics.observe('warp', i / 1000.0)
+        stage = metrics.snapshot()['stages']['warp']
+        self.assertEqual(stage['count'], 200)
+        self.assertAlmostEqual(stage['p50'], 0.0495)
+        self.assertLess(stage['p99'], 0.1)
+
+    def test_exports(self):
+        metrics = PipelineMetrics()
+        metrics.observe('threshold', 0.002)
+        metrics.increment('validation_rejections')
+        data = json.loads(metrics.to_json())
+        self.assertEqual(data['counters']['validation_rejections'], 1)
+        text = metrics.to_prometheus()
+        self.assertIn('lane_pipeline_stage_seconds{stage="threshold",quantile="0.5"} 0.002000000', text)
+        self.assertIn('lane_pipeline_validation_rejections_total 1', text)
+
+    def test_pipeline_counts_rejections(self):
+        pipeline = LanePipeline()
+        blank = np.zeros((720, 1280, 3), dtype=np.uint8)
+        for _ in range(12):
+            pipeline.process_frame(blank)
+        counters = pipeline.metrics.snapshot()['counters']
+        self.assertEqual(counters['frames'], 12)
+        self.assertEqual(counters['sliding_window_searches'], 12)
+        self.assertEqual(counters['validation_rejections'], 12)
+        # Each tracker resets after more than max_lost (10) lost frames
+        self.assertEqual(counters['lane_resets'], 2)
+        self.assertEqual(pipeline.metrics.stages['overlay'].count, 12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import sys
+import os
+import types
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.pipeline.lane_pipeline import LanePipeline
+from src.pipeline.parallel_runner import ParallelVideoRunner
+
+def make_config(**overrides):
+    names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+    names.update(overrides)
+    return types.SimpleNamespace(**names)
+
+def make_frame(i):
+    # Two bright lane markings on a dark road, drifting slowly
+    frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+    shift = i * 2
+    cv2.line(frame, (110 + shift, 360), (290 + shift, 215), (0, 220, 255), 8)
+    cv2.line(frame, (560 + shift, 360), (350 + shift, 215), (0, 220, 255), 8)
+    return frame
+
+class TestParallelVideoRunner(unittest.TestCase):
+    def test_matches_serial_pipeline(self):
+        frames = [make_frame(i) for i in range(8)]
+
+        serial_pipeline = LanePipeline()
+        expected = [serial_pipeline.process_frame(frame.copy()) for frame in frames]
+
+        results = []
+        runner = ParallelVideoRunner(LanePipeline(), workers=2, queue_depth=3)
+        count = runner.run(iter(frames), frames[0].shape, lambda result: results.append(result.copy()))
+
+        self.assertEqual(count, len(frames))
+        for actual, reference in zip(results, expected):
+            np.testing.assert_array_equal(actual, reference)
+
+    def test_custom_preprocessing_settings(self):
+        """The workers preprocess with the pipeline's config, not the defaults"""
+        frames = [make_frame(i) for i in range(6)]
+        for overrides in ({'FRAME_SIZE': None}, {'DETECTION_SCALE': 0.5},
+                          {'SOBEL_X_THRESHOLD': (50, 100), 'S_CHANNEL_THRESHOLD': (200, 255)},
+                          {'FRAME_SIZE': (960, 540), 'DETECTION_SCALE': 0.5, 'CROP_TO_ROI': False}):
+            with self.subTest(**overrides):
+                serial_pipeline = LanePipeline(make_config(**overrides))
+                expected = [serial_pipeline.process_frame(frame.copy()) for frame in frames]
+
+                results = []
+                runner = ParallelVideoRunner(LanePipeline(make_config(**overrides)), workers=2, queue_depth=3)
+                runner.run(iter(frames), frames[0].shape, lambda result: results.append(result.copy()))
+
+                self.assertEqual(len(results), len(frames))
+                for actual, reference in zip(results, expected):
+                    np.testing.assert_array_equal(actual, reference)
+
+    def test_rejects_mismatched_frames(self):
+        frames = [make_frame(0), np.zeros((100, 100, 3), dtype=np.uint8)]
+        runner = ParallelVideoRunner(LanePipeline(), workers=1, queue_depth=2)
+        with self.assertRaises(RuntimeError):
+            runner.run(iter(frames), frames[0].shape, lambda result: None)
+
+if __name__ == '__main__':
+    unittest.main()
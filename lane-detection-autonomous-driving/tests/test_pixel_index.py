@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.perception.pixel_index import RowIndex
+
+def random_binary(height=120, width=200, density=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((height, width)) < density).astype(np.uint8) * 255
+
+class TestRowIndex(unittest.TestCase):
+    def setUp(self):
+        self.binary = random_binary()
+        nonzero = self.binary.nonzero()
+        self.y, self.x = np.array(nonzero[0]), np.array(nonzero[1])
+        self.index = RowIndex(self.binary)
+
+    def test_matches_nonzero(self):
+        np.testing.assert_array_equal(self.index.y, self.y)
+        np.testing.assert_array_equal(self.index.x, self.x)
+        np.testing.assert_array_equal(self.index.row_counts(), (self.binary > 0).sum(axis=1))
+
+    def test_band_matches_mask(self):
+        # Includes windows partly or wholly outside the image
+        for y_low, y_high, x_low, x_high in ((10, 50, 30, 90), (-20, 15, -40, 60),
+                                             (100, 160, 150, 260), (60, 60, 0, 200), (0, 120, 300, 400)):
+            expected = ((self.y >= y_low) & (self.y < y_high) &
+                        (self.x >= x_low) & (self.x < x_high)).nonzero()[0]
+            np.testing.assert_array_equal(self.index.band(y_low, y_high, x_low, x_high), expected)
+
+    def test_between_matches_mask(self):
+        rows = np.arange(self.binary.shape[0])
+        # Fractional and exactly integer bounds, some outside the image
+        for fit in ((1e-3, 0.2, 40.5), (0.0, 0.0, 100.0), (-2e-3, 0.5, -30.25)):
+            center = fit[0]*rows**2 + fit[1]*rows + fit[2]
+            lower, upper = center - 25, center + 25
+            expected = ((self.x > lower[self.y]) & (self.x < upper[self.y])).nonzero()[0]
+            np.testing.assert_array_equal(self.index.between(lower, upper), expected)
+
+    def test_empty_image(self):
+        index = RowIndex(np.zeros((40, 60), dtype=np.uint8))
+        self.assertEqual(len(index), 0)
+        self.assertEqual(len(index.band(0, 40, 0, 60)), 0)
+        self.assertEqual(len(index.between(np.zeros(40), np.full(40, 60.0))), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+import warnings
+import numpy as np
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.perception import poly_fit
+
+def lane_pixels(count, fit, noise=15.0, rows=(0, 720), seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.integers(rows[0], rows[1], count)
+    x = np.polyval(fit, y) + rng.normal(0, noise, count)
+    return x.astype(np.int64), y
+
+class TestPolyFit(unittest.TestCase):
+    def assert_same_curve(self, fit, expected, y):
+        rows = np.arange(y.min(), y.max() + 1)
+        np.testing.assert_allclose(np.polyval(fit, rows), np.polyval(expected, rows), atol=1e-6)
+
+    def test_matches_polyfit(self):
+        for seed, fit in enumerate(([2e-4, -0.3, 400.0], [-5e-4, 0.6, 900.0], [0.0, 0.0, 640.0])):
+            x, y = lane_pixels(20000, fit, seed=seed)
+            self.assert_same_curve(poly_fit.fit_quadratic(x, y), np.polyfit(y, x, 2), y)
+
+    def test_weighted_matches_polyfit(self):
+        x, y = lane_pixels(5000, [1e-4, 0.1, 300.0])
+        weights = np.random.default_rng(1).random(len(x))
+        expected = np.polyfit(y, x, 2, w=np.sqrt(weights))
+        self.assert_same_curve(poly_fit.fit_quadratic(x, y, weights), expected, y)
+
+    def test_fit_many(self):
+        left = lane_pixels(8000, [2e-4, -0.2, 350.0], seed=2)
+        right = lane_pixels(6000, [2e-4, -0.2, 950.0], seed=3)
+        empty = (np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+        left_fit, none_fit, right_fit = poly_fit.fit_many([left, empty, right], center=359.5, scale=359.5)
+        self.assertIsNone(none_fit)
+        self.assert_same_curve(left_fit, np.polyfit(left[1], left[0], 2), left[1])
+        self.assert_same_curve(right_fit, np.polyfit(right[1], right[0], 2), right[1])
+
+    def test_incremental_refit(self):
+        # Swapping one window's pixels for new ones equals fitting the new set
+        old_window = lane_pixels(500, [0.0, 0.0, 500.0], rows=(0, 80), seed=4)
+        new_window = lane_pixels(500, [0.0, 0.0, 520.0], rows=(0, 80), seed=5)
+        rest = lane_pixels(5000, [1e-4, 0.0, 480.0], rows=(80, 720), seed=6)
+        moments = poly_fit.QuadraticMoments(359.5, 359.5).add(*rest).add(*old_window)
+        moments.remove(*old_window).add(*new_window)
+        x = np.concatenate([rest[0], new_window[0]])
+        y = np.concatenate([rest[1], new_window[1]])
+        self.assert_same_curve(moments.solve(), np.polyfit(y, x, 2), y)
+
+    def test_singular_falls_back_to_polyfit(self):
+        x, y = np.array([100, 104, 110]), np.array([300, 300, 301])
+        self.assertIsNone(poly_fit.QuadraticMoments().add(x, y).solve())
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            expected = np.polyfit(y, x, 2)
+            np.testing.assert_allclose(poly_fit.fit_quadratic(x, y), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import sys
+import os
+import types
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.preprocessing import image_utils
+from src.preprocessing.buffer_pool import BufferPool
+from src.pipeline.lane_pipeline import LanePipeline
+
+def make_frame(i):
+    # Two bright lane markings on a dark road, drifting slowly
+    frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+    shift = i * 2
+    cv2.line(frame, (110 + shift, 360), (290 + shift, 215), (0, 220, 255), 8)
+    cv2.line(frame, (560 + shift, 360), (350 + shift, 215), (0, 220, 255), 8)
+    return frame
+
+def make_config(**overrides):
+    names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+    names.update(overrides)
+    return types.SimpleNamespace(**names)
+
+class TestProcessBatch(unittest.TestCase):
+    def test_batch_threshold_matches_fused(self):
+        rng = np.random.default_rng(0)
+        frames = rng.integers(0, 256, (4, 45, 80, 3), dtype=np.uint8)
+        frames[1] = 10  # no gradient at all
+        batch = image_utils.batch_threshold(frames, BufferPool())
+        pool = BufferPool()
+        for frame, binary in zip(frames, batch):
+            np.testing.assert_array_equal(binary, image_utils.fused_threshold(frame, pool))
+
+    def test_matches_process_frame(self):
+        frames = np.stack([make_frame(i) for i in range(6)])
+        # Budget of two frames per batch to exercise chunking
+        config = make_config(BATCH_PIXEL_BUDGET=2 * 1280 * 720)
+
+        serial = LanePipeline(config)
+        expected = [serial.process_frame(frame) for frame in frames]
+
+        batched = LanePipeline(config)
+        results = batched.process_batch(frames)
+
+        self.assertEqual(results.shape, (6, 720, 1280, 3))
+        for actual, reference in zip(results, expected):
+            np.testing.assert_array_equal(actual, reference)
+        np.testing.assert_array_equal(batched.left_lane.get_fit(), serial.left_lane.get_fit())
+
+    def test_crop_to_roi_matches_full_frame(self):
+        frames = np.stack([make_frame(i) for i in range(3)])
+        cropped = LanePipeline(make_config(CROP_TO_ROI=True))
+        full = LanePipeline(make_config(CROP_TO_ROI=False))
+        for frame in frames:
+            np.testing.assert_array_equal(cropped.preprocess(frame)[1], full.preprocess(frame)[1])
+        np.testing.assert_array_equal(cropped.preprocess_batch(frames)[1], full.preprocess_batch(frames)[1])
+
+    def test_multiscale_matches_process_frame(self):
+        frames = np.stack([make_frame(i) for i in range(4)])
+        config = make_config(DETECTION_SCALE=0.5, FRAME_SIZE=None)
+
+        serial = LanePipeline(config)
+        expected = [serial.process_frame(frame) for frame in frames]
+        results = LanePipeline(config).process_batch(frames)
+
+        # Native resolution output, detection at half of it
+        self.assertEqual(results.shape, frames.shape)
+        self.assertEqual(serial.detection_size(frames.shape[1:]), (320, 180))
+        for actual, reference in zip(results, expected):
+            np.testing.assert_array_equal(actual, reference)
+
+    def test_multiscale_fits_in_frame_coordinates(self):
+        frames = [make_frame(i) for i in range(4)]
+        full = LanePipeline(make_config(FRAME_SIZE=None))
+        half = LanePipeline(make_config(FRAME_SIZE=None, DETECTION_SCALE=0.5))
+        for frame in frames:
+            full.process_frame(frame)
+            half.process_frame(frame)
+        rows = np.arange(360)
+        for full_lane, half_lane in ((full.left_lane, half.left_lane), (full.right_lane, half.right_lane)):
+            np.testing.assert_allclose(np.polyval(half_lane.get_fit(), rows),
+                                       np.polyval(full_lane.get_fit(), rows), atol=4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import sys
+import os
+import types
+import json
+import asyncio
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.pipeline.service import FRAME_HEADER, LaneService, LaneClient, read_message
+from src.pipeline.lane_pipeline import LanePipeline
+
+def make_config():
+    names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+    names.update(FRAME_SIZE=(640, 360), METRICS_ENABLED=False)
+    return types.SimpleNamespace(**names)
+
+def make_frame(i, shift=0):
+    frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+    cv2.line(frame, (110 + i + shift, 360), (290 + i + shift, 215), (0, 220, 255), 8)
+    cv2.line(frame, (560 + i + shift, 360), (350 + i + shift, 215), (0, 220, 255), 8)
+    return frame
+
+def encode(frame):
+    # Lossless, so the service sees exactly the frames the reference pipeline does
+    return cv2.imencode('.png', frame)[1].tobytes()
+
+class TestLaneService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        config = make_config()
+        self.service = LaneService(lambda: LanePipeline(config), max_batch=4, max_wait=0.05)
+        self.server = await self.service.start('127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.service.stop()
+
+    async def test_streams_match_direct_processing(self):
+        streams = {'a': 0, 'b': 12}
+        clients = {name: await LaneClient.connect('127.0.0.1', self.port) for name in streams}
+        # Pipeline every frame of both streams, then collect the answers
+        for i in range(5):
+            for name, shift in streams.items():
+                await clients[name].send(name, encode(make_frame(i, shift)), timestamp=i * 0.1)
+        responses = {name: [(await clients[name].receive())[0] for _ in range(5)] for name in streams}
+        for client in clients.values():
+            await client.close()
+
+        config = make_config()
+        for name, shift in streams.items():
+            pipeline = LanePipeline(config)
+            self.assertEqual([r['id'] for r in responses[name]], list(range(5)))
+            for i, response in enumerate(responses[name]):
+                pipeline.process_frame(make_frame(i, shift), dt=None if i == 0 else 0.1, draw=False)
+                self.assertTrue(response['valid'])
+                np.testing.assert_allclose(response['left_fit'], pipeline.last_result['left_fit'])
+                self.assertAlmostEqual(response['steering'], pipeline.last_result['steering'])
+        # Requests from both streams were batched together
+        self.assertGreater(max(r['batch_size'] for r in responses['a']), 1)
+        self.assertLess(self.service.batches, 10)
+
+    async def test_overlay_and_errors(self):
+        client = await LaneClient.connect('127.0.0.1', self.port)
+        header, overlay = await client.process(0, make_frame(0), overlay=True)
+        self.assertEqual(overlay.shape, (360, 640, 3))
+        self.assertIn('offset', header)
+
+        header, overlay = await client.process(0, b'not an image')
+        self.assertIn('error', header)
+        self.assertIsNone(overlay)
+        await client.close()
+
+    async def send_raw(self, writer, header, payload=b''):
+        # Any header bytes, bypassing LaneClient's well-formed requests
+        writer.writelines([FRAME_HEADER.pack(len(header), len(payload)), header, payload])
+        await writer.drain()
+
+    async def test_malformed_requests(self):
+        """Bad requests get an error response and break neither their connection nor the service"""
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        bad = [b'[1]', json.dumps({'id': 1, 'timestamp': '1'}).encode(), json.dumps({'id': 2, 'stream': [0]}).encode(),
+               b'{"id": 3', b'\xff\xfe']
+        for header in bad:
+            await self.send_raw(writer, header, encode(make_frame(0)))
+        await self.send_raw(writer, json.dumps({'id': 4, 'stream': 0}).encode(), encode(make_frame(0)))
+        responses = [(await asyncio.wait_for(read_message(reader), 10))[0] for _ in range(len(bad) + 1)]
+        for response in responses[:-1]:
+            self.assertIn('error', response)
+        self.assertEqual([response['id'] for response in responses[1:3]], [1, 2])
+        self.assertEqual(responses[-1]['id'], 4)
+        self.assertNotIn('error', responses[-1])
+        writer.close()
+
+        # A second connection is still served
+        client = await LaneClient.connect('127.0.0.1', self.port)
+        header, _ = await asyncio.wait_for(client.process(0, encode(make_frame(1))), 10)
+        self.assertNotIn('error', header)
+        await client.close()
+
+class TestStreamLimit(unittest.TestCase):
+    def test_least_recently_used_stream_is_dropped(self):
+        config = make_config()
+        service = LaneService(lambda: LanePipeline(config), max_streams=2)
+        self.addCleanup(service._executor.shutdown)
+        payload = encode(make_frame(0))
+        for stream in ('a', 'b', 'a', 'c'):
+            service.process_batch([({'id': 0, 'stream': stream, 'timestamp': 0.0}, payload, None, 0.0)])
+        self.assertEqual(list(service.streams), ['a', 'c'])
+        self.assertEqual(set(service._last_timestamps), {'a', 'c'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+import types
+import tempfile
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.pipeline import stage_cache
+from src.pipeline.stage_cache import StageCache
+from src.pipeline.lane_pipeline import LanePipeline
+
+def make_config(**overrides):
+    names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+    names.update(FRAME_SIZE=(640, 360))
+    names.update(overrides)
+    return types.SimpleNamespace(**names)
+
+def make_frame(i):
+    frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+    cv2.line(frame, (110 + i, 360), (290 + i, 215), (0, 220, 255), 8)
+    cv2.line(frame, (560 + i, 360), (350 + i, 215), (0, 220, 255), 8)
+    return frame
+
+class TestStageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_bit_packed_round_trip_and_persistence(self):
+        rng = np.random.default_rng(0)
+        binary = np.where(rng.random((13, 21)) < 0.3, 255, 0).astype(np.uint8)
+        key = stage_cache.frame_key(binary)
+        config = make_config()
+
+        cache = StageCache(self.tmp.name)
+        self.assertIsNone(cache.get('mask', key, config, binary.shape))
+        cache.put('mask', key, config, binary)
+        np.testing.assert_array_equal(cache.get('mask', key, config, binary.shape), binary)
+        cache.close()
+
+        cache = StageCache(self.tmp.name)
+        np.testing.assert_array_equal(cache.get('mask', key, config, binary.shape), binary)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        cache.close()
+
+    def test_upstream_settings_change_the_key(self):
+        binary = np.full((4, 8), 255, dtype=np.uint8)
+        key = stage_cache.frame_key(binary)
+        cache = StageCache(self.tmp.name)
+        cache.put('mask', key, make_config(), binary)
+        self.assertIsNotNone(cache.get('mask', key, make_config(STEERING_KP=1.0), binary.shape))
+        self.assertIsNone(cache.get('mask', key, make_config(S_CHANNEL_THRESHOLD=(100, 255)), binary.shape))
+        self.assertIsNone(cache.get('mask', key, make_config(ROI_VERTICES=settings.ROI_VERTICES * 0.9),
+                                    binary.shape))
+        cache.close()
+
+    def test_pipeline_hits_match_fresh_results(self):
+        frames = [make_frame(i) for i in range(4)]
+        config = make_config(STAGE_CACHE_DIR=self.tmp.name)
+        results = []
+        for run in range(2):
+            pipeline = LanePipeline(config)
+            for frame in frames:
+                pipeline.process_frame(frame.copy(), draw=False)
+            results.append(pipeline.last_result)
+            counters = pipeline.metrics.counters
+            pipeline.stage_cache.close()
+        self.assertEqual(counters['stage_cache_hits'], 4)
+        self.assertEqual(counters['stage_cache_misses'], 0)
+
+        reference = LanePipeline(make_config())
+        for frame in frames:
+            reference.process_frame(frame.copy(), draw=False)
+        for result in results:
+            np.testing.assert_array_equal(result['left_fit'], reference.last_result['left_fit'])
+            self.assertEqual(result['steering'], reference.last_result['steering'])
+
+    def test_crop_origin_is_part_of_the_key(self):
+        """SRC_POINTS that shift the crop without resizing it miss the cache"""
+        roi = np.array([[(0.3, 1.0), (0.45, 0.6), (0.55, 0.6), (0.7, 1.0)]])
+        src = np.array([[0.4, 0.6], [0.1, 1.0], [0.9, 1.0], [0.6, 0.6]])
+        shifted = src + (0.05, 0.0)
+        frame = make_frame(0)
+        config = make_config(STAGE_CACHE_DIR=self.tmp.name, ROI_VERTICES=roi, SRC_POINTS=src)
+        first = LanePipeline(config)
+        first.process_frame(frame.copy(), draw=False)
+        first.stage_cache.close()
+
+        config = make_config(STAGE_CACHE_DIR=self.tmp.name, ROI_VERTICES=roi, SRC_POINTS=shifted)
+        second = LanePipeline(config)
+        crops = [pipeline.geometry_cache.get((360, 640)).crop for pipeline in (first, second)]
+        self.assertNotEqual(crops[0][:2], crops[1][:2])
+        self.assertEqual(crops[0][2] - crops[0][0], crops[1][2] - crops[1][0])
+        self.assertEqual(crops[0][3] - crops[0][1], crops[1][3] - crops[1][1])
+        _, warped = second.preprocess(frame.copy())
+        self.assertEqual(second.metrics.counters['stage_cache_hits'], 0)
+        second.stage_cache.close()
+
+        _, expected = LanePipeline(make_config(ROI_VERTICES=roi, SRC_POINTS=shifted)).preprocess(frame.copy())
+        np.testing.assert_array_equal(warped, expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import sys
+import os
+import subprocess
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pipeline.lane_pipeline import LanePipeline
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def make_frame(i):
+    # Two bright lane markings on a dark road, drifting slowly
+    frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+    shift = i * 2
+    cv2.line(frame, (110 + shift, 360), (290 + shift, 215), (0, 220, 255), 8)
+    cv2.line(frame, (560 + shift, 360), (350 + shift, 215), (0, 220, 255), 8)
+    return frame
+
+class TestStartup(unittest.TestCase):
+    def test_headless_imports_stay_lazy(self):
+        """Importing the pipeline and run.py loads neither moviepy nor the overlay code"""
+        code = ("import sys, run\n"
+                "from src.pipeline.lane_pipeline import LanePipeline\n"
+                "LanePipeline().warm_up((90, 160, 3), draw=False)\n"
+                "print(sorted(m for m in ('moviepy', 'src.visualization.overlay',\n"
+                "                         'src.visualization.lane_renderer') if m in sys.modules))")
+        out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout
+        self.assertEqual(out.strip(), '[]')
+
+    def test_prewarmed_matches_fresh(self):
+        """A warmed-up pipeline produces exactly what a fresh one does"""
+        fresh = LanePipeline()
+        warmed = LanePipeline.prewarmed(input_shape=(360, 640, 3))
+        self.assertIsNone(warmed.last_result)
+        if warmed.metrics is not None:
+            self.assertEqual(warmed.metrics.snapshot(), LanePipeline().metrics.snapshot())
+        for i in range(4):
+            expected = fresh.process_frame(make_frame(i))
+            output = warmed.process_frame(make_frame(i))
+            np.testing.assert_array_equal(output, expected)
+            self.assertEqual(warmed.last_result['steering'], fresh.last_result['steering'])
+
+if __name__ == '__main__':
+    unittest.main()
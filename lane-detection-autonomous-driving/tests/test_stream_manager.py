@@ -0,0 +1,130 @@
+import unittest
+import sys
+import os
+import threading
+import types
+import numpy as np
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.pipeline import stream_manager
+from src.pipeline.stream_manager import StreamManager
+from src.pipeline.lane_pipeline import LanePipeline
+
+class GatedPipeline:
+    """Stands in for LanePipeline; each frame waits for `gate` and is recorded"""
+    def __init__(self, log, gate):
+        self.log = log
+        self.gate = gate
+        self.dts = []
+
+    def process_frame(self, frame, dt=None, draw=True):
+        self.gate.wait()
+        if frame == 'bad':
+            raise RuntimeError("bad frame")
+        self.log.append(frame)
+        self.dts.append(dt)
+        return frame
+
+class TestStreamManager(unittest.TestCase):
+    def make_manager(self, **kwargs):
+        self.log = []
+        self.gate = threading.Event()
+        manager = StreamManager(lambda: GatedPipeline(self.log, self.gate), **kwargs)
+        self.addCleanup(manager.close)
+        self.addCleanup(self.gate.set)
+        return manager
+
+    def test_round_robin_and_per_stream_order(self):
+        manager = self.make_manager(workers=1, queue_size=8)
+        for name in 'abc':
+            manager.add_stream(name)
+        # Stream a floods its queue before the others submit anything
+        for i in range(4):
+            manager.submit('a', i * 0.1, f'a{i}')
+        for i in range(2):
+            manager.submit('b', i * 0.1, f'b{i}')
+            manager.submit('c', i * 0.1, f'c{i}')
+        self.gate.set()
+        manager.join()
+        # a0 was dispatched at once; afterwards the streams take turns
+        self.assertEqual(self.log, ['a0', 'b0', 'c0', 'a1', 'b1', 'c1', 'a2', 'a3'])
+        pipeline = manager.streams['a'].pipeline
+        self.assertIsNone(pipeline.dts[0])
+        np.testing.assert_allclose(pipeline.dts[1:], [0.1, 0.1, 0.1])
+
+    def test_drop_policies(self):
+        for policy, kept in ((stream_manager.DROP_OLDEST, ['f0', 'f3', 'f4']),
+                             (stream_manager.DROP_NEWEST, ['f0', 'f1', 'f2'])):
+            manager = self.make_manager(workers=1, queue_size=2, drop_policy=policy)
+            manager.add_stream('s')
+            # f0 goes straight to the (blocked) worker, the queue holds two more
+            accepted = [manager.submit('s', i, f'f{i}') for i in range(5)]
+            self.gate.set()
+            manager.join()
+            self.assertEqual(self.log, kept)
+            self.assertEqual(accepted, [True] * 5 if policy == stream_manager.DROP_OLDEST
+                             else [True, True, True, False, False])
+            stats = manager.stats()['s']
+            self.assertEqual((stats['submitted'], stats['processed'], stats['dropped']), (5, 3, 2))
+
+        with self.assertRaises(ValueError):
+            StreamManager(lambda: None, drop_policy='sometimes')
+
+    def test_block_loses_nothing(self):
+        manager = self.make_manager(workers=2, queue_size=1, drop_policy=stream_manager.BLOCK)
+        self.gate.set()
+        frames = {name: [(i, f'{name}{i}') for i in range(6)] for name in 'xy'}
+        stats = manager.run(frames)
+        self.assertEqual([f for f in self.log if f[0] == 'x'], [f'x{i}' for i in range(6)])
+        self.assertEqual(stats['y']['processed'], 6)
+        self.assertEqual(stats['y']['dropped'], 0)
+
+    def test_errors_and_callbacks(self):
+        manager = self.make_manager(workers=2)
+        results = []
+        manager.add_stream('s', on_result=lambda name, output, info: results.append((output, info['error'])))
+        self.gate.set()
+        for frame in ('ok', 'bad', 'ok'):
+            manager.submit('s', 0.0, frame)
+        manager.join()
+        self.assertEqual([output for output, _ in results], ['ok', None, 'ok'])
+        self.assertIsInstance(results[1][1], RuntimeError)
+        self.assertEqual(manager.stats()['s']['errors'], 1)
+
+    def test_raising_callback_does_not_stall(self):
+        manager = self.make_manager(workers=1, queue_size=1, drop_policy=stream_manager.BLOCK)
+        seen = []
+
+        def on_result(name, output, info):
+            seen.append(output)
+            raise IOError("writer failed")
+
+        manager.add_stream('s', on_result=on_result)
+        self.gate.set()
+        # With BLOCK and a queue of one, submit waits on the previous frames
+        done = threading.Thread(target=lambda: [manager.submit('s', i, f'f{i}') for i in range(4)] and manager.join())
+        done.start()
+        done.join(timeout=5)
+        self.assertFalse(done.is_alive())
+        self.assertEqual(seen, ['f0', 'f1', 'f2', 'f3'])
+        stats = manager.stats()['s']
+        self.assertEqual((stats['processed'], stats['callback_errors']), (4, 4))
+        self.assertIsInstance(manager.streams['s'].callback_error, IOError)
+
+    def test_lane_pipelines_keep_separate_state(self):
+        names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+        names.update(FRAME_SIZE=(320, 180), METRICS_ENABLED=False)
+        config = types.SimpleNamespace(**names)
+        with StreamManager(lambda: LanePipeline(config), workers=2, queue_size=4,
+                           drop_policy=stream_manager.BLOCK, draw=False) as manager:
+            frames = np.zeros((3, 180, 320, 3), dtype=np.uint8)
+            stats = manager.run({'front': enumerate(frames), 'rear': enumerate(frames)})
+            self.assertIsNot(manager.streams['front'].pipeline, manager.streams['rear'].pipeline)
+        self.assertEqual(stats['front']['processed'], 3)
+        self.assertEqual(stats['rear']['processed'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
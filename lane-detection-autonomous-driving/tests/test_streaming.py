@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pipeline import streaming
+
+class RecordingPipeline:
+    """Stands in for LanePipeline; records the options each frame was processed with"""
+    def __init__(self):
+        self.calls = []
+
+    def process_frame(self, frame, dt=None, draw=True, sliding_window_fallback=True):
+        self.calls.append({'dt': dt, 'draw': draw, 'fallback': sliding_window_fallback})
+        return frame
+
+def run_frames(runner, count, latencies, frame_interval=0.1):
+    """Feed `count` frames; processed frames take the given latencies in turn"""
+    # perf_counter is read before and after each processed frame
+    clock = []
+    for latency in latencies:
+        clock += [0.0, latency]
+    with mock.patch.object(streaming.time, 'perf_counter', side_effect=clock):
+        return [runner.process(i * frame_interval, 'frame')[1] for i in range(count)]
+
+class TestStreamingRunner(unittest.TestCase):
+    def test_degrades_one_level_per_overrun(self):
+        pipeline = RecordingPipeline()
+        runner = streaming.StreamingRunner(pipeline, budget=0.01)
+        infos = run_frames(runner, 3, [0.02, 0.02, 0.02])
+        self.assertEqual([info['level'] for info in infos],
+                         [streaming.LEVEL_FULL, streaming.LEVEL_NO_OVERLAY, streaming.LEVEL_FAST_SEARCH])
+        self.assertEqual([call['draw'] for call in pipeline.calls], [True, False, False])
+        self.assertEqual([call['fallback'] for call in pipeline.calls], [True, True, False])
+        self.assertEqual(runner.level, streaming.LEVEL_DROP)
+
+    def test_drops_frames_to_pay_off_debt(self):
+        pipeline = RecordingPipeline()
+        runner = streaming.StreamingRunner(pipeline, budget=0.01)
+        runner.level = streaming.LEVEL_DROP
+        infos = run_frames(runner, 4, [0.03, 0.005])
+        self.assertEqual([info['dropped'] for info in infos], [False, True, True, False])
+        # PID time step spans the dropped frames
+        self.assertAlmostEqual(pipeline.calls[-1]['dt'], 0.3)
+
+    def test_recovers_when_fast(self):
+        runner = streaming.StreamingRunner(RecordingPipeline(), budget=0.01, recover_frames=3)
+        runner.level = streaming.LEVEL_FAST_SEARCH
+        run_frames(runner, 3, [0.001] * 3)
+        self.assertEqual(runner.level, streaming.LEVEL_NO_OVERLAY)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.pipeline import sweep
+from src.pipeline.frame_store import decode_to_store
+
+def make_frame(i):
+    frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+    shift = i % 5
+    cv2.line(frame, (110 + shift, 360), (290 + shift, 215), (0, 220, 255), 8)
+    cv2.line(frame, (560 + shift, 360), (350 + shift, 215), (0, 220, 255), 8)
+    return frame
+
+class TestSweep(unittest.TestCase):
+    def test_spaces(self):
+        candidates = list(sweep.grid({'STEERING_KP': [1, 2], 'SEARCH_MARGIN': [0.05, 0.1, 0.2]}))
+        self.assertEqual(len(candidates), 6)
+        self.assertEqual(len({tuple(sorted(c.items())) for c in candidates}), 6)
+
+        samples = list(sweep.random_search({'STEERING_KP': {'low': 1, 'high': 100, 'log': True},
+                                            'SLIDING_WINDOWS': {'low': 6, 'high': 12, 'int': True},
+                                            'CROP_TO_ROI': [True, False]}, 20, seed=1))
+        self.assertEqual(len(samples), 20)
+        for sample in samples:
+            self.assertTrue(1 <= sample['STEERING_KP'] <= 100)
+            self.assertIsInstance(sample['SLIDING_WINDOWS'], int)
+        self.assertEqual(samples, list(sweep.random_search({'STEERING_KP': {'low': 1, 'high': 100, 'log': True},
+                                                            'SLIDING_WINDOWS': {'low': 6, 'high': 12, 'int': True},
+                                                            'CROP_TO_ROI': [True, False]}, 20, seed=1)))
+
+    def test_make_config(self):
+        config = sweep.make_config({'S_CHANNEL_THRESHOLD': [120, 255], 'STEERING_KP': 3.0})
+        self.assertEqual(config.S_CHANNEL_THRESHOLD, (120, 255))
+        self.assertEqual(config.STEERING_KP, 3.0)
+        self.assertEqual(config.SEARCH_MARGIN, settings.SEARCH_MARGIN)
+        with self.assertRaises(KeyError):
+            sweep.make_config({'STEERING_KQ': 1.0})
+
+    def test_groups_share_preprocessing(self):
+        candidates = [{'STEERING_KP': 1.0}, {'STEERING_KP': 2.0},
+                      {'S_CHANNEL_THRESHOLD': (120, 255)}, {'LANE_SMOOTHING_ALPHA': 0.5}]
+        groups = sorted(sweep.group_by_upstream(candidates))
+        self.assertEqual(groups, [[0, 1, 3], [2]])
+
+    def test_run_sweep(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = os.path.join(tmp, 'clip')
+            decode_to_store('clip.mp4', store, frames=[(i / 30, make_frame(i)) for i in range(12)])
+            candidates = [{'FRAME_SIZE': (640, 360), 'LANE_SMOOTHING_ALPHA': alpha} for alpha in (0.1, 1.0)]
+            results = sweep.run_sweep([store], candidates, workers=1)
+
+        self.assertEqual(len(results), 2)
+        for result in results:
+            metrics = result['metrics']
+            self.assertEqual(metrics['frames'], 12)
+            self.assertEqual(metrics['detection_rate'], 1.0)
+            self.assertEqual(metrics['rejection_rate'], 0.0)
+            self.assertGreater(metrics['ms_per_frame'], 0)
+        # Heavier smoothing moves the tracked lines less between frames
+        by_alpha = {r['overrides']['LANE_SMOOTHING_ALPHA']: r['metrics'] for r in results}
+        self.assertLess(by_alpha[0.1]['jitter'], by_alpha[1.0]['jitter'])
+        self.assertGreaterEqual(results[0]['score'], results[1]['score'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.pipeline import telemetry
+from src.pipeline.lane_pipeline import LanePipeline
+
+def make_frame(i):
+    # Two bright lane markings on a dark road, drifting slowly
+    frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+    shift = i * 2
+    cv2.line(frame, (110 + shift, 360), (290 + shift, 215), (0, 220, 255), 8)
+    cv2.line(frame, (560 + shift, 360), (350 + shift, 215), (0, 220, 255), 8)
+    return frame
+
+def make_result(i):
+    return {
+        'left_fit': None if i == 0 else np.array([1e-4, 0.1, 300.0 + i]),
+        'right_fit': None if i == 0 else np.array([1e-4, 0.1, 980.0 + i]),
+        'offset': 0.01 * i,
+        'curvature': 1000.0 + i,
+        'steering': -0.5 * i,
+        'confidence': telemetry.CONFIDENCE_NONE if i == 0 else telemetry.CONFIDENCE_HIGH,
+        'search': telemetry.SEARCH_SLIDING_WINDOW if i < 2 else telemetry.SEARCH_AROUND,
+        'valid': i % 3 != 0,
+    }
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, count, chunk_size=4):
+        path = os.path.join(self.tmp.name, name)
+        with telemetry.TelemetryWriter(path, chunk_size) as writer:
+            for i in range(count):
+                writer.append(i, i / 30.0, make_result(i))
+        return path
+
+    def check_records(self, records, count):
+        self.assertEqual(len(records), count)
+        np.testing.assert_array_equal(records['frame'], np.arange(count))
+        np.testing.assert_allclose(records['timestamp'], np.arange(count) / 30.0)
+        self.assertTrue(np.isnan(records['left_fit'][0]).all())
+        np.testing.assert_allclose(records['right_fit'][5], [1e-4, 0.1, 985.0])
+        np.testing.assert_allclose(records['steering'], -0.5 * np.arange(count))
+        np.testing.assert_array_equal(records['search'][:3], [1, 1, 2])
+        np.testing.assert_array_equal(records['valid'], np.arange(count) % 3 != 0)
+
+    def test_npy_round_trip(self):
+        # 10 records in chunks of 4: two full chunks and a partial one
+        records = telemetry.read_telemetry(self.write('drive.npy', 10))
+        self.assertIsInstance(records, np.memmap)
+        self.check_records(records, 10)
+
+    def test_csv_round_trip(self):
+        self.check_records(telemetry.read_telemetry(self.write('drive.csv', 10)), 10)
+
+    def test_readable_after_each_flush(self):
+        path = os.path.join(self.tmp.name, 'live.npy')
+        writer = telemetry.TelemetryWriter(path, chunk_size=3)
+        self.assertEqual(len(telemetry.read_telemetry(path, mmap_mode=None)), 0)
+        for i in range(7):
+            writer.append(i, 0.0, make_result(i))
+        self.assertEqual(len(telemetry.read_telemetry(path)), 6)
+        writer.close()
+        self.assertEqual(len(telemetry.read_telemetry(path)), 7)
+
+    def test_record_drive(self):
+        path = os.path.join(self.tmp.name, 'drive.npy')
+        pipeline = LanePipeline()
+        frames = [(i * 0.05, make_frame(i)) for i in range(6)]
+        with telemetry.TelemetryWriter(path) as writer:
+            self.assertEqual(telemetry.record_drive(pipeline, frames, writer), 6)
+        records = telemetry.read_telemetry(path)
+        np.testing.assert_array_equal(records['search'],
+                                      [telemetry.SEARCH_SLIDING_WINDOW] + [telemetry.SEARCH_AROUND] * 5)
+        self.assertTrue(records['valid'].all())
+        np.testing.assert_allclose(records['left_fit'][-1], pipeline.left_lane.get_fit())
+        self.assertEqual(records['confidence'][-1], telemetry.CONFIDENCE_HIGH)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.preprocessing import image_utils
+from src.preprocessing.buffer_pool import BufferPool
+
+class TestFusedThreshold(unittest.TestCase):
+    def test_matches_combined_threshold(self):
+        """Fused path must be bit-identical to the reference implementation"""
+        rng = np.random.default_rng(0)
+        pool = BufferPool()
+        for _ in range(10):
+            image = rng.integers(0, 256, (90, 160, 3), dtype=np.uint8)
+            expected = image_utils.combined_threshold(image)
+            actual = image_utils.fused_threshold(image, pool)
+            np.testing.assert_array_equal(actual, expected)
+
+    def test_reuses_buffers(self):
+        pool = BufferPool()
+        image = np.zeros((40, 60, 3), dtype=np.uint8)
+        image[:, 30:] = 255
+        first = image_utils.fused_threshold(image, pool)
+        second = image_utils.fused_threshold(image, pool)
+        self.assertIs(first, second)
+
+    def test_flat_image(self):
+        """No gradient: only the S-channel contributes"""
+        image = np.zeros((20, 20, 3), dtype=np.uint8)
+        output = image_utils.fused_threshold(image, BufferPool())
+        self.assertEqual(np.count_nonzero(output), 0)
+
+    def test_crop_matches_full_frame(self):
+        """Cropped output is the crop of the full-frame output"""
+        rng = np.random.default_rng(1)
+        image = rng.integers(0, 256, (90, 160, 3), dtype=np.uint8)
+        # Brightest gradient outside the crop still sets the scale
+        image[:5, :5] = 0
+        image[:5, 5:10] = 255
+        expected = image_utils.combined_threshold(image)
+        crop = (20, 40, 150, 90)
+        actual = image_utils.fused_threshold(image, BufferPool(), crop=crop)
+        np.testing.assert_array_equal(actual, expected[40:90, 20:150])
+        batch = image_utils.batch_threshold(np.stack([image, image[::-1]]), BufferPool(), crop=crop)
+        np.testing.assert_array_equal(batch[0], expected[40:90, 20:150])
+        np.testing.assert_array_equal(batch[1], image_utils.combined_threshold(image[::-1])[40:90, 20:150])
+
+    def test_sobel_bounds(self):
+        for max_value in (1, 7, 255, 1020):
+            low, high = image_utils.sobel_bounds(max_value, 20, 100)
+            values = np.arange(max_value + 1)
+            scaled = np.uint8(255*values/max_value)
+            inside = (scaled >= 20) & (scaled <= 100)
+            np.testing.assert_array_equal((values >= low) & (values <= high), inside)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+import types
+import numpy as np
+import cv2
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.config import settings
+from src.preprocessing import image_utils
+from src.preprocessing.buffer_pool import BufferPool
+from src.preprocessing.tiling import TiledPreprocessor, tile_rows
+from src.perception import roi, perspective_transform
+from src.pipeline.geometry_cache import GeometryCache
+from src.pipeline.lane_pipeline import LanePipeline
+
+def make_config(**overrides):
+    names = {name: getattr(settings, name) for name in dir(settings) if name.isupper()}
+    names.update(overrides)
+    return types.SimpleNamespace(**names)
+
+def make_frame(i=0):
+    # Two bright lane markings on a dark road, drifting slowly
+    frame = np.full((360, 640, 3), 60, dtype=np.uint8)
+    shift = i * 2
+    cv2.line(frame, (110 + shift, 360), (290 + shift, 215), (0, 220, 255), 8)
+    cv2.line(frame, (560 + shift, 360), (350 + shift, 215), (0, 220, 255), 8)
+    return frame
+
+class TestTileRows(unittest.TestCase):
+    def test_covers_rows(self):
+        for start, stop, tiles in ((0, 720, 4), (300, 720, 7), (0, 3, 8), (5, 6, 2)):
+            bands = tile_rows(start, stop, tiles)
+            self.assertEqual(bands[0][0], start)
+            self.assertEqual(bands[-1][1], stop)
+            self.assertTrue(all(a < b for a, b in bands))
+            self.assertTrue(all(b == a for (_, b), (a, _) in zip(bands, bands[1:])))
+
+class TestTiledPreprocessor(unittest.TestCase):
+    def test_bit_identical_to_serial(self):
+        """Tiled threshold, mask and warp equal the single-threaded stages"""
+        rng = np.random.default_rng(0)
+        frames = [make_frame(), rng.integers(0, 256, (360, 640, 3), dtype=np.uint8)]
+        # Calibrated, so the warp is a remap
+        geometry = GeometryCache(make_config(WARP_MAP_DIR=None, CAMERA_INTRINSICS=(0.8, 1.4, 0.5, 0.5),
+                                             DISTORTION_COEFFS=(-0.3, 0.1, 0.0, 0.0, 0.0))).get(frames[0].shape)
+        tables = {'crop': (geometry.crop, geometry.crop_roi_mask, geometry.crop_map1),
+                  'full': (None, geometry.roi_mask, geometry.map1)}
+        for frame in frames:
+            for name, (crop, roi_mask, map1) in tables.items():
+                expected = roi.apply_mask(image_utils.fused_threshold(frame, BufferPool(), crop=crop), roi_mask)
+                expected_warp = perspective_transform.warp(expected, map1, geometry.map2)
+                for threads in (2, 3, 5, 16):
+                    with self.subTest(name, threads=threads):
+                        tiler = TiledPreprocessor(threads, BufferPool())
+                        masked = tiler.threshold_mask(frame, roi_mask, crop=crop)
+                        np.testing.assert_array_equal(masked, expected)
+                        np.testing.assert_array_equal(tiler.warp(masked, map1, geometry.map2), expected_warp)
+
+    def test_frame_wide_gradient_scale(self):
+        """The gradient bounds come from the maximum of the whole frame"""
+        # A strong edge in the top tile only; the weak edge below would pass
+        # the threshold if its tile were scaled by its own maximum
+        image = np.zeros((40, 60, 3), dtype=np.uint8)
+        image[:10, 30:] = 255
+        image[20:, 30:] = 8
+        expected = image_utils.fused_threshold(image, BufferPool()).copy()
+        mask = np.full(image.shape[:2], 255, dtype=np.uint8)
+        np.testing.assert_array_equal(TiledPreprocessor(4, BufferPool()).threshold_mask(image, mask), expected)
+
+    def test_pipeline_matches_untiled(self):
+        calibrated = dict(CAMERA_INTRINSICS=(0.8, 1.4, 0.5, 0.5), DISTORTION_COEFFS=(-0.1, 0.0, 0.0, 0.0, 0.0),
+                          WARP_MAP_DIR=None)
+        for name, overrides in (('warpPerspective', {}), ('remap', calibrated)):
+            with self.subTest(name):
+                serial = LanePipeline(make_config(TILE_THREADS=1, **overrides))
+                tiled = LanePipeline(make_config(TILE_THREADS=4, **overrides))
+                self.assertIsNone(serial.tiler)
+                for i in range(4):
+                    np.testing.assert_array_equal(tiled.process_frame(make_frame(i)), serial.process_frame(make_frame(i)))
+                    self.assertEqual(tiled.last_result['steering'], serial.last_result['steering'])
+
+if __name__ == '__main__':
+    unittest.main()
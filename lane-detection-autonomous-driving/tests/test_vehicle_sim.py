@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add src to python path to import correctly
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.control.pid_controller import PIDController, BatchedPIDController
+from src.control import vehicle_sim
+from src.pipeline.telemetry import RECORD_DTYPE
+
+class TestVehicleSim(unittest.TestCase):
+    def test_batched_controller_matches_scalar(self):
+        """Each element of the batched controller steps like its own PIDController"""
+        kp, ki, kd = vehicle_sim.gain_grid([0.0, 5.0, 40.0], [0.0, 0.5, 3.0], [0.0, 2.0])
+        batched = BatchedPIDController(kp, ki, kd)
+        scalars = [PIDController(p, i, d) for p, i, d in zip(kp, ki, kd)]
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            error, dt = rng.normal(0, 1.0), rng.uniform(0.02, 0.05)
+            outputs = batched.update(error, dt=dt)
+            expected = [pid.update(error, dt=dt) for pid in scalars]
+            np.testing.assert_allclose(outputs, expected, rtol=1e-12, atol=1e-12)
+
+    def test_controller_recovers_offset(self):
+        """Sensible gains bring the vehicle back to the lane center; no steering drifts"""
+        profile = vehicle_sim.DriveProfile(np.zeros(300), 1 / 30, initial_offset=0.5)
+        result = vehicle_sim.simulate(profile, [0.0, 6.0], [0.0, 0.2], [0.0, 2.0])
+        # Without steering the heading never changes and the offset stays put
+        self.assertAlmostEqual(result['rms_offset'][0], 0.5)
+        self.assertLess(result['rms_offset'][1], 0.1)
+        self.assertLess(result['settling_time'][1], 5.0)
+        self.assertFalse(result['departed'].any())
+
+    def test_curve_needs_steering(self):
+        """On a curve an idle controller leaves the lane and is ranked last"""
+        profile = vehicle_sim.DriveProfile(np.full(200, 1 / 300), 1 / 30)
+        result = vehicle_sim.simulate(profile, [0.0, 6.0], [0.0, 0.2], [0.0, 2.0])
+        self.assertTrue(result['departed'][0])
+        self.assertFalse(result['departed'][1])
+        cost = vehicle_sim.gain_cost(result)
+        self.assertEqual(np.argmin(cost), 1)
+        self.assertTrue(np.isinf(cost[0]))
+
+    def test_profile_from_telemetry(self):
+        """Curvature is signed from the fits; frames without a lane are straight"""
+        records = np.zeros(4, dtype=RECORD_DTYPE)
+        records['timestamp'] = [0.0, 0.05, 0.1, 0.1]
+        records['left_fit'] = [[1e-4, 0, 300], [-1e-4, 0, 300], [np.nan] * 3, [0, 0, 300]]
+        records['right_fit'] = [[1e-4, 0, 900], [-1e-4, 0, 900], [np.nan] * 3, [0, 0, 900]]
+        records['curvature'] = [500.0, 400.0, 0.0, np.inf]
+        records['offset'] = [0.3, 0.2, 0.0, 0.1]
+        profile = vehicle_sim.DriveProfile.from_telemetry(records)
+        np.testing.assert_allclose(profile.curvature, [-1 / 500, 1 / 400, 0.0, 0.0])
+        np.testing.assert_allclose(profile.dt, [0.033, 0.05, 0.05, 0.033])
+        self.assertEqual(profile.initial_offset, 0.3)
+        self.assertEqual(profile.noise[2], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()